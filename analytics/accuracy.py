@@ -1,5 +1,16 @@
+import json
+import math
+from dataclasses import dataclass, field
+
 import pandas as pd
 
+from config.settings import (
+    ACCURACY_EWMA_ALPHA,
+    ACCURACY_WINDOW,
+    ACCURACY_BIN_WIDTH,
+    ACCURACY_BINS
+)
+
 
 def compute_mae(rows):
     if not rows:
@@ -24,3 +35,142 @@ def prepare_accuracy_df(rows):
     df["rolling_mae"] = df["abs_error"].rolling(window=3).mean()
 
     return df
+
+
+# ==================================================
+# Running accuracy aggregates (one per city)
+# ==================================================
+def error_bin(abs_error: float) -> int:
+    """
+    Histogram bin of an absolute error; the last bin is open-ended.
+    """
+    return min(int(abs_error // ACCURACY_BIN_WIDTH), ACCURACY_BINS - 1)
+
+
+@dataclass
+class AccuracyStats:
+    """
+    Running forecast-error aggregates for one city, updated per
+    evaluated date so reads never scan the accuracy history.
+
+    Errors are signed (predicted - actual). Sums support replacing a
+    date's error exactly. The EWMA and the last-`window` errors follow
+    date order: re-evaluating the newest date is exact, and an older
+    date has to be rebuilt with `rewind()`.
+    """
+
+    samples: int = 0
+    error_sum: float = 0.0
+    error_sq_sum: float = 0.0
+    bias_sum: float = 0.0
+    ewma_mae: float | None = None
+    ewma_before: float | None = None  # ewma_mae before last_date was folded in
+    recent: list = field(default_factory=list)  # abs errors of the last dates, oldest first
+    last_date: str | None = None
+
+    def add(
+        self,
+        date: str,
+        error: float,
+        replaced: float | None = None,
+        alpha: float = ACCURACY_EWMA_ALPHA,
+        window: int = ACCURACY_WINDOW
+    ) -> bool:
+        """
+        Fold in `error` for `date` (replacing the `replaced` error of
+        the same date, if any). Returns False when the date is older
+        than last_date and the EWMA / window need a rewind().
+        """
+        if replaced is not None:
+            self.samples -= 1
+            self.error_sum -= abs(replaced)
+            self.error_sq_sum -= replaced * replaced
+            self.bias_sum -= replaced
+
+        self.samples += 1
+        self.error_sum += abs(error)
+        self.error_sq_sum += error * error
+        self.bias_sum += error
+
+        if self.last_date is not None and date < self.last_date:
+            return False
+
+        if date == self.last_date and self.recent:
+            self.recent[-1] = abs(error)
+        else:
+            self.ewma_before = self.ewma_mae
+            self.recent = (self.recent + [abs(error)])[-window:]
+            self.last_date = date
+
+        self.ewma_mae = (
+            abs(error) if self.ewma_before is None
+            else alpha * abs(error) + (1 - alpha) * self.ewma_before
+        )
+        return True
+
+    def rewind(self, rows, alpha: float = ACCURACY_EWMA_ALPHA, window: int = ACCURACY_WINDOW):
+        """
+        Recompute the order-dependent parts from (date, error) rows in
+        date order. Sums are left alone.
+        """
+        replay = AccuracyStats()
+        for date, error in rows:
+            replay.add(date, error, alpha=alpha, window=window)
+
+        self.ewma_mae = replay.ewma_mae
+        self.ewma_before = replay.ewma_before
+        self.recent = replay.recent
+        self.last_date = replay.last_date
+
+    # -----------------------------
+    # Storage round trip
+    # -----------------------------
+    def to_row(self) -> tuple:
+        return (
+            self.samples,
+            self.error_sum,
+            self.error_sq_sum,
+            self.bias_sum,
+            self.ewma_mae,
+            self.ewma_before,
+            json.dumps(self.recent),
+            self.last_date,
+        )
+
+    @classmethod
+    def from_row(cls, row) -> "AccuracyStats":
+        samples, error_sum, error_sq_sum, bias_sum, ewma, before, recent, last_date = row
+        return cls(samples, error_sum, error_sq_sum, bias_sum, ewma, before, json.loads(recent), last_date)
+
+    # -----------------------------
+    # KPIs
+    # -----------------------------
+    def summary(self) -> dict | None:
+        if self.samples <= 0:
+            return None
+
+        mae = self.error_sum / self.samples
+        return {
+            "samples": self.samples,
+            "mae": round(mae, 2),
+            "rmse": round(math.sqrt(max(self.error_sq_sum / self.samples, 0.0)), 2),
+            "bias": round(self.bias_sum / self.samples, 2),
+            "ewma_mae": None if self.ewma_mae is None else round(self.ewma_mae, 2),
+            "window_mae": round(sum(self.recent) / len(self.recent), 2) if self.recent else None,
+        }
+
+
+def histogram_df(rows):
+    """
+    (bin, samples) rows -> DataFrame with a readable error range per bin.
+    """
+    if not rows:
+        return None
+
+    df = pd.DataFrame(rows, columns=["bin", "samples"])
+    df["range"] = [
+        f"≥{b * ACCURACY_BIN_WIDTH:g}" if b == ACCURACY_BINS - 1
+        else f"{b * ACCURACY_BIN_WIDTH:g}–{(b + 1) * ACCURACY_BIN_WIDTH:g}"
+        for b in df["bin"]
+    ]
+    return df
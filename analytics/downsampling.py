@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most `threshold` points of (x, y) that
+    best preserve the visual shape of the series. The first and last
+    points are always kept. `x` must be numeric and sorted ascending.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+
+    if threshold < 3:
+        raise ValueError("LTTB threshold must be at least 3")
+
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (or the last point)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+        else:
+            nxt = slice(n - 1, n)
+        avg_x = x[nxt].mean()
+        avg_y = y[nxt].mean()
+
+        # Triangle area with the previously selected point and next average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def lttb(x, y, threshold: int):
+    """
+    Downsample (x, y) with LTTB; returns the selected (x, y) arrays.
+    """
+    idx = lttb_indices(x, y, threshold)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
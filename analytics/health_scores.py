@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def weather_health_score(features: dict) -> int:
     score = 100
 
@@ -11,3 +14,20 @@ def weather_health_score(features: dict) -> int:
         score -= 25
 
     return max(score, 0)
+
+
+def weather_health_score_array(temperature, humidity, wind_speed) -> np.ndarray:
+    """
+    weather_health_score over arrays (or DataFrame columns).
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    wind_speed = np.asarray(wind_speed, dtype=np.float64)
+
+    score = (
+        100
+        - 15 * (humidity > 80)
+        - 10 * (wind_speed > 10)
+        - 25 * ((temperature < 5) | (temperature > 38))
+    )
+    return np.maximum(score, 0).astype(np.int64)
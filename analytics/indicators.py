@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def comfort_index(temp: float, humidity: int) -> float:
     """
     Comfort score between 0 and 100.
@@ -12,3 +15,50 @@ def wind_risk(temp: float, wind_speed: float) -> str:
     elif temp < 15:
         return "Moderate"
     return "Low"
+
+
+# ==================================================
+# Array versions (same results, element-wise)
+# ==================================================
+def round_like_python(values, ndigits: int) -> np.ndarray:
+    """
+    Element-wise round(value, ndigits), bit-for-bit.
+
+    np.round scales by 10**ndigits before rounding, which can tip a
+    value sitting next to a .5 boundary the other way. Those few
+    values are re-rounded with Python's round.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 10.0 ** ndigits
+    rounded = np.round(values, ndigits)
+
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), ndigits) for v in values[near_tie]]
+
+    return rounded
+
+
+def comfort_index_array(temp, humidity) -> np.ndarray:
+    """
+    comfort_index over arrays (or DataFrame columns).
+    """
+    temp = np.asarray(temp, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+
+    score = 100 - np.abs(temp - 22) * 2 - np.abs(humidity - 50) * 0.5
+    return round_like_python(np.clip(score, 0, 100), 2)
+
+
+def wind_risk_array(temp, wind_speed) -> np.ndarray:
+    """
+    wind_risk over arrays (or DataFrame columns).
+    """
+    temp = np.asarray(temp, dtype=np.float64)
+    wind_speed = np.asarray(wind_speed, dtype=np.float64)
+
+    return np.select(
+        [(temp < 10) & (wind_speed > 6), temp < 15],
+        ["High", "Moderate"],
+        default="Low"
+    ).astype(object)
@@ -1,7 +1,22 @@
-def extract_features(raw: dict) -> dict:
+import pandas as pd
+
+from analytics.health_scores import weather_health_score, weather_health_score_array
+from analytics.indicators import (
+    comfort_index,
+    comfort_index_array,
+    wind_risk,
+    wind_risk_array
+)
+
+
+def extract_features(raw: dict, provider: str = "openweather") -> dict:
     """
     Extracts clean, meaningful metrics from raw API response.
+    `provider` picks the response shape ("openweather" or "weatherapi").
     """
+    if provider == "weatherapi":
+        return extract_features_weatherapi(raw)
+
     return {
         "city": raw["name"],
         "temperature": raw["main"]["temp"],
@@ -9,5 +24,81 @@ def extract_features(raw: dict) -> dict:
         "humidity": raw["main"]["humidity"],
         "pressure": raw["main"]["pressure"],
         "wind_speed": raw["wind"]["speed"],
-        "condition": raw["weather"][0]["main"]
+        "condition": raw["weather"][0]["main"],
+        "lat": raw.get("coord", {}).get("lat"),
+        "lon": raw.get("coord", {}).get("lon")
     }
+
+
+# WeatherAPI condition codes -> OpenWeather "main" groups, so stored
+# snapshots use one vocabulary whichever provider answered
+WEATHERAPI_CONDITION_GROUPS = {
+    "Clear": {1000},
+    "Clouds": {1003, 1006, 1009},
+    "Mist": {1030},
+    "Fog": {1135, 1147},
+    "Drizzle": {1072, 1150, 1153, 1168, 1171},
+    "Rain": {1063, 1180, 1183, 1186, 1189, 1192, 1195, 1198, 1201, 1240, 1243, 1246},
+    "Snow": {
+        1066, 1069, 1114, 1117, 1204, 1207, 1210, 1213, 1216, 1219,
+        1222, 1225, 1237, 1249, 1252, 1255, 1258, 1261, 1264
+    },
+    "Thunderstorm": {1087, 1273, 1276, 1279, 1282},
+}
+
+_WEATHERAPI_CONDITIONS = {
+    code: group
+    for group, codes in WEATHERAPI_CONDITION_GROUPS.items()
+    for code in codes
+}
+
+
+def extract_features_weatherapi(raw: dict) -> dict:
+    """
+    Same metrics from a WeatherAPI current.json response
+    (wind km/h -> m/s, pressure already in hPa/mb).
+    """
+    location = raw["location"]
+    current = raw["current"]
+    condition = current.get("condition", {})
+
+    return {
+        "city": location["name"],
+        "temperature": current["temp_c"],
+        "feels_like": current["feelslike_c"],
+        "humidity": current["humidity"],
+        "pressure": current["pressure_mb"],
+        "wind_speed": round(current["wind_kph"] / 3.6, 2),
+        "condition": _WEATHERAPI_CONDITIONS.get(condition.get("code"), condition.get("text")),
+        "lat": location.get("lat"),
+        "lon": location.get("lon")
+    }
+
+
+def enrich_features(features: dict) -> dict:
+    """
+    Adds the derived comfort, wind risk and health scores in place.
+    """
+    features["comfort"] = comfort_index(
+        features["temperature"], features["humidity"]
+    )
+    features["wind_risk"] = wind_risk(
+        features["temperature"], features["wind_speed"]
+    )
+    features["health"] = weather_health_score(features)
+    return features
+
+
+def enrich_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    enrich_features for a whole DataFrame of snapshots (temperature,
+    humidity, wind_speed columns) in one vectorized pass. Returns a
+    copy with comfort, wind_risk and health columns.
+    """
+    df = df.copy()
+    df["comfort"] = comfort_index_array(df["temperature"], df["humidity"])
+    df["wind_risk"] = wind_risk_array(df["temperature"], df["wind_speed"])
+    df["health"] = weather_health_score_array(
+        df["temperature"], df["humidity"], df["wind_speed"]
+    )
+    return df
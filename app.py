@@ -2,24 +2,40 @@ import streamlit as st
 from datetime import datetime, timedelta
 import time
 
-from config.settings import WEATHER_API_KEY, WEATHERAPI_KEY
+from config.settings import (
+    WEATHER_API_KEY,
+    WEATHERAPI_KEY,
+    CURRENT_WEATHER_PRIMARY,
+    CURRENT_WEATHER_TTL,
+    FORECAST_TTL,
+    SCHEDULER_IN_PROCESS,
+    ACCURACY_WINDOW,
+    ACCURACY_TREND_POINTS
+)
 
 
 # =========================
 # Core services & analytics
 # =========================
 from services.weather_api import (
-    fetch_weather,
+    fetch_current_weather,
     fetch_daily_forecast_weatherapi,
-    WeatherAPIError
+    WeatherAPIError,
+    api_usage_stats,
+    coalescing_stats,
+    resilience_stats,
+    OPENWEATHER,
+    WEATHERAPI
 )
+from services.batch import submit_timed
+from services.city_resolver import CITY_RESOLVER
+from services.response_cache import RESPONSE_CACHE
+from services.scheduler import start_scheduler
 
-from analytics.processor import extract_features
-from analytics.indicators import comfort_index, wind_risk
-from analytics.health_scores import weather_health_score
+from analytics.processor import enrich_features, extract_features
 from analytics.weatherapi_forecast_processor import process_weatherapi_forecast
 from analytics.alerts import generate_weather_alerts
-from analytics.accuracy import compute_mae, prepare_accuracy_df
+from analytics.accuracy import histogram_df, prepare_accuracy_df
 
 from utils.validators import validate_city
 
@@ -35,30 +51,39 @@ from visualizations.charts import (
 )
 from visualizations.forecast_charts import forecast_temperature_chart
 from visualizations.forecast_conditions import render_forecast_conditions
-from visualizations.accuracy_charts import accuracy_trend_chart
+from visualizations.accuracy_charts import (
+    accuracy_histogram_chart,
+    accuracy_trend_chart,
+    lead_time_error_chart
+)
 
 
 # =========================
 # Storage layer
 # =========================
 from storage.database import (
-    get_connection,
-    insert_weather,
-    fetch_weather_history,
-    insert_forecast,
+    age_seconds,
+    fetch_latest_snapshot,
+    fetch_forecast_fetched_at,
+    fetch_weather_series,
     fetch_cached_forecast,
-    fetch_yesterday_forecast,
-    insert_forecast_accuracy,
-    fetch_forecast_accuracy
+    fetch_verification,
+    fetch_forecast_accuracy,
+    fetch_accuracy_stats,
+    fetch_accuracy_histogram
 )
+from storage.query_cache import QUERY_CACHE
+from storage.writer import get_writer
 
 
-# =========================
-# Cached DB connection
-# =========================
-@st.cache_resource
-def get_db():
-    return get_connection()
+# Sidebar history window -> days back (None = everything stored)
+HISTORY_RANGES = {
+    "Last 24 hours": 1,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last year": 365,
+    "All time": None,
+}
 
 
 # =========================
@@ -77,6 +102,20 @@ def latency_badge(latency: float | None, warn: float, critical: float) -> str:
     return f"🔴 Critical ({latency:.2f}s)"
 
 
+def format_timing(timing) -> str:
+    """
+    One-line connect / wait / transfer breakdown of a provider request.
+    """
+    if timing is None:
+        return ""
+
+    connect = "reused" if timing.reused else f"{timing.connect:.2f}s"
+    return (
+        f"<small>connect {connect} · wait {timing.wait:.2f}s · "
+        f"transfer {timing.transfer:.2f}s</small>  \n"
+    )
+
+
 def format_time(ts: float | None) -> str:
     if ts is None:
         return "—"
@@ -103,13 +142,53 @@ def render_perf_sidebar(perf_box):
     if forecast_latency is None and forecast_updated_at is not None:
         forecast_text = "🔴 Failed / Timeout"
 
+    cache = QUERY_CACHE.stats()
+    cache_text = (
+        f"{cache['hit_ratio']:.0%} hits ({cache['hits']}/{cache['hits'] + cache['misses']})"
+        if cache["hit_ratio"] is not None
+        else "—"
+    )
+
+    responses = RESPONSE_CACHE.stats()
+    responses_text = (
+        f"{responses['hit_ratio']:.0%} hits · "
+        f"{responses['memory_bytes'] / 1024:.0f} KB memory · {responses['disk_bytes'] / 1024:.0f} KB disk"
+        if responses["hit_ratio"] is not None
+        else "—"
+    )
+
+    usage = api_usage_stats()
+    usage_text = " · ".join(
+        f"{name} {usage[provider]['requests']}"
+        + (f"/{usage[provider]['daily_quota']}" if usage[provider]["daily_quota"] else "")
+        + (f" ({usage[provider]['rejected']} limited)" if usage[provider]["rejected"] else "")
+        for provider, name in ((OPENWEATHER, "OpenWeather"), (WEATHERAPI, "WeatherAPI"))
+    )
+
+    circuits = resilience_stats()
+    tripped = [f"{name} {c['state']}" for name, c in circuits.items() if c["state"] != "closed"]
+    circuits_text = " · ".join(tripped) if tripped else "🟢 all closed"
+
+    flights = coalescing_stats()
+    flights_text = f"{flights['coalesced']} shared / {flights['calls']} sent"
+
     perf_box.markdown(
         f"""
         **Live Weather:** {live_text}  
-        <small>Last updated: {format_time(live_updated_at)}</small>
+        {format_timing(st.session_state.get("live_timing"))}<small>Last updated: {format_time(live_updated_at)}</small>
 
         **Forecast:** {forecast_text}  
-        <small>Last updated: {format_time(forecast_updated_at)}</small>
+        {format_timing(st.session_state.get("forecast_timing"))}<small>Last updated: {format_time(forecast_updated_at)}</small>
+
+        **DB Query Cache:** {cache_text}
+
+        **API Response Cache:** {responses_text}
+
+        **Coalesced API Calls:** {flights_text}
+
+        **API Quota Today:** {usage_text}
+
+        **Provider Circuits:** {circuits_text}
         """,
         unsafe_allow_html=True
     )
@@ -123,6 +202,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Background refresh of hot cities (once per server process)
+if SCHEDULER_IN_PROCESS:
+    start_scheduler()
+
 st.title("🌦️ Weather Analytics Dashboard")
 st.caption("Industry-grade, analytics-first weather intelligence")
 
@@ -154,6 +237,11 @@ with st.sidebar:
 
     city = st.text_input("Enter city name", value=st.session_state["last_city"])
 
+    # Known cities and learned spellings matching what was typed
+    suggestions = [s for s in CITY_RESOLVER.suggest(city) if s != city.strip()] if city.strip() else []
+    if suggestions:
+        st.caption("Did you mean: " + ", ".join(suggestions))
+
     col1, col2 = st.columns(2)
 
     with col1:
@@ -170,6 +258,12 @@ with st.sidebar:
         else:
             st.warning("No previous city found. Please analyze once first.")
 
+    history_range = st.selectbox(
+        "History range",
+        list(HISTORY_RANGES),
+        index=1
+    )
+
     st.markdown("---")
     st.subheader("🔐 API Status")
 
@@ -203,16 +297,47 @@ if analyze:
         # ✅ Save city in session so refresh works
         st.session_state["last_city"] = city
 
+        # Alternate spellings map to one canonical name, so they share
+        # provider calls, cache entries and history
+        typed_city = city
+        city = CITY_RESOLVER.resolve(city)
+
+        # Hot cities are kept fresh in SQLite by the refresh scheduler;
+        # only go to the providers when the stored data has expired
+        forecast_fetched_at = fetch_forecast_fetched_at(city)
+        forecast_is_fresh = (
+            forecast_fetched_at is not None
+            and age_seconds(forecast_fetched_at) < FORECAST_TTL
+        )
+
+        # Forecast does not depend on live weather: start it now so both
+        # providers are queried in parallel
+        forecast_future = None if forecast_is_fresh else submit_timed(
+            WEATHERAPI, fetch_daily_forecast_weatherapi, city, 5
+        )
+
         # -----------------------------
         # STEP 5: Live Weather API latency monitoring
         # -----------------------------
         with st.spinner("Fetching live weather data..."):
             start = time.time()
-            raw = fetch_weather(city)
+            current = None
+            features = fetch_latest_snapshot(city)
+
+            if features is None or age_seconds(features["timestamp"]) >= CURRENT_WEATHER_TTL:
+                current = fetch_current_weather(city)
+                features = extract_features(current.raw, current.provider)
+                if current.fallback:
+                    # Measurements only: the city keeps the resolved name,
+                    # so its history and aliases stay on one cities row
+                    features["city"] = city
+
+            features = enrich_features(features)
             live_latency = time.time() - start
 
             # ✅ Store latency + update time
             st.session_state["live_latency"] = live_latency
+            st.session_state["live_timing"] = current.timing if current else None
             st.session_state["live_updated_at"] = time.time()
 
             # ✅ Update sidebar instantly
@@ -221,46 +346,32 @@ if analyze:
             if live_latency > 2:
                 st.warning("⚠️ Live weather service is slower than usual")
 
-            features = extract_features(raw)
-
-            features["comfort"] = comfort_index(
-                features["temperature"], features["humidity"]
-            )
-            features["wind_risk"] = wind_risk(
-                features["temperature"], features["wind_speed"]
-            )
-            features["health"] = weather_health_score(features)
+            if current is None:
+                st.caption(f"Live conditions refreshed at {features['timestamp']} UTC")
+            elif current.provider != CURRENT_WEATHER_PRIMARY:
+                st.caption(f"Live conditions served by {current.provider}")
 
         st.success(f"Weather analysis for {features['city']}")
 
         # -----------------------------
-        # Store snapshot in SQLite
+        # Store snapshot in SQLite (group-committed writer)
         # -----------------------------
-        conn = get_db()
-        insert_weather(conn, features)
+        writer = get_writer()
+        if current is not None:
+            writer.insert_weather(features).result()
+
+        # Remember the provider's name for what was typed
+        CITY_RESOLVER.learn(typed_city, features["city"])
+
+        # Viewed cities join the background refresh watchlist
+        writer.record_view(features["city"])
 
         # ==================================================
         # Forecast Accuracy Tracking (Actual vs Predicted)
         # ==================================================
-        today = datetime.utcnow().date()
-        yesterday = today - timedelta(days=1)
-        # For testing ONLY:
-        # yesterday = today
-
-        predicted_avg = fetch_yesterday_forecast(
-            conn,
-            features["city"],
-            yesterday.strftime("%Y-%m-%d")
-        )
-
-        if predicted_avg is not None:
-            insert_forecast_accuracy(
-                conn,
-                features["city"],
-                yesterday.strftime("%Y-%m-%d"),
-                predicted_avg=predicted_avg,
-                actual_avg=features["temperature"]
-            )
+        # Stored forecasts are verified against observed daily means
+        # for every city by the nightly job (worker.py / verify.py),
+        # never in the request path; the sections below only read it.
 
         # -----------------------------
         # KPI Section
@@ -294,7 +405,16 @@ if analyze:
         # -----------------------------
         st.subheader("Historical Trends")
 
-        history_rows = fetch_weather_history(features["city"])
+        history_days = HISTORY_RANGES[history_range]
+        history_rows = fetch_weather_series(
+            features["city"],
+            # Hour-aligned so repeat views hit the query cache
+            start=(
+                (datetime.utcnow() - timedelta(days=history_days))
+                .replace(minute=0, second=0, microsecond=0)
+                if history_days else None
+            )
+        )
         temp_fig, health_fig = historical_trend_charts(history_rows)
 
         if temp_fig and health_fig:
@@ -317,23 +437,42 @@ if analyze:
         st.markdown("---")
         st.subheader("📊 Forecast Model Performance")
 
-        accuracy_rows = fetch_forecast_accuracy(conn, features["city"])
-        mae = compute_mae(accuracy_rows)
+        # Running aggregates: constant cost however long the city is tracked
+        accuracy = fetch_accuracy_stats(features["city"])
 
-        if mae is not None:
-            st.metric("📉 Forecast MAE (°C)", mae)
+        if accuracy is not None:
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("📉 Forecast MAE (°C)", accuracy["mae"])
+            m2.metric(f"Last {ACCURACY_WINDOW} days MAE", accuracy["window_mae"])
+            m3.metric("Bias (°C)", accuracy["bias"])
+            m4.metric("RMSE (°C)", accuracy["rmse"])
 
-        accuracy_df = prepare_accuracy_df(accuracy_rows)
+        accuracy_df = prepare_accuracy_df(
+            fetch_forecast_accuracy(features["city"], limit=ACCURACY_TREND_POINTS)
+        )
 
         if accuracy_df is not None and len(accuracy_df) >= 2:
             acc_fig = accuracy_trend_chart(accuracy_df)
             st.plotly_chart(acc_fig, use_container_width=True)
+
+            error_bins = histogram_df(fetch_accuracy_histogram(features["city"]))
+            if error_bins is not None:
+                st.plotly_chart(accuracy_histogram_chart(error_bins), use_container_width=True)
         else:
             st.info(
                 "Forecast accuracy trend will appear after multiple days "
                 "of forecast evaluation."
             )
 
+        lead_rows = fetch_verification(features["city"])
+        if lead_rows:
+            st.plotly_chart(lead_time_error_chart(lead_rows), use_container_width=True)
+        else:
+            st.caption(
+                "Error by lead time appears once the nightly verification "
+                "has compared this city's forecasts with observed days."
+            )
+
         # =============================
         # STEP 6: Forecast API latency monitoring
         # =============================
@@ -341,28 +480,36 @@ if analyze:
         forecast_source = None
 
         try:
-            with st.spinner("Fetching weather forecast..."):
-                start = time.time()
-                forecast_raw = fetch_daily_forecast_weatherapi(
-                    features["city"], days=5
+            if forecast_future is None:
+                forecast_df = fetch_cached_forecast(city)
+                forecast_source = f"Forecast refreshed at {forecast_fetched_at} UTC"
+
+            if forecast_df is None:
+                forecast_future = forecast_future or submit_timed(
+                    WEATHERAPI, fetch_daily_forecast_weatherapi, city, 5
                 )
-                forecast_latency = time.time() - start
 
-                # ✅ Store forecast latency + update time
-                st.session_state["forecast_latency"] = forecast_latency
-                st.session_state["forecast_updated_at"] = time.time()
+                with st.spinner("Fetching weather forecast..."):
+                    forecast_call = forecast_future.result()
+                    forecast_raw = forecast_call.payload
+                    forecast_latency = forecast_call.latency
+
+                    # ✅ Store forecast latency + update time
+                    st.session_state["forecast_latency"] = forecast_latency
+                    st.session_state["forecast_timing"] = forecast_call.timing
+                    st.session_state["forecast_updated_at"] = time.time()
 
-                # ✅ Update sidebar instantly
-                render_perf_sidebar(perf_box)
+                    # ✅ Update sidebar instantly
+                    render_perf_sidebar(perf_box)
 
-                if forecast_latency > 3:
-                    st.warning("⚠️ Forecast service is slower than usual")
+                    if forecast_latency > 3:
+                        st.warning("⚠️ Forecast service is slower than usual")
 
-                forecast_df = process_weatherapi_forecast(forecast_raw)
+                    forecast_df = process_weatherapi_forecast(forecast_raw)
 
-                # Cache successful forecast
-                insert_forecast(conn, features["city"], forecast_df)
-                forecast_source = "Live forecast data"
+                    # Cache successful forecast
+                    writer.insert_forecast(features["city"], forecast_df).result()
+                    forecast_source = "Live forecast data"
 
         except WeatherAPIError:
             # ✅ Even on fail, mark forecast as "attempted" so sidebar updates
@@ -371,7 +518,7 @@ if analyze:
             render_perf_sidebar(perf_box)
 
             # Try cached forecast
-            forecast_df = fetch_cached_forecast(conn, features["city"])
+            forecast_df = fetch_cached_forecast(features["city"])
 
             if forecast_df is not None:
                 forecast_source = (
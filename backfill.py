@@ -0,0 +1,60 @@
+import argparse
+import time
+
+from config.settings import BACKFILL_CHUNK_ROWS, BACKFILL_WORKERS
+from storage.backfill import import_history, rescore_history
+from storage.database import DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-score stored weather history or import historical observations"
+    )
+    job = parser.add_mutually_exclusive_group(required=True)
+    job.add_argument(
+        "--rescore",
+        action="store_true",
+        help="Recompute comfort and health for every stored snapshot"
+    )
+    job.add_argument(
+        "--import",
+        dest="import_path",
+        metavar="FILE",
+        help="Import snapshots from a CSV or JSONL file"
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--chunk-rows", type=int, default=BACKFILL_CHUNK_ROWS)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BACKFILL_WORKERS,
+        help="Scoring processes (0 = score in this process)"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the saved checkpoint and start from the beginning"
+    )
+    args = parser.parse_args()
+
+    options = dict(
+        db_path=args.db,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        restart=args.restart
+    )
+
+    start = time.perf_counter()
+    if args.rescore:
+        result = rescore_history(**options)
+    else:
+        result = import_history(args.import_path, **options)
+    elapsed = time.perf_counter() - start
+
+    print(f"  {result['job']}")
+    print(f"  {result['rows_read']} rows read, {result['rows_written']} written in {elapsed:.1f}s")
+    print("Backfill completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
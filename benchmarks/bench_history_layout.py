@@ -0,0 +1,111 @@
+"""
+Compare the rowid and compact weather history layouts.
+
+    python -m benchmarks.bench_history_layout --cities 200 --snapshots 500
+
+Builds one database per layout with snapshots for every city
+interleaved in time order, the way the dashboard writes them. It then
+reports file size and per-city range-scan latency. Each scan opens a
+fresh connection with a small page cache, so the numbers reflect page
+I/O rather than SQLite's cache.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from storage.history_layout import LAYOUTS
+from storage.migrations import run_migrations
+
+START = datetime(2025, 1, 1)
+STEP = timedelta(minutes=10)
+
+
+def build(path: str, layout, cities: int, snapshots: int):
+    conn = sqlite3.connect(path)
+    run_migrations(conn)
+
+    conn.executemany(
+        "INSERT INTO cities (id, name, name_key) VALUES (?, ?, ?)",
+        [(i, f"City {i}", f"city {i}") for i in range(1, cities + 1)]
+    )
+
+    rng = random.Random(42)
+    for step in range(snapshots):
+        ts = (START + step * STEP).strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany(
+            layout.insert_sql,
+            [
+                layout.insert_params(city_id, ts, {
+                    "temperature": round(rng.uniform(-10, 40), 2),
+                    "feels_like": round(rng.uniform(-15, 45), 2),
+                    "humidity": rng.randint(10, 100),
+                    "pressure": rng.randint(980, 1040),
+                    "wind_speed": round(rng.uniform(0, 20), 2),
+                    "condition": rng.choice(["Clear", "Clouds", "Rain"]),
+                    "comfort": round(rng.uniform(0, 100), 2),
+                    "health": rng.randint(50, 100),
+                })
+                for city_id in range(1, cities + 1)
+            ]
+        )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def scan(path: str, layout, cities: int, snapshots: int, scans: int) -> tuple[list, int]:
+    rng = random.Random(7)
+    end = (START + snapshots * STEP).strftime("%Y-%m-%d %H:%M:%S")
+    start = START.strftime("%Y-%m-%d %H:%M:%S")
+    timings = []
+    rows = 0
+
+    for _ in range(scans):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.execute("PRAGMA cache_size=-256")  # 256 KiB
+
+        t0 = time.perf_counter()
+        rows = len(conn.execute(
+            layout.range_sql, (rng.randint(1, cities), start, end)
+        ).fetchall())
+        timings.append(time.perf_counter() - t0)
+
+        conn.close()
+
+    return timings, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--snapshots", type=int, default=500, help="Snapshots per city")
+    parser.add_argument("--scans", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(
+            f"{args.cities} cities x {args.snapshots} snapshots, "
+            f"{args.scans} single-city full-range scans\n"
+        )
+        print(f"{'layout':<10}{'size MB':>10}{'p50 ms':>10}{'p95 ms':>10}{'rows':>8}")
+
+        for name, layout in LAYOUTS.items():
+            path = os.path.join(tmp, f"{name}.db")
+            build(path, layout, args.cities, args.snapshots)
+
+            timings, rows = scan(path, layout, args.cities, args.snapshots, args.scans)
+            timings.sort()
+            p50 = statistics.median(timings) * 1000
+            p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+            size = os.path.getsize(path) / 1_000_000
+
+            print(f"{name:<10}{size:>10.2f}{p50:>10.2f}{p95:>10.2f}{rows:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,124 @@ WEATHERAPI_BASE_URL = os.getenv("WEATHERAPI_BASE_URL", "https://api.weatherapi.c
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 WEATHERAPI_KEY = os.getenv("WEATHERAPI_KEY")
 
+# Resilience: every provider call gets at most REQUEST_BUDGET seconds in
+# total (retries included). Per-attempt timeouts follow the endpoint's
+# observed p99 latency x TIMEOUT_MULTIPLIER, kept within
+# [TIMEOUT_MIN, REQUEST_TIMEOUT].
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", "10"))
+TIMEOUT_MIN = float(os.getenv("TIMEOUT_MIN", "2"))
+TIMEOUT_MULTIPLIER = float(os.getenv("TIMEOUT_MULTIPLIER", "2"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "2"))
+# Consecutive failures that open an endpoint's circuit, and how long it
+# stays open before a single trial request is let through
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Current weather source: "openweather" or "weatherapi" only,
+# "failover" (primary, then the other provider on error) or "hedged"
+# (failover, plus a second request to the other provider once the
+# primary is slower than its p90 latency; first answer wins)
+CURRENT_WEATHER_MODE = os.getenv("CURRENT_WEATHER_MODE", "hedged")
+CURRENT_WEATHER_PRIMARY = os.getenv("CURRENT_WEATHER_PRIMARY", "openweather")
+# Hedge delay used until the primary has latency samples
+HEDGE_DELAY_DEFAULT = float(os.getenv("HEDGE_DELAY_DEFAULT", "1.5"))
+
+# Keep-alive connections kept open per weather provider
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+
+# Batch fetches: worker threads (per pool: batches and interactive calls
+# each get one), and max in-flight requests per provider (batches leave
+# one of them free for interactive calls)
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "16"))
+OPENWEATHER_MAX_CONCURRENCY = int(os.getenv("OPENWEATHER_MAX_CONCURRENCY", "8"))
+WEATHERAPI_MAX_CONCURRENCY = int(os.getenv("WEATHERAPI_MAX_CONCURRENCY", "8"))
+
+# Client-side rate limits per provider key: sustained requests per
+# minute, burst size, and requests per UTC day (0 = no daily cap).
+# A caller that chooses to wait gives up after RATE_LIMIT_MAX_WAIT seconds.
+# Daily caps are off by default: once reached, every call to that
+# provider fails until UTC midnight. Set them to your plan's allowance,
+# e.g. OPENWEATHER_DAILY_QUOTA=1000 for the OpenWeather free tier.
+OPENWEATHER_RATE_PER_MINUTE = float(os.getenv("OPENWEATHER_RATE_PER_MINUTE", "60"))
+OPENWEATHER_BURST = int(os.getenv("OPENWEATHER_BURST", "10"))
+OPENWEATHER_DAILY_QUOTA = int(os.getenv("OPENWEATHER_DAILY_QUOTA", "0"))
+WEATHERAPI_RATE_PER_MINUTE = float(os.getenv("WEATHERAPI_RATE_PER_MINUTE", "100"))
+WEATHERAPI_BURST = int(os.getenv("WEATHERAPI_BURST", "10"))
+WEATHERAPI_DAILY_QUOTA = int(os.getenv("WEATHERAPI_DAILY_QUOTA", "0"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+
+# Provider response cache: in-memory LRU entries, on-disk tier and its
+# size cap (MB, 0 = unbounded), fresh lifetime per endpoint (seconds),
+# and how long past that an entry may still be served when the provider
+# is failing
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "storage/response_cache")
+RESPONSE_CACHE_DISK_MB = float(os.getenv("RESPONSE_CACHE_DISK_MB", "64"))
+CURRENT_WEATHER_TTL = int(os.getenv("CURRENT_WEATHER_TTL", "600"))
+FORECAST_TTL = int(os.getenv("FORECAST_TTL", "10800"))
+RESPONSE_CACHE_MAX_STALE = int(os.getenv("RESPONSE_CACHE_MAX_STALE", "86400"))
+
+# Background refresh of hot cities: run inside the Streamlit process
+# (or use `python worker.py`), how many recently viewed cities to keep
+# warm, and when to refresh (this fraction of the response TTL)
+SCHEDULER_IN_PROCESS = os.getenv("SCHEDULER_IN_PROCESS", "1") == "1"
+WATCHLIST_SIZE = int(os.getenv("WATCHLIST_SIZE", "20"))
+WATCHLIST_HOT_HOURS = float(os.getenv("WATCHLIST_HOT_HOURS", "24"))
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "15"))
+SCHEDULER_MAX_PER_TICK = int(os.getenv("SCHEDULER_MAX_PER_TICK", "4"))
+SCHEDULER_REFRESH_AHEAD = float(os.getenv("SCHEDULER_REFRESH_AHEAD", "0.8"))
+
+# City resolver: reload the alias index this often (picks up aliases
+# learned by other processes), and difflib cutoff for fuzzy suggestions
+CITY_INDEX_RELOAD_SECONDS = float(os.getenv("CITY_INDEX_RELOAD_SECONDS", "300"))
+CITY_FUZZY_CUTOFF = float(os.getenv("CITY_FUZZY_CUTOFF", "0.75"))
+
+# SQLite group-commit writer: flush after this many queued writes
+# or this many milliseconds, whichever comes first
+DB_WRITER_BATCH_SIZE = int(os.getenv("DB_WRITER_BATCH_SIZE", "64"))
+DB_WRITER_FLUSH_MS = float(os.getenv("DB_WRITER_FLUSH_MS", "5"))
+
+# Read-only SQLite connections shared by dashboard sessions
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+# Per-city query cache: max entries, and a TTL backstop for writes
+# made by other processes (in-process writes invalidate immediately)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Physical layout of raw history: "rowid" (weather_history) or
+# "compact" (weather_history_compact, clustered per city by time)
+HISTORY_LAYOUT = os.getenv("HISTORY_LAYOUT", "rowid")
+
+# Retention: rows older than this move to Parquet under ARCHIVE_DIR
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "90"))
+ACCURACY_RETENTION_DAYS = int(os.getenv("ACCURACY_RETENTION_DAYS", "365"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "storage/archive")
+# Past forecast days (weather_forecast, forecast_issues) are deleted
+# after this; keep it longer than the gap between verification runs
+FORECAST_RETENTION_DAYS = int(os.getenv("FORECAST_RETENTION_DAYS", "30"))
+
+# Forecast accuracy aggregates: EWMA smoothing, "recent" MAE window
+# (evaluated days), error histogram bins (°C) and trend chart length
+ACCURACY_EWMA_ALPHA = float(os.getenv("ACCURACY_EWMA_ALPHA", "0.3"))
+ACCURACY_WINDOW = int(os.getenv("ACCURACY_WINDOW", "7"))
+ACCURACY_BIN_WIDTH = float(os.getenv("ACCURACY_BIN_WIDTH", "0.5"))
+ACCURACY_BINS = int(os.getenv("ACCURACY_BINS", "20"))
+ACCURACY_TREND_POINTS = int(os.getenv("ACCURACY_TREND_POINTS", "90"))
+
+# Nightly forecast verification: a day counts as observed with at least
+# this many snapshots; day-ahead errors from the last N days feed the
+# per-city accuracy aggregates
+VERIFY_MIN_OBSERVATIONS = int(os.getenv("VERIFY_MIN_OBSERVATIONS", "3"))
+VERIFY_LOOKBACK_DAYS = int(os.getenv("VERIFY_LOOKBACK_DAYS", "7"))
+
+# Backfill / re-scoring: rows per chunk (one transaction each) and
+# scoring processes (0 = score in the main process)
+BACKFILL_CHUNK_ROWS = int(os.getenv("BACKFILL_CHUNK_ROWS", "50000"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", str(os.cpu_count() or 1)))
+
 # ✅ Streamlit Cloud fallback (safe)
 try:
     import streamlit as st
@@ -0,0 +1,177 @@
+"""
+Offline load test of the provider layer against the fake provider.
+
+    python -m loadtest.driver --sessions 20 --views 25 --latency-ms 150
+
+Simulates concurrent dashboard sessions. Each view fetches current
+weather and the 5-day forecast in parallel, as app.py does. Views pick
+cities from a skewed distribution, so a few cities are hot. The run
+reports throughput, p50/p95/p99 view latency, errors and how many
+requests reached the providers. Runs are reproducible for a given
+--seed. Pass --cache to keep the response cache on, or leave it off to
+measure the network path.
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from loadtest.fake_provider import FakeProvider
+from services import weather_api
+from services.rate_limit import ProviderLimiter
+from services.response_cache import ResponseCache
+
+
+def configure_services(server: FakeProvider, cache: bool = False, patch=setattr):
+    """
+    Point services.weather_api at `server` with dummy keys, an in-memory
+    response cache (fresh TTLs zeroed unless `cache`), and unlimited,
+    non-persisted rate limiters. `patch` can be monkeypatch.setattr.
+    """
+    patch(weather_api, "BASE_URL", server.openweather_url)
+    patch(weather_api, "WEATHERAPI_BASE_URL", server.weatherapi_url)
+    patch(weather_api, "WEATHER_API_KEY", "fake-openweather-key")
+    patch(weather_api, "WEATHERAPI_KEY", "fake-weatherapi-key")
+    patch(weather_api, "RESPONSE_CACHE", ResponseCache(cache_dir=None))
+
+    if not cache:
+        patch(weather_api, "RESPONSE_TTLS", {endpoint: 0 for endpoint in weather_api.RESPONSE_TTLS})
+
+    patch(weather_api, "LIMITERS", {
+        provider: ProviderLimiter(provider, rate_per_minute=0, burst=1, persist=False)
+        for provider in weather_api.LIMITERS
+    })
+
+
+@dataclass
+class LoadReport:
+    latencies: list = field(default_factory=list)  # seconds per successful view
+    errors: dict = field(default_factory=dict)     # exception type -> count
+    duration: float = 0.0
+    upstream: dict = field(default_factory=dict)   # fake provider route -> requests
+
+    @property
+    def views(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def percentile(self, p: float) -> float | None:
+        return float(np.percentile(self.latencies, p)) if self.latencies else None
+
+    def summary(self) -> str:
+        lines = [
+            f"views        {self.views} in {self.duration:.2f}s "
+            f"({self.views / self.duration:.1f} views/s)" if self.duration else f"views        {self.views}",
+            f"errors       {sum(self.errors.values())} {self.errors or ''}",
+        ]
+        if self.latencies:
+            lines.append(
+                "latency ms   "
+                f"p50 {self.percentile(50) * 1000:.0f} | p95 {self.percentile(95) * 1000:.0f} | "
+                f"p99 {self.percentile(99) * 1000:.0f} | max {max(self.latencies) * 1000:.0f}"
+            )
+        for route, count in self.upstream.items():
+            lines.append(f"upstream     {count:>6}  {route}")
+        return "\n".join(lines)
+
+
+def _pick_city(rng: random.Random, cities: int, skew: float) -> str:
+    # Zipf-like: city k is chosen with weight 1 / k^skew
+    weights = [1 / (k ** skew) for k in range(1, cities + 1)]
+    return f"City {rng.choices(range(1, cities + 1), weights)[0]}"
+
+
+def run_load(
+    sessions: int = 10,
+    views: int = 20,
+    cities: int = 50,
+    skew: float = 1.1,
+    think_ms: float = 0,
+    seed: int = 0,
+    budget: float | None = None
+) -> LoadReport:
+    """
+    Run `sessions` concurrent sessions of `views` views each against the
+    providers services.weather_api currently points at.
+    """
+    report = LoadReport()
+    lock = threading.Lock()
+    forecasts = ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-forecast")
+
+    def session(index: int):
+        rng = random.Random(f"{seed}:{index}")
+
+        for _ in range(views):
+            city = _pick_city(rng, cities, skew)
+            start = time.perf_counter()
+            try:
+                forecast = forecasts.submit(
+                    weather_api.fetch_daily_forecast_weatherapi, city, 5, True, budget
+                )
+                weather_api.fetch_current_weather(city, budget=budget)
+                forecast.result()
+            except Exception as e:
+                with lock:
+                    name = type(e).__name__
+                    report.errors[name] = report.errors.get(name, 0) + 1
+            else:
+                with lock:
+                    report.latencies.append(time.perf_counter() - start)
+
+            if think_ms:
+                time.sleep(rng.expovariate(1 / (think_ms / 1000)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-session") as pool:
+        list(pool.map(session, range(sessions)))
+    report.duration = time.perf_counter() - start
+
+    forecasts.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against the fake providers")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--views", type=int, default=20, help="Views per session")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of city popularity")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between views")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--budget", type=float, default=None, help="Per-call time budget (seconds)")
+    parser.add_argument("--mode", default=None, help="CURRENT_WEATHER_MODE for this run")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with FakeProvider(
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        seed=args.seed
+    ) as server:
+        configure_services(server, cache=args.cache)
+        if args.mode:
+            weather_api.CURRENT_WEATHER_MODE = args.mode
+
+        report = run_load(
+            sessions=args.sessions,
+            views=args.views,
+            cities=args.cities,
+            skew=args.skew,
+            think_ms=args.think_ms,
+            seed=args.seed,
+            budget=args.budget
+        )
+        report.upstream = dict(server.requests)
+
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
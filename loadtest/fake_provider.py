@@ -0,0 +1,341 @@
+"""
+Local stand-in for the OpenWeather and WeatherAPI endpoints.
+
+    python -m loadtest.fake_provider --latency-ms 150 --error-rate 0.02
+
+Then run the dashboard with the printed BASE_URL / WEATHERAPI_BASE_URL.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+OPENWEATHER_PREFIX = "/data/2.5"
+WEATHERAPI_PREFIX = "/v1"
+
+# Route -> (fixture provider, endpoint)
+ROUTES = {
+    f"{OPENWEATHER_PREFIX}/weather": ("openweather", "weather"),
+    f"{WEATHERAPI_PREFIX}/current.json": ("weatherapi", "current"),
+    f"{WEATHERAPI_PREFIX}/forecast.json": ("weatherapi", "forecast"),
+}
+
+# Synthetic conditions: (OpenWeather main, OpenWeather id, WeatherAPI text, WeatherAPI code)
+CONDITIONS = [
+    ("Clear", 800, "Sunny", 1000),
+    ("Clouds", 803, "Partly cloudy", 1003),
+    ("Rain", 500, "Light rain", 1183),
+    ("Drizzle", 300, "Light drizzle", 1153),
+    ("Snow", 600, "Light snow", 1213),
+    ("Thunderstorm", 200, "Thundery outbreaks possible", 1087),
+]
+
+
+# ==================================================
+# Payloads
+# ==================================================
+def _city_rng(city: str, seed: int) -> random.Random:
+    # Same city + seed -> same weather, across runs and processes
+    return random.Random(zlib.crc32(f"{seed}:{city.casefold()}".encode("utf-8")))
+
+
+def _weather(city: str, seed: int) -> dict:
+    rng = _city_rng(city, seed)
+    temp = round(rng.uniform(-5, 35), 2)
+    return {
+        "name": " ".join(city.split()).title(),
+        "lat": round(rng.uniform(-60, 70), 4),
+        "lon": round(rng.uniform(-180, 180), 4),
+        "temp": temp,
+        "feels_like": round(temp - rng.uniform(0, 3), 2),
+        "humidity": rng.randint(20, 100),
+        "pressure": rng.randint(980, 1040),
+        "wind": round(rng.uniform(0, 15), 2),
+        "condition": rng.choice(CONDITIONS),
+        "rng": rng,
+    }
+
+
+def synthetic_payload(provider: str, endpoint: str, city: str, days: int = 5, seed: int = 0) -> dict:
+    w = _weather(city, seed)
+    main, owm_id, text, code = w["condition"]
+
+    if provider == "openweather":
+        return {
+            "coord": {"lat": w["lat"], "lon": w["lon"]},
+            "weather": [{"id": owm_id, "main": main, "description": text.lower(), "icon": "01d"}],
+            "main": {
+                "temp": w["temp"],
+                "feels_like": w["feels_like"],
+                "temp_min": round(w["temp"] - 2, 2),
+                "temp_max": round(w["temp"] + 2, 2),
+                "pressure": w["pressure"],
+                "humidity": w["humidity"],
+            },
+            "wind": {"speed": w["wind"], "deg": 180},
+            "name": w["name"],
+            "cod": 200,
+        }
+
+    location = {"name": w["name"], "lat": w["lat"], "lon": w["lon"]}
+    condition = {"text": text, "code": code, "icon": "//cdn.weatherapi.com/weather/64x64/day/116.png"}
+    current = {
+        "temp_c": w["temp"],
+        "feelslike_c": w["feels_like"],
+        "humidity": w["humidity"],
+        "pressure_mb": float(w["pressure"]),
+        "wind_kph": round(w["wind"] * 3.6, 1),
+        "condition": condition,
+    }
+
+    if endpoint == "current":
+        return {"location": location, "current": current}
+
+    rng = w["rng"]
+    forecastday = []
+    for offset in range(days):
+        avg = round(w["temp"] + rng.uniform(-4, 4), 1)
+        forecastday.append({
+            "date": (date.today() + timedelta(days=offset)).isoformat(),
+            "day": {
+                "maxtemp_c": round(avg + rng.uniform(1, 5), 1),
+                "mintemp_c": round(avg - rng.uniform(1, 5), 1),
+                "avgtemp_c": avg,
+                "daily_chance_of_rain": rng.randint(0, 100),
+                "condition": condition,
+            },
+        })
+
+    return {"location": location, "current": current, "forecast": {"forecastday": forecastday}}
+
+
+def fixture_path(provider: str, endpoint: str, city: str, fixtures_dir: str = FIXTURES_DIR) -> str:
+    name = "_".join(city.casefold().split())
+    return os.path.join(fixtures_dir, f"{provider}_{endpoint}_{name}.json")
+
+
+def not_found_payload(provider: str) -> dict:
+    if provider == "openweather":
+        return {"cod": "404", "message": "city not found"}
+    return {"error": {"code": 1006, "message": "No matching location found."}}
+
+
+# ==================================================
+# Server
+# ==================================================
+class FakeProvider:
+    """
+    Local stand-in for OpenWeather and WeatherAPI.
+
+    Serves recorded payloads from `fixtures_dir` when one exists for the
+    city, synthetic (seeded, deterministic) ones otherwise. Each response
+    waits a latency drawn from a lognormal around `latency_ms`, and a
+    random `error_rate` / `timeout_rate` share of requests returns 500
+    or hangs. `script()` queues exact outcomes for tests. Cities in
+    `unknown_cities` get the provider's 404.
+
+    Point the app at it with BASE_URL=<openweather_url> and
+    WEATHERAPI_BASE_URL=<weatherapi_url>.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter: float = 0.25,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 30,
+        seed: int = 0,
+        fixtures_dir: str | None = FIXTURES_DIR,
+        unknown_cities=("atlantis",),
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.seed = seed
+        self.fixtures_dir = fixtures_dir
+        self.unknown_cities = {c.casefold() for c in unknown_cities}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._scripts = {}
+        self._stopping = threading.Event()
+        self.requests = {route: 0 for route in ROUTES}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._server.block_on_close = False
+        self._thread = None
+
+    # -----------------------------
+    # URLs
+    # -----------------------------
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openweather_url(self) -> str:
+        return self.url + OPENWEATHER_PREFIX
+
+    @property
+    def weatherapi_url(self) -> str:
+        return self.url + WEATHERAPI_PREFIX
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self) -> "FakeProvider":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="fake-provider",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -----------------------------
+    # Fault injection
+    # -----------------------------
+    def script(self, route: str, *outcomes):
+        """
+        Queue exact outcomes for the next requests to `route`
+        ("/data/2.5/weather", ...): "ok", "error", "timeout", "slow:<ms>".
+        """
+        with self._lock:
+            self._scripts.setdefault(route, []).extend(outcomes)
+
+    def _next_outcome(self, route: str) -> str:
+        with self._lock:
+            self.requests[route] += 1
+
+            queued = self._scripts.get(route)
+            if queued:
+                return queued.pop(0)
+
+            roll = self._rng.random()
+            if roll < self.timeout_rate:
+                return "timeout"
+            if roll < self.timeout_rate + self.error_rate:
+                return "error"
+
+            if self.latency_ms <= 0:
+                return "ok"
+            latency = self._rng.lognormvariate(0, self.jitter) * self.latency_ms
+            return f"slow:{latency:.1f}"
+
+    def _sleep(self, seconds: float):
+        # Wakes up early on stop() so hung requests do not block shutdown
+        self._stopping.wait(seconds)
+
+    def _payload(self, provider: str, endpoint: str, query: dict) -> tuple[int, dict]:
+        city = query.get("q", [""])[0]
+        if " ".join(city.split()).casefold() in self.unknown_cities:
+            return (404 if provider == "openweather" else 400), not_found_payload(provider)
+
+        if self.fixtures_dir:
+            path = fixture_path(provider, endpoint, city, self.fixtures_dir)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return 200, json.load(f)
+
+        days = int(query.get("days", ["5"])[0])
+        return 200, synthetic_payload(provider, endpoint, city, days, self.seed)
+
+    def _handler_class(self):
+        provider_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                route = ROUTES.get(parsed.path)
+                if route is None:
+                    self._send(404, {"message": "unknown route"})
+                    return
+
+                outcome = provider_server._next_outcome(parsed.path)
+
+                if outcome == "timeout":
+                    provider_server._sleep(provider_server.hang_seconds)
+                    return
+                if outcome == "error":
+                    self._send(500, {"message": "injected failure"})
+                    return
+                if outcome.startswith("slow:"):
+                    provider_server._sleep(float(outcome[5:]) / 1000)
+
+                status, payload = provider_server._payload(*route, parse_qs(parsed.query))
+                self._send(status, payload)
+
+            def _send(self, status: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (timeout)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake OpenWeather / WeatherAPI responses locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeProvider(
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        seed=args.seed,
+        port=args.port
+    ).start()
+
+    print(f"BASE_URL={server.openweather_url}")
+    print(f"WEATHERAPI_BASE_URL={server.weatherapi_url}")
+    print("Serving fake providers (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
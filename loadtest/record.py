@@ -0,0 +1,44 @@
+"""
+Record live provider responses as fake-provider fixtures.
+
+    python -m loadtest.record London "New York" Tokyo
+
+Needs the real API keys. Writes loadtest/fixtures/<provider>_<endpoint>_<city>.json,
+which FakeProvider then serves instead of synthetic payloads.
+"""
+import argparse
+import json
+import os
+
+from loadtest.fake_provider import FIXTURES_DIR, fixture_path
+from services.weather_api import (
+    fetch_current_weatherapi,
+    fetch_daily_forecast_weatherapi,
+    fetch_weather
+)
+
+RECORDERS = [
+    ("openweather", "weather", lambda city: fetch_weather(city, revalidate=True)),
+    ("weatherapi", "current", lambda city: fetch_current_weatherapi(city, revalidate=True)),
+    ("weatherapi", "forecast", lambda city: fetch_daily_forecast_weatherapi(city, 5, revalidate=True)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record live provider payloads as load-test fixtures")
+    parser.add_argument("cities", nargs="+")
+    parser.add_argument("--out", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+
+    for city in args.cities:
+        for provider, endpoint, fetch in RECORDERS:
+            path = fixture_path(provider, endpoint, city, args.out)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(fetch(city), f, indent=2)
+            print(f"  recorded  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,59 @@
-from storage.database import get_connection
+import argparse
+import sqlite3
+
+from storage.database import DB_PATH
+from storage.history_layout import LAYOUTS, copy_history
+from storage.migrations import (
+    LATEST_VERSION,
+    get_schema_version,
+    pending_migrations,
+    run_migrations
+)
+
 
 def main():
-    conn = get_connection()
-    conn.close()
-    print("Migration completed successfully!")
+    parser = argparse.ArgumentParser(description="Apply or report SQLite schema migrations")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="Only report the schema version and pending migrations"
+    )
+    parser.add_argument(
+        "--copy-history",
+        choices=sorted(LAYOUTS),
+        help="Copy raw history into this layout (run before switching HISTORY_LAYOUT)"
+    )
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        current = get_schema_version(conn)
+        print(f"Schema version: {current} (latest: {LATEST_VERSION})")
+
+        if args.status:
+            for version, description, _ in pending_migrations(conn):
+                print(f"  pending  {version:03d}  {description}")
+            return
+
+        applied = run_migrations(conn)
+
+        if args.copy_history:
+            source = "compact" if args.copy_history == "rowid" else "rowid"
+            copied = copy_history(conn, source, args.copy_history)
+            print(f"  copied   {copied} history rows {source} -> {args.copy_history}")
+    finally:
+        conn.close()
+
+    for version, description in applied:
+        print(f"  applied  {version:03d}  {description}")
+
+    if applied:
+        print("Migration completed successfully!")
+    else:
+        print("Database is already up to date.")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,34 @@
+import argparse
+
+from config.settings import HISTORY_RETENTION_DAYS, ACCURACY_RETENTION_DAYS, FORECAST_RETENTION_DAYS
+from storage.archive import PRUNED_TABLES, run_retention
+from storage.database import DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive cold history to Parquet, delete past forecasts and compact the SQLite database"
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--history-days", type=int, default=HISTORY_RETENTION_DAYS)
+    parser.add_argument("--accuracy-days", type=int, default=ACCURACY_RETENTION_DAYS)
+    parser.add_argument("--forecast-days", type=int, default=FORECAST_RETENTION_DAYS)
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM after archiving")
+    args = parser.parse_args()
+
+    archived = run_retention(
+        history_days=args.history_days,
+        accuracy_days=args.accuracy_days,
+        db_path=args.db,
+        vacuum=not args.no_vacuum,
+        forecast_days=args.forecast_days
+    )
+
+    for table, rows in archived.items():
+        print(f"  {table}: {rows} rows {'deleted' if table in PRUNED_TABLES else 'archived'}")
+
+    print("Retention completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
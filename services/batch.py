@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from config.settings import (
+    BATCH_MAX_WORKERS,
+    OPENWEATHER_MAX_CONCURRENCY,
+    WEATHERAPI_MAX_CONCURRENCY
+)
+from services.http_client import last_request_timing
+from services.weather_api import (
+    OPENWEATHER,
+    WEATHERAPI,
+    fetch_weather,
+    fetch_daily_forecast_weatherapi
+)
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Shared by every batch in the process, so two concurrent refreshes
+# together still respect each provider's limit
+_provider_slots = {
+    OPENWEATHER: threading.BoundedSemaphore(OPENWEATHER_MAX_CONCURRENCY),
+    WEATHERAPI: threading.BoundedSemaphore(WEATHERAPI_MAX_CONCURRENCY),
+}
+
+# Batches together hold at most all but one of a provider's slots, so
+# an interactive call always finds one free
+_batch_slots = {
+    OPENWEATHER: threading.BoundedSemaphore(max(1, OPENWEATHER_MAX_CONCURRENCY - 1)),
+    WEATHERAPI: threading.BoundedSemaphore(max(1, WEATHERAPI_MAX_CONCURRENCY - 1)),
+}
+
+# Interactive calls (submit_timed) and bulk batches use separate pools,
+# so a large batch never queues ahead of a user's request
+_executor = ThreadPoolExecutor(
+    max_workers=BATCH_MAX_WORKERS,
+    thread_name_prefix="weather-fetch"
+)
+_batch_executor = ThreadPoolExecutor(
+    max_workers=BATCH_MAX_WORKERS,
+    thread_name_prefix="weather-batch"
+)
+
+
+@dataclass
+class BatchResult:
+    results: dict = field(default_factory=dict)  # city -> provider payload
+    errors: dict = field(default_factory=dict)   # city -> exception
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+@dataclass
+class TimedCall:
+    payload: dict
+    latency: float
+    timing: object  # services.http_client.RequestTiming of the last attempt
+
+
+def _limited(provider: str, fn, *args):
+    with _provider_slots[provider]:
+        return fn(*args)
+
+
+def _batched(provider: str, fn, *args):
+    with _batch_slots[provider]:
+        return _limited(provider, fn, *args)
+
+
+def _unique(cities) -> list:
+    seen = {}
+    for city in cities:
+        city = city.strip()
+        if city:
+            seen.setdefault(city.casefold(), city)
+    return list(seen.values())
+
+
+def _run_batch(provider: str, fn, cities, *args) -> BatchResult:
+    batch = BatchResult()
+    cities = _unique(cities)
+
+    futures = {
+        _batch_executor.submit(_batched, provider, fn, city, *args): city
+        for city in cities
+    }
+
+    for future in as_completed(futures):
+        city = futures[future]
+        try:
+            batch.results[city] = future.result()
+        except Exception as e:
+            batch.errors[city] = e
+
+    logger.info(
+        f"[Batch] {provider} | cities={len(cities)} | "
+        f"ok={len(batch.results)} | failed={len(batch.errors)}"
+    )
+    return batch
+
+
+# ==================================================
+# Public API
+# ==================================================
+def fetch_weather_many(cities) -> BatchResult:
+    """
+    Current weather for many cities in parallel (bounded per provider).
+    Failures are reported per city instead of failing the batch.
+    """
+    return _run_batch(OPENWEATHER, fetch_weather, cities)
+
+
+def fetch_forecast_many(cities, days: int = 5) -> BatchResult:
+    """
+    WeatherAPI daily forecasts for many cities in parallel.
+    """
+    return _run_batch(WEATHERAPI, fetch_daily_forecast_weatherapi, cities, days)
+
+
+def submit_timed(provider: str, fn, *args) -> Future:
+    """
+    Run one provider call in the background. The Future resolves to a
+    TimedCall, because the request timing is only visible on the
+    worker thread.
+    """
+    def call():
+        start = time.time()
+        payload = _limited(provider, fn, *args)
+        return TimedCall(payload, time.time() - start, last_request_timing(provider))
+
+    return _executor.submit(call)
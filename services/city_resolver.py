@@ -0,0 +1,120 @@
+import bisect
+import difflib
+import threading
+import time
+from concurrent.futures import Future
+
+from config.settings import CITY_INDEX_RELOAD_SECONDS, CITY_FUZZY_CUTOFF
+from storage.cities import city_key
+from storage.database import fetch_city_index
+from storage.writer import get_writer
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class CityResolver:
+    """
+    Maps whatever the user typed to the canonical city name.
+
+    Aliases are learned from provider answers ("new delhi" -> "Delhi")
+    and persisted in city_aliases, so "delhi", "Delhi " and "New Delhi"
+    end up as one provider call, one cache key and one history. A
+    sorted in-memory key list serves prefix suggestions (bisect) with a
+    difflib fallback for typos.
+    """
+
+    def __init__(
+        self,
+        reload_seconds: float = CITY_INDEX_RELOAD_SECONDS,
+        fuzzy_cutoff: float = CITY_FUZZY_CUTOFF
+    ):
+        self.reload_seconds = reload_seconds
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._lock = threading.Lock()
+        self._names = {}  # key -> canonical name
+        self._keys = []   # sorted keys of _names
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.reload_seconds:
+            return
+
+        try:
+            rows = fetch_city_index()
+        except Exception as e:
+            logger.error(f"[Cities] Could not load city index | error={str(e)}")
+            rows = []
+
+        with self._lock:
+            # Keep aliases learned since the last load that may not be committed yet
+            names = dict(self._names)
+            names.update(rows)
+            self._names = names
+            self._keys = sorted(names)
+            self._loaded_at = now
+
+    def resolve(self, name: str) -> str:
+        """
+        Canonical name for `name`, or `name` tidied up if it is unknown.
+        """
+        self._ensure_loaded()
+        key = city_key(name)
+        return self._names.get(key) or " ".join(str(name).split())
+
+    def learn(self, alias: str, city: str) -> Future | None:
+        """
+        Remember that `alias` means `city` (the provider's answer).
+        Returns the pending alias write, if any.
+        """
+        updates = {city_key(alias): city, city_key(city): city}
+
+        with self._lock:
+            for key, name in updates.items():
+                if key and key not in self._names:
+                    bisect.insort(self._keys, key)
+                if key:
+                    self._names[key] = name
+
+        if city_key(alias) == city_key(city):
+            return None
+        return get_writer().insert_city_alias(alias, city)
+
+    def suggest(self, text: str, limit: int = 5) -> list[str]:
+        """
+        Canonical names whose name or alias starts with `text`, topped
+        up with close fuzzy matches.
+        """
+        self._ensure_loaded()
+        prefix = city_key(text)
+        if not prefix:
+            return []
+
+        with self._lock:
+            keys, names = self._keys, self._names
+
+            start = bisect.bisect_left(keys, prefix)
+            matches = []
+            for key in keys[start:]:
+                if not key.startswith(prefix) or len(matches) >= limit * 4:
+                    break
+                matches.append(key)
+
+            if len(matches) < limit:
+                matches += difflib.get_close_matches(prefix, keys, n=limit, cutoff=self.fuzzy_cutoff)
+
+            # Several aliases can point at the same city
+            suggestions = list(dict.fromkeys(names[key] for key in matches))
+
+        return suggestions[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._names = {}
+            self._keys = []
+            self._loaded_at = None
+
+
+CITY_RESOLVER = CityResolver()
@@ -0,0 +1,22 @@
+class WeatherAPIError(Exception):
+    """Custom exception for weather API failures"""
+    pass
+
+
+class RateLimitExceeded(WeatherAPIError):
+    """Request refused locally to stay inside a provider's rate or quota"""
+
+    def __init__(self, provider: str, reason: str, retry_after: float | None = None):
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{provider} {reason} exceeded")
+
+
+class CircuitOpenError(WeatherAPIError):
+    """Provider endpoint is failing; calls are refused until it recovers"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is unavailable; retrying in {retry_after:.0f}s")
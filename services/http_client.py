@@ -0,0 +1,150 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config.settings import HTTP_POOL_SIZE
+
+# Handshake time of the request currently running on this thread
+_connect = threading.local()
+
+
+def _timed_connect(connect):
+    def wrapper(self):
+        start = time.perf_counter()
+        try:
+            connect(self)
+        finally:
+            _connect.seconds = getattr(_connect, "seconds", 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    connect = _timed_connect(HTTPConnection.connect)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    # TCP connect + TLS handshake
+    connect = _timed_connect(HTTPSConnection.connect)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose pooled connections report their handshake time.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+@dataclass
+class RequestTiming:
+    connect: float   # TCP + TLS handshake; 0 when a kept-alive connection was reused
+    wait: float      # request sent -> response headers (server time + network)
+    transfer: float  # response body download
+    total: float
+
+    @property
+    def reused(self) -> bool:
+        return self.connect == 0
+
+
+class ProviderClient:
+    """
+    Long-lived keep-alive session for one weather provider.
+
+    The urllib3 pool behind the session is thread-safe, so one client is
+    shared by every Streamlit session thread; at most `pool_size`
+    connections are kept open to the provider's host.
+    """
+
+    def __init__(self, name: str, pool_size: int = HTTP_POOL_SIZE):
+        self.name = name
+        self.session = requests.Session()
+
+        adapter = TimedHTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._last = threading.local()
+
+    def get(self, url: str, params: dict, timeout: float) -> requests.Response:
+        _connect.seconds = 0.0
+        start = time.perf_counter()
+
+        response = self.session.get(url, params=params, timeout=timeout, stream=True)
+        headers_at = time.perf_counter()
+
+        try:
+            response.content  # download the body now so transfer is timed
+        finally:
+            response.close()  # returns the connection to the pool
+
+        end = time.perf_counter()
+        connect = _connect.seconds
+
+        self._last.timing = RequestTiming(
+            connect=connect,
+            wait=headers_at - start - connect,
+            transfer=end - headers_at,
+            total=end - start
+        )
+        return response
+
+    @property
+    def last_timing(self) -> RequestTiming | None:
+        """
+        Timing of the last request made by the calling thread.
+        """
+        return getattr(self._last, "timing", None)
+
+    def clear_timing(self):
+        """
+        Forget the calling thread's last timing, e.g. before a call that
+        may be answered without touching the network.
+        """
+        self._last.timing = None
+
+
+# ==================================================
+# One client per provider, created on first use
+# ==================================================
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider: str) -> ProviderClient:
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(provider)
+        if client is None:
+            client = ProviderClient(provider)
+            _clients[provider] = client
+    return client
+
+
+def last_request_timing(provider: str) -> RequestTiming | None:
+    return get_client(provider).last_timing
@@ -0,0 +1,236 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from config.settings import RATE_LIMIT_MAX_WAIT
+from services.errors import RateLimitExceeded
+from storage.database import fetch_api_usage
+from storage.writer import get_writer
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate_per_minute`, holds at most
+    `burst` tokens. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self) -> float:
+        """
+        Take a token if one is available. Returns 0 on success, otherwise
+        the seconds until the next token.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            return (1 - self._tokens) / self.rate
+
+    def take(self, wait: bool, timeout: float) -> tuple[bool, float]:
+        """
+        (granted, retry_after). With `wait`, sleeps for a token for up to
+        `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            delay = self.try_take()
+            if delay == 0:
+                return True, 0.0
+
+            if not wait or time.monotonic() + delay > deadline:
+                return False, delay
+
+            time.sleep(delay)
+
+    def give_back(self):
+        """
+        Return a token taken for a request that was never sent.
+        """
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_to_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+class ProviderLimiter:
+    """
+    Per-minute token bucket plus a daily quota for one provider key.
+
+    Daily counters are loaded from the api_usage table on first use each
+    UTC day and every granted / rejected request is recorded through the
+    group-commit writer, so quota use survives restarts. With a quota,
+    each request is checked and counted in api_usage in one write
+    transaction, so the app and the worker share a single daily count.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        rate_per_minute: float,
+        burst: int,
+        daily_quota: int = 0,
+        max_wait: float = RATE_LIMIT_MAX_WAIT,
+        persist: bool = True
+    ):
+        self.provider = provider
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.daily_quota = daily_quota
+        self.max_wait = max_wait
+        self.persist = persist
+
+        self._lock = threading.Lock()
+        self._day = None
+        self.requests = 0
+        self.rejected = 0
+
+    def acquire(self, wait: bool = True, timeout: float | None = None) -> str:
+        """
+        Reserve one request or raise RateLimitExceeded. Returns the UTC
+        day the request was counted against (for `release`).
+
+        `wait=True` sleeps (up to `timeout`, default max_wait) for the
+        per-minute limit; `wait=False` fails fast. An exhausted daily
+        quota always fails fast.
+        """
+        # Reserve quota before waiting so concurrent callers cannot overshoot
+        day, counted = self._reserve_daily()
+
+        granted, retry_after = self.bucket.take(
+            wait,
+            self.max_wait if timeout is None else timeout
+        )
+
+        with self._lock:
+            if not granted:
+                if self._day == day:
+                    self.requests -= 1
+                    self.rejected += 1
+                self._record(day, requests=-1 if counted else 0, rejected=1)
+                raise RateLimitExceeded(self.provider, "rate limit", retry_after)
+
+            if not counted:
+                self._record(day, requests=1)
+
+        return day
+
+    def _reserve_daily(self) -> tuple[str, bool]:
+        """
+        Count one request against today's quota, or raise. Returns the
+        day and whether api_usage already counted it.
+        """
+        with self._lock:
+            self._roll_day()
+            day = self._day
+
+        if self.persist and self.daily_quota:
+            try:
+                granted, requests = get_writer().reserve_api_quota(
+                    self.provider, day, self.daily_quota
+                ).result()
+            except Exception as e:
+                # Fall back to this process's own count
+                logger.error(f"[RateLimit] Could not reserve quota | provider={self.provider} | error={str(e)}")
+            else:
+                with self._lock:
+                    if self._day == day:
+                        self.requests = requests
+                    if not granted:
+                        if self._day == day:
+                            self.rejected += 1
+                        self._record(day, rejected=1)
+                        raise RateLimitExceeded(self.provider, "daily quota", _seconds_to_utc_midnight())
+                return day, True
+
+        with self._lock:
+            if self.daily_quota and self.requests >= self.daily_quota:
+                self.rejected += 1
+                self._record(day, rejected=1)
+                raise RateLimitExceeded(self.provider, "daily quota", _seconds_to_utc_midnight())
+
+            self.requests += 1
+
+        return day, False
+
+    def release(self, day: str):
+        """
+        Hand back a reservation from `acquire` whose request was never
+        sent (e.g. the caller's time budget ran out while it waited).
+        """
+        self.bucket.give_back()
+
+        with self._lock:
+            if self._day == day:
+                self.requests -= 1
+            self._record(day, requests=-1)
+
+    def _roll_day(self):
+        day = _utc_day()
+        if day == self._day:
+            return
+
+        self._day = day
+        self.requests, self.rejected = 0, 0
+
+        if self.persist:
+            try:
+                self.requests, self.rejected = fetch_api_usage(self.provider, day)
+            except Exception as e:
+                logger.error(f"[RateLimit] Could not load usage | provider={self.provider} | error={str(e)}")
+
+    def _record(self, day: str, requests: int = 0, rejected: int = 0):
+        if not self.persist:
+            return
+
+        try:
+            future = get_writer().insert_api_usage(self.provider, day, requests, rejected)
+        except Exception as e:
+            logger.error(f"[RateLimit] Could not record usage | provider={self.provider} | error={str(e)}")
+            return
+
+        future.add_done_callback(self._log_failure)
+
+    def _log_failure(self, future):
+        if future.exception() is not None:
+            logger.error(
+                f"[RateLimit] Could not record usage | provider={self.provider} | error={str(future.exception())}"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._roll_day()
+            return {
+                "day": self._day,
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "daily_quota": self.daily_quota,
+                "remaining": max(0, self.daily_quota - self.requests) if self.daily_quota else None,
+            }
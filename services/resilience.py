@@ -0,0 +1,280 @@
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+from config.settings import (
+    REQUEST_TIMEOUT,
+    TIMEOUT_MIN,
+    TIMEOUT_MULTIPLIER,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS
+)
+from services.errors import CircuitOpenError
+
+
+class TransientError(Exception):
+    """Provider answered with a retryable status (429 / 5xx)"""
+    pass
+
+
+# Failures worth retrying and counting against the circuit. Anything
+# else (bad city, bad key) means the provider is up and answering.
+RETRYABLE = (
+    requests.exceptions.Timeout,
+    requests.exceptions.ConnectionError,
+    TransientError,
+)
+
+
+class Deadline:
+    """
+    Caller's total time budget for one logical call.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class LatencyTracker:
+    """
+    Sliding window of successful call latencies. The per-attempt timeout
+    is a multiple of the window's p99, so a fast endpoint gives up on a
+    hung request in a few seconds instead of REQUEST_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        multiplier: float = TIMEOUT_MULTIPLIER,
+        floor: float = TIMEOUT_MIN,
+        ceiling: float = REQUEST_TIMEOUT
+    ):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def timeout(self) -> float:
+        with self._lock:
+            warm = len(self._samples) >= self.min_samples
+
+        if not warm:
+            return self.ceiling
+
+        return min(self.ceiling, max(self.floor, self.percentile(99) * self.multiplier))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures.
+    open -> half-open after `reset_seconds`: one trial call goes through,
+    every other call is refused. The trial closes the circuit on success
+    and re-opens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._cooled_down():
+                return self.HALF_OPEN
+            return self._state
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may go through now.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            if self._state == self.OPEN and self._cooled_down():
+                self._state = self.HALF_OPEN
+
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+            retry_after = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after)
+
+    def release(self):
+        """
+        Give back an admitted call that never reached the provider.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """
+    Exponential backoff with full jitter for retry number `attempt` (0-based).
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class EndpointPolicy:
+    """
+    Circuit breaker, adaptive timeout and retry schedule for one
+    provider endpoint.
+    """
+
+    def __init__(self, name: str, max_attempts: int = RETRY_MAX_ATTEMPTS):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker()
+
+    def call(self, attempt, deadline: Deadline, before_attempt=None, abandon_attempt=None):
+        """
+        Run `attempt(timeout)` until it succeeds, a non-retryable error
+        is raised, attempts run out or `deadline` would be passed.
+        Retryable failures re-raise the last error.
+
+        `before_attempt()` runs once the breaker has admitted an attempt
+        (e.g. to take a rate-limit token); if it raises, the attempt is
+        abandoned without counting against the circuit. If it used up
+        the deadline, `abandon_attempt()` hands its reservation back.
+        """
+        last_error = None
+
+        for n in range(self.max_attempts):
+            # Nothing is reserved for an attempt that could not run
+            if deadline.remaining() <= 0:
+                break
+
+            self.breaker.before_call()
+
+            if before_attempt is not None:
+                try:
+                    before_attempt()
+                except BaseException:
+                    self.breaker.release()
+                    raise
+
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                self.breaker.release()
+                if abandon_attempt is not None:
+                    abandon_attempt()
+                break
+
+            start = time.monotonic()
+            try:
+                result = attempt(min(self.latency.timeout(), remaining))
+            except RETRYABLE as e:
+                self.breaker.record_failure()
+                last_error = e
+            except Exception:
+                self.breaker.record_success()
+                raise
+            else:
+                self.latency.record(time.monotonic() - start)
+                self.breaker.record_success()
+                return result
+
+            if n + 1 == self.max_attempts:
+                break
+
+            delay = backoff_delay(n)
+            if delay >= deadline.remaining():
+                break
+            time.sleep(delay)
+
+        raise last_error or requests.exceptions.Timeout(f"{self.name}: time budget exhausted")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "timeout": self.latency.timeout(),
+            "p50": self.latency.percentile(50),
+            "p99": self.latency.percentile(99),
+        }
+
+
+# ==================================================
+# One policy per provider endpoint, created on first use
+# ==================================================
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(provider: str, endpoint: str) -> EndpointPolicy:
+    key = (provider, endpoint)
+
+    with _policies_lock:
+        policy = _policies.get(key)
+        if policy is None:
+            policy = EndpointPolicy(f"{provider}/{endpoint}")
+            _policies[key] = policy
+
+    return policy
+
+
+def policy_stats() -> dict:
+    with _policies_lock:
+        policies = dict(_policies)
+
+    return {f"{provider}/{endpoint}": policy.stats() for (provider, endpoint), policy in policies.items()}
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cachetools import LRUCache
+
+from config.settings import (
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_DISK_MB,
+    RESPONSE_CACHE_MAX_STALE
+)
+
+# After an eviction the disk tier is trimmed to this share of its cap,
+# so the directory is not rescanned on every put
+DISK_LOW_WATER = 0.9
+
+
+class ResponseCache:
+    """
+    Two-tier cache of parsed provider responses.
+
+    Entries are kept as encoded JSON: a bounded LRU in memory, backed by
+    one file per key under `cache_dir` so they survive restarts. Freshness
+    is decided by the caller's TTL at read time, which lets an expired
+    entry still be served (get_stale) while the provider is failing.
+    Entries older than `max_stale` are dropped from both tiers. The disk
+    tier is capped at `max_disk_bytes`: a put that goes over it sweeps
+    files past max_stale, then the least recently written ones. Its size
+    and entry count are kept as running totals (the directory is scanned
+    once per process), so stats() stays cheap.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        cache_dir: str | None = RESPONSE_CACHE_DIR,
+        max_stale: float = RESPONSE_CACHE_MAX_STALE,
+        max_disk_bytes: int = int(RESPONSE_CACHE_DISK_MB * 1024 * 1024)
+    ):
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.cache_dir = cache_dir
+        self.max_stale = max_stale
+        self.max_disk_bytes = max_disk_bytes
+
+        # Running totals for the disk tier, scanned on first use
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None
+        self._disk_entries = 0
+        self.disk_evictions = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale_served = 0
+
+    def get(self, key: tuple, ttl: float) -> dict | None:
+        """
+        Payload stored under `key` if it is younger than `ttl` seconds.
+        """
+        entry, tier = self._lookup(key)
+
+        with self._lock:
+            if entry is None or time.time() - entry[0] > ttl:
+                self.misses += 1
+                return None
+
+            if tier == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+
+        return json.loads(entry[1])
+
+    def get_stale(self, key: tuple) -> dict | None:
+        """
+        Payload stored under `key` regardless of age (up to max_stale).
+        """
+        entry, _ = self._lookup(key)
+        if entry is None:
+            return None
+
+        with self._lock:
+            self.stale_served += 1
+        return json.loads(entry[1])
+
+    def put(self, key: tuple, payload: dict):
+        entry = (time.time(), json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+        with self._lock:
+            self._memory[key] = entry
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = None
+
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(entry[1])
+            os.utime(tmp, (entry[0], entry[0]))
+            os.replace(tmp, path)
+
+            self._grow_disk(len(entry[1]) - (replaced or 0), 1 if replaced is None else 0)
+
+    # -----------------------------
+    # Disk tier size cap
+    # -----------------------------
+    def _disk_files(self) -> list:
+        # (mtime, size, path) of every entry file, oldest first
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(files)
+
+    def _scan_disk(self):
+        # Caller holds _disk_lock
+        files = self._disk_files() if os.path.isdir(self.cache_dir) else []
+        self._disk_bytes = sum(size for _, size, _ in files)
+        self._disk_entries = len(files)
+
+    def _grow_disk(self, delta: int, entries: int):
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                # The scan already sees this change
+                self._scan_disk()
+            else:
+                self._disk_bytes += delta
+                self._disk_entries += entries
+
+            if self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes:
+                self._disk_bytes, self._disk_entries = self._evict_disk()
+
+    def _evict_disk(self) -> tuple[int, int]:
+        """
+        Drop files past max_stale, then the oldest until the tier is
+        under its low-water mark. Returns (bytes, files) left on disk.
+        """
+        now = time.time()
+        target = self.max_disk_bytes * DISK_LOW_WATER
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        left = len(files)
+
+        for stored_at, size, path in files:
+            if total <= target and now - stored_at <= self.max_stale:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            left -= 1
+            self.disk_evictions += 1
+
+        return total, left
+
+    def _lookup(self, key: tuple):
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.max_stale:
+                    return entry, "memory"
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        if entry is None:
+            return None, None
+
+        with self._lock:
+            self._memory[key] = entry
+        return entry, "disk"
+
+    def _read_disk(self, key: tuple, now: float):
+        if not self.cache_dir:
+            return None
+
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            stored_at = stat.st_mtime
+            if now - stored_at > self.max_stale:
+                os.remove(path)
+                self._grow_disk(-stat.st_size, -1)
+                return None
+            with open(path, "rb") as f:
+                return stored_at, f.read()
+        except OSError:
+            return None
+
+    def _path(self, key: tuple) -> str:
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+
+        with self._disk_lock:
+            self._disk_bytes, self._disk_entries = 0, 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            memory_bytes = sum(len(entry[1]) for entry in self._memory.values())
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale_served": self.stale_served,
+                "hit_ratio": hits / lookups if lookups else None,
+                "entries": len(self._memory),
+                "memory_bytes": memory_bytes,
+                "disk_evictions": self.disk_evictions,
+            }
+
+        stats["disk_bytes"], stats["disk_entries"] = 0, 0
+        if self.cache_dir:
+            with self._disk_lock:
+                if self._disk_bytes is None:
+                    self._scan_disk()
+                stats["disk_bytes"], stats["disk_entries"] = self._disk_bytes, self._disk_entries
+        return stats
+
+
+RESPONSE_CACHE = ResponseCache()
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analytics.processor import enrich_features, extract_features
+from analytics.weatherapi_forecast_processor import process_weatherapi_forecast
+from config.settings import (
+    CURRENT_WEATHER_TTL,
+    FORECAST_TTL,
+    WATCHLIST_SIZE,
+    WATCHLIST_HOT_HOURS,
+    SCHEDULER_TICK_SECONDS,
+    SCHEDULER_MAX_PER_TICK,
+    SCHEDULER_REFRESH_AHEAD
+)
+from services.errors import WeatherAPIError
+from services.weather_api import fetch_current_weather, fetch_daily_forecast_weatherapi
+from storage.cities import city_key
+from storage.database import fetch_watchlist
+from storage.writer import get_writer
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+# -----------------------------
+# Refresh jobs: provider -> SQLite through the normal write path
+# -----------------------------
+def refresh_current(city: str):
+    current = fetch_current_weather(city, wait=False, revalidate=True)
+    features = extract_features(current.raw, current.provider)
+    if current.fallback:
+        # Measurements only: the watchlist name stays the stored one
+        features["city"] = city
+    features = enrich_features(features)
+    get_writer().insert_weather(features).result()
+
+
+def refresh_forecast(city: str, days: int = 5):
+    raw = fetch_daily_forecast_weatherapi(city, days, wait=False, revalidate=True)
+    get_writer().insert_forecast(city, process_weatherapi_forecast(raw)).result()
+
+
+# kind -> (response TTL, job)
+REFRESH_JOBS = {
+    "current": (CURRENT_WEATHER_TTL, refresh_current),
+    "forecast": (FORECAST_TTL, refresh_forecast),
+}
+
+
+class RefreshScheduler:
+    """
+    Keeps the watchlist's hot cities fresh in SQLite ahead of expiry.
+
+    Every tick it reads the watchlist, and refreshes at most
+    `max_per_tick` (city, kind) pairs whose due time has passed, oldest
+    first. New cities get a random first due time within the refresh
+    interval, and every next due time is jittered, so refreshes spread
+    out instead of expiring together. Refreshes fail fast on provider
+    rate limits (wait=False) so they never queue ahead of users.
+    """
+
+    def __init__(
+        self,
+        tick: float = SCHEDULER_TICK_SECONDS,
+        max_per_tick: int = SCHEDULER_MAX_PER_TICK,
+        watchlist_size: int = WATCHLIST_SIZE,
+        hot_hours: float = WATCHLIST_HOT_HOURS,
+        refresh_ahead: float = SCHEDULER_REFRESH_AHEAD,
+        jobs: dict | None = None
+    ):
+        self.tick = tick
+        self.max_per_tick = max(1, max_per_tick)
+        self.watchlist_size = watchlist_size
+        self.hot_hours = hot_hours
+        self.refresh_ahead = refresh_ahead
+        self.jobs = jobs or REFRESH_JOBS
+
+        self._due = {}  # (city key, kind) -> monotonic due time
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_per_tick,
+            thread_name_prefix="weather-refresh"
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refreshed = 0
+        self.failed = 0
+        self.watching = 0
+
+    def interval(self, kind: str) -> float:
+        return self.jobs[kind][0] * self.refresh_ahead
+
+    def run_once(self) -> list:
+        """
+        One scheduling pass. Returns the (city, kind, ok) refreshes run.
+        """
+        cities = fetch_watchlist(self.watchlist_size, self.hot_hours)
+        now = time.monotonic()
+
+        due = []
+        watched = set()
+        for city in cities:
+            for kind in self.jobs:
+                key = (city_key(city), kind)
+                watched.add(key)
+
+                if key not in self._due:
+                    # just viewed, so fresh now: first refresh at a random point of the interval
+                    self._due[key] = now + random.uniform(0, self.interval(kind))
+
+                if self._due[key] <= now:
+                    due.append((self._due[key], city, kind))
+
+        # Cities that dropped off the watchlist stop being refreshed
+        for key in set(self._due) - watched:
+            del self._due[key]
+        self.watching = len(cities)
+
+        due.sort()
+        batch = due[:self.max_per_tick]
+        futures = [
+            (city, kind, self._executor.submit(self.jobs[kind][1], city))
+            for _, city, kind in batch
+        ]
+
+        results = []
+        for city, kind, future in futures:
+            key = (city_key(city), kind)
+            interval = self.interval(kind)
+
+            try:
+                future.result()
+            except Exception as e:
+                # Provider errors are expected; anything else (sqlite3.Error
+                # from the writer, a malformed payload) also only fails this key
+                log = logger.warning if isinstance(e, (WeatherAPIError, ValueError)) else logger.error
+                log(f"[Scheduler] Refresh failed | city={city} | kind={kind} | error={type(e).__name__}: {str(e)}")
+                self.failed += 1
+                # Try again sooner, still jittered
+                self._due[key] = time.monotonic() + random.uniform(0.2, 0.3) * interval
+                results.append((city, kind, False))
+                continue
+
+            self.refreshed += 1
+            self._due[key] = time.monotonic() + random.uniform(0.9, 1.0) * interval
+            results.append((city, kind, True))
+
+        return results
+
+    # -----------------------------
+    # Background thread
+    # -----------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self.run_forever,
+            name="refresh-scheduler",
+            daemon=True
+        )
+        self._thread.start()
+
+    def run_forever(self):
+        logger.info(f"[Scheduler] Started | tick={self.tick}s | watchlist={self.watchlist_size}")
+
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[Scheduler] Pass failed | error={str(e)}")
+
+            self._stop.wait(self.tick)
+
+    def stop(self, timeout: float | None = 5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "watching": self.watching,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+        }
+
+
+# ==================================================
+# One in-process scheduler, started on first use
+# ==================================================
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler() -> RefreshScheduler:
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RefreshScheduler()
+            _scheduler.start()
+
+    return _scheduler
@@ -0,0 +1,59 @@
+import copy
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent calls into one.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still in flight wait for it and get a copy of the same result (or the
+    same exception). Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # followers get their own copy so nobody mutates a shared dict
+            return copy.deepcopy(call.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            call.set_exception(e)
+            raise
+
+        self._finish(key)
+        call.set_result(result)
+        return result
+
+    def _finish(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.calls + self.coalesced
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesce_ratio": self.coalesced / total if total else None,
+            }
@@ -1,27 +1,220 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from dataclasses import dataclass
 import time
+
 import requests
 
+from services.errors import CircuitOpenError, WeatherAPIError
+from services.http_client import RequestTiming, get_client
+from services.rate_limit import ProviderLimiter
+from services.resilience import Deadline, TransientError, get_policy, policy_stats
+from services.response_cache import RESPONSE_CACHE
+from services.singleflight import SingleFlight
 from utils.logger import setup_logger
 from config.settings import (
     WEATHER_API_KEY,
     BASE_URL,
     WEATHERAPI_KEY,
     WEATHERAPI_BASE_URL,
-    REQUEST_TIMEOUT
+    REQUEST_BUDGET,
+    CURRENT_WEATHER_TTL,
+    FORECAST_TTL,
+    OPENWEATHER_RATE_PER_MINUTE,
+    OPENWEATHER_BURST,
+    OPENWEATHER_DAILY_QUOTA,
+    WEATHERAPI_RATE_PER_MINUTE,
+    WEATHERAPI_BURST,
+    WEATHERAPI_DAILY_QUOTA,
+    CURRENT_WEATHER_MODE,
+    CURRENT_WEATHER_PRIMARY,
+    HEDGE_DELAY_DEFAULT,
+    BATCH_MAX_WORKERS
 )
 
 logger = setup_logger()
 
+OPENWEATHER = "openweather"
+WEATHERAPI = "weatherapi"
+
+
+# ==================================================
+# Rate limits and daily quota per provider key
+# ==================================================
+LIMITERS = {
+    OPENWEATHER: ProviderLimiter(
+        OPENWEATHER,
+        OPENWEATHER_RATE_PER_MINUTE,
+        OPENWEATHER_BURST,
+        OPENWEATHER_DAILY_QUOTA
+    ),
+    WEATHERAPI: ProviderLimiter(
+        WEATHERAPI,
+        WEATHERAPI_RATE_PER_MINUTE,
+        WEATHERAPI_BURST,
+        WEATHERAPI_DAILY_QUOTA
+    ),
+}
+
+
+def api_usage_stats() -> dict:
+    """
+    Today's request / rejection counts and remaining quota per provider.
+    """
+    return {provider: limiter.stats() for provider, limiter in LIMITERS.items()}
+
+
+# ==================================================
+# Single-flight: identical in-flight calls share one request
+# ==================================================
+_flights = SingleFlight()
+
+# Credentials never take part in the key
+_SECRET_PARAMS = {"appid", "key"}
+
+
+def _flight_key(provider: str, endpoint: str, params: dict) -> tuple:
+    normalized = []
+    for name, value in params.items():
+        if name in _SECRET_PARAMS:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split()).casefold()
+        normalized.append((name, value))
+    return provider, endpoint, tuple(sorted(normalized))
+
 
-class WeatherAPIError(Exception):
-    """Custom exception for weather API failures"""
-    pass
+def coalescing_stats() -> dict:
+    """
+    Upstream calls made vs calls served by joining one already in flight.
+    """
+    return _flights.stats()
+
+
+# ==================================================
+# Response cache: fresh hits skip the network, stale
+# entries cover provider failures
+# ==================================================
+RESPONSE_TTLS = {
+    "weather": CURRENT_WEATHER_TTL,
+    "current.json": CURRENT_WEATHER_TTL,
+    "forecast.json": FORECAST_TTL,
+}
+
+
+def _cached_call(
+    provider: str,
+    endpoint: str,
+    params: dict,
+    city: str,
+    attempt,
+    wait: bool = True,
+    budget: float | None = None,
+    revalidate: bool = False
+) -> dict:
+    """
+    Serve `endpoint` from the response cache, or run `attempt(timeout)`
+    under the provider's rate limit and the endpoint's resilience policy.
+    Identical concurrent calls share one upstream request.
+    `revalidate` skips the fresh-cache lookup (background refresh).
+    """
+    key = _flight_key(provider, endpoint, params)
+    get_client(provider).clear_timing()
+
+    if not revalidate:
+        payload = RESPONSE_CACHE.get(key, RESPONSE_TTLS[endpoint])
+        if payload is not None:
+            return payload
+
+    deadline = Deadline(REQUEST_BUDGET if budget is None else budget)
+    limiter = LIMITERS[provider]
+
+    reserved = []
+
+    def reserve():
+        reserved.append(
+            limiter.acquire(wait=wait, timeout=min(limiter.max_wait, deadline.remaining()))
+        )
+
+    def unreserve():
+        limiter.release(reserved.pop())
+
+    def fetch_and_store():
+        payload = _call_with_policy(provider, endpoint, city, attempt, deadline, reserve, unreserve)
+        RESPONSE_CACHE.put(key, payload)
+        return payload
+
+    try:
+        return _flights.do(key, fetch_and_store)
+    except WeatherAPIError as e:
+        stale = RESPONSE_CACHE.get_stale(key)
+        if stale is None:
+            raise
+        logger.warning(f"[{provider}] Serving stale {endpoint} response | key={key[2]} | error={e}")
+        return stale
+
+
+# ==================================================
+# Resilience: retries with backoff, adaptive timeouts,
+# circuit breaker, all inside the caller's time budget
+# ==================================================
+def _raise_for_transient(response):
+    if response.status_code == 429 or response.status_code >= 500:
+        raise TransientError(f"HTTP {response.status_code}")
+
+
+def _call_with_policy(
+    provider: str,
+    endpoint: str,
+    city: str,
+    attempt,
+    deadline: Deadline,
+    reserve,
+    unreserve
+) -> dict:
+    label = f"[{provider}] {endpoint}"
+
+    try:
+        return get_policy(provider, endpoint).call(
+            attempt, deadline, before_attempt=reserve, abandon_attempt=unreserve
+        )
+
+    except CircuitOpenError as e:
+        logger.warning(f"{label} Circuit open, failing fast | city={city} | retry_in={e.retry_after:.0f}s")
+        raise
+
+    except requests.exceptions.Timeout as e:
+        logger.warning(f"{label} Timed out | city={city} | error={str(e)}")
+        raise WeatherAPIError(f"{provider} request timed out")
+
+    except (requests.exceptions.RequestException, TransientError) as e:
+        logger.error(f"{label} Request failed | city={city} | error={str(e)}")
+        raise WeatherAPIError(f"{provider} request failed: {str(e)}")
+
+
+def resilience_stats() -> dict:
+    """
+    Circuit state and adaptive timeout per provider endpoint.
+    """
+    return policy_stats()
 
 
 # -----------------------------
 # OpenWeather — current weather
 # -----------------------------
-def fetch_weather(city: str) -> dict:
+def fetch_weather(
+    city: str,
+    wait: bool = True,
+    budget: float | None = None,
+    revalidate: bool = False
+) -> dict:
+    """
+    Current conditions for `city`.
+
+    When the provider's rate limit is reached, `wait=True` queues for a
+    token; `wait=False` raises RateLimitExceeded right away. `budget`
+    caps the total seconds spent, retries included (default REQUEST_BUDGET).
+    `revalidate=True` always goes to the provider and refreshes the cache.
+    """
     if not WEATHER_API_KEY:
         raise WeatherAPIError("Missing OpenWeather API key")
 
@@ -34,33 +227,76 @@ def fetch_weather(city: str) -> dict:
 
     logger.info(f"[OpenWeather] Fetching current weather | city={city}")
 
-    try:
-        start = time.time()
-        response = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        latency = time.time() - start
+    return _cached_call(
+        OPENWEATHER, "weather", params, city,
+        lambda timeout: _request_weather(city, url, params, timeout),
+        wait,
+        budget,
+        revalidate
+    )
+
+
+def _request_weather(city: str, url: str, params: dict, timeout: float) -> dict:
+    client = get_client(OPENWEATHER)
+    response = client.get(url, params, timeout=timeout)
+    timing = client.last_timing
+
+    logger.info(
+        f"[OpenWeather] Response received | city={city} | status={response.status_code} | "
+        f"latency={timing.total:.2f}s | timeout={timeout:.1f}s | "
+        f"connect={timing.connect:.2f}s | wait={timing.wait:.2f}s | transfer={timing.transfer:.2f}s"
+    )
 
-        logger.info(f"[OpenWeather] Response received | city={city} | latency={latency:.2f}s")
+    _raise_for_transient(response)
 
-        if response.status_code != 200:
-            msg = response.json().get("message", "Weather API error")
-            logger.warning(f"[OpenWeather] Non-200 response | city={city} | status={response.status_code} | msg={msg}")
-            raise WeatherAPIError(msg)
+    if response.status_code != 200:
+        msg = response.json().get("message", "Weather API error")
+        logger.warning(f"[OpenWeather] Non-200 response | city={city} | status={response.status_code} | msg={msg}")
+        raise WeatherAPIError(msg)
 
-        return response.json()
+    return response.json()
 
-    except requests.exceptions.Timeout:
-        logger.warning(f"[OpenWeather] Timeout | city={city}")
-        raise WeatherAPIError("Weather API request timed out")
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"[OpenWeather] Network error | city={city} | error={str(e)}")
-        raise WeatherAPIError("Network error while calling Weather API")
+# -----------------------------
+# WeatherAPI — current weather
+# -----------------------------
+def fetch_current_weatherapi(
+    city: str,
+    wait: bool = True,
+    budget: float | None = None,
+    revalidate: bool = False
+) -> dict:
+    if not WEATHERAPI_KEY:
+        raise WeatherAPIError("Missing WeatherAPI key")
+
+    url = f"{WEATHERAPI_BASE_URL}/current.json"
+    params = {
+        "key": WEATHERAPI_KEY,
+        "q": city,
+        "aqi": "no"
+    }
+
+    logger.info(f"[WeatherAPI] Fetching current weather | city={city}")
+
+    return _cached_call(
+        WEATHERAPI, "current.json", params, city,
+        lambda timeout: _request_weatherapi(city, url, params, timeout),
+        wait,
+        budget,
+        revalidate
+    )
 
 
 # -----------------------------
 # WeatherAPI — daily forecast
 # -----------------------------
-def fetch_daily_forecast_weatherapi(city: str, days: int = 5) -> dict:
+def fetch_daily_forecast_weatherapi(
+    city: str,
+    days: int = 5,
+    wait: bool = True,
+    budget: float | None = None,
+    revalidate: bool = False
+) -> dict:
     if not WEATHERAPI_KEY:
         raise WeatherAPIError("Missing WeatherAPI key")
 
@@ -74,41 +310,137 @@ def fetch_daily_forecast_weatherapi(city: str, days: int = 5) -> dict:
 
     logger.info(f"[WeatherAPI] Fetching daily forecast | city={city} | days={days}")
 
-    last_error = None
+    return _cached_call(
+        WEATHERAPI, "forecast.json", params, city,
+        lambda timeout: _request_weatherapi(city, f"{WEATHERAPI_BASE_URL}/forecast.json", params, timeout),
+        wait,
+        budget,
+        revalidate
+    )
+
+
+def _request_weatherapi(city: str, url: str, params: dict, timeout: float) -> dict:
+    client = get_client(WEATHERAPI)
+    response = client.get(url, params, timeout=timeout)
+    timing = client.last_timing
+
+    logger.info(
+        f"[WeatherAPI] Response received | city={city} | status={response.status_code} | "
+        f"latency={timing.total:.2f}s | timeout={timeout:.1f}s | "
+        f"connect={timing.connect:.2f}s | wait={timing.wait:.2f}s | transfer={timing.transfer:.2f}s"
+    )
+
+    _raise_for_transient(response)
 
-    for attempt in range(1, 4):  # attempts: 1..3
+    if response.status_code != 200:
         try:
-            start = time.time()
-            response = requests.get(
-                f"{WEATHERAPI_BASE_URL}/forecast.json",
-                params=params,
-                timeout=REQUEST_TIMEOUT
-            )
-            latency = time.time() - start
-            
-            response.raise_for_status()
-            
-            logger.info(
-                f"[WeatherAPI] Attempt {attempt} success | city={city} | latency={latency:.2f}s"
-            )
-
-            
-            return response.json()
-
-        except requests.exceptions.Timeout as e:
-            last_error = e
-            logger.warning(
-                f"[WeatherAPI] Timeout on attempt {attempt} | city={city} | retrying..."
-            )
-            time.sleep(1)  # backoff
-
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                f"[WeatherAPI] Request failed | city={city} | attempt={attempt} | error={str(e)}"
-            )
-            raise WeatherAPIError(f"WeatherAPI request failed: {str(e)}")
-
-    logger.error(
-        f"[WeatherAPI] Forecast timed out after retries | city={city} | last_error={str(last_error)}"
+            msg = response.json().get("error", {}).get("message", "WeatherAPI error")
+        except ValueError:
+            msg = "WeatherAPI error"
+        logger.warning(f"[WeatherAPI] Non-200 response | city={city} | status={response.status_code} | msg={msg}")
+        raise WeatherAPIError(f"WeatherAPI request failed: {msg}")
+
+    return response.json()
+
+
+# ==================================================
+# Current weather across both providers
+# ==================================================
+CURRENT_ENDPOINTS = {
+    OPENWEATHER: ("weather", fetch_weather),
+    WEATHERAPI: ("current.json", fetch_current_weatherapi),
+}
+
+_current_executor = ThreadPoolExecutor(
+    max_workers=BATCH_MAX_WORKERS,
+    thread_name_prefix="current-weather"
+)
+
+
+@dataclass
+class CurrentWeather:
+    provider: str                 # who answered; pass to extract_features
+    raw: dict
+    latency: float
+    timing: RequestTiming | None  # None when served from cache
+    hedged: bool = False          # True when the secondary was asked too
+    fallback: bool = False        # True when the secondary's answer won
+
+
+def _timed_current(
+    provider: str,
+    city: str,
+    wait: bool,
+    budget: float | None,
+    revalidate: bool = False
+) -> CurrentWeather:
+    start = time.time()
+    raw = CURRENT_ENDPOINTS[provider][1](city, wait=wait, budget=budget, revalidate=revalidate)
+    return CurrentWeather(provider, raw, time.time() - start, get_client(provider).last_timing)
+
+
+def _hedge_delay(provider: str) -> float:
+    p90 = get_policy(provider, CURRENT_ENDPOINTS[provider][0]).latency.percentile(90)
+    return HEDGE_DELAY_DEFAULT if p90 is None else p90
+
+
+def fetch_current_weather(
+    city: str,
+    mode: str | None = None,
+    wait: bool = True,
+    budget: float | None = None,
+    revalidate: bool = False
+) -> CurrentWeather:
+    """
+    Current conditions from one or both providers (CURRENT_WEATHER_MODE).
+
+    "failover" asks the secondary only after the primary fails. "hedged"
+    also asks it once the primary has been silent for its p90 latency,
+    and returns whichever succeeds first. If both fail, the primary's
+    error is raised. A secondary answer is flagged `fallback`: callers
+    take its measurements but keep their own name for the city, so one
+    query's history doesn't split by provider.
+    """
+    mode = mode or CURRENT_WEATHER_MODE
+
+    if mode in CURRENT_ENDPOINTS:
+        return _timed_current(mode, city, wait, budget, revalidate)
+
+    primary = CURRENT_WEATHER_PRIMARY
+    secondary = WEATHERAPI if primary == OPENWEATHER else OPENWEATHER
+
+    deadline = Deadline(REQUEST_BUDGET if budget is None else budget)
+    primary_future = _current_executor.submit(
+        _timed_current, primary, city, wait, budget, revalidate
+    )
+    hedge_after = _hedge_delay(primary) if mode == "hedged" else None
+    wait_futures([primary_future], timeout=hedge_after)
+
+    if primary_future.done() and primary_future.exception() is None:
+        return primary_future.result()
+
+    hedged = not primary_future.done()
+    if hedged:
+        logger.info(f"[Current] {primary} slower than {hedge_after:.2f}s, hedging to {secondary} | city={city}")
+    else:
+        logger.warning(
+            f"[Current] {primary} failed, failing over to {secondary} | city={city} | "
+            f"error={primary_future.exception()}"
+        )
+
+    # Both answers count against the caller's one budget
+    secondary_future = _current_executor.submit(
+        _timed_current, secondary, city, wait, deadline.remaining(), revalidate
     )
-    raise WeatherAPIError("WeatherAPI forecast request timed out after retries")
+    pending = {primary_future, secondary_future} if hedged else {secondary_future}
+
+    while pending:
+        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                result = future.result()
+                result.hedged = hedged
+                result.fallback = future is secondary_future
+                return result
+
+    raise primary_future.exception()
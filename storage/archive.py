@@ -0,0 +1,286 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from config.settings import (
+    ARCHIVE_DIR,
+    HISTORY_RETENTION_DAYS,
+    ACCURACY_RETENTION_DAYS,
+    FORECAST_RETENTION_DAYS
+)
+from storage import database
+from storage.history_layout import get_history_layout
+from storage.query_cache import QUERY_CACHE
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+CHUNK_ROWS = 50_000
+
+# table -> (time column, Arrow schema of the archived rows).
+# Files are hive-partitioned on day=YYYY-MM-DD taken from the time column.
+# The canonical city name is stored next to city_id so archives stay
+# readable without the cities table.
+ARCHIVE_TABLES = {
+    "weather_history": (
+        "timestamp",
+        pa.schema([
+            ("id", pa.int64()),
+            ("city_id", pa.int64()),
+            ("city", pa.string()),
+            ("temperature", pa.float64()),
+            ("feels_like", pa.float64()),
+            ("humidity", pa.int64()),
+            ("pressure", pa.int64()),
+            ("wind_speed", pa.float64()),
+            ("condition", pa.string()),
+            ("comfort", pa.float64()),
+            ("health", pa.int64()),
+            ("timestamp", pa.string()),
+        ]),
+    ),
+    "forecast_accuracy": (
+        "date",
+        pa.schema([
+            ("city_id", pa.int64()),
+            ("city", pa.string()),
+            ("date", pa.string()),
+            ("predicted_avg", pa.float64()),
+            ("actual_avg", pa.float64()),
+            ("abs_error", pa.float64()),
+            ("created_at", pa.string()),
+        ]),
+    ),
+}
+
+PARTITION_FIELD = "day"
+
+# Columns that identify one archived row. A retention run that fails
+# after writing its files but before its commit leaves them behind, and
+# the next run archives the same rows again under a new name; reads keep
+# one copy. Compact history has no id (NULL), so its key is the
+# snapshot's (city_id, timestamp); rowid history keeps same-second
+# snapshots apart by id. Accuracy keeps the newest created_at.
+ARCHIVE_KEYS = {
+    "weather_history": ["city_id", "timestamp", "id"],
+    "forecast_accuracy": ["city_id", "date"],
+}
+
+# table -> date column. Past forecasts are deleted, not archived: the
+# nightly verification keeps its results once it has scored them.
+PRUNED_TABLES = {
+    "weather_forecast": "date",
+    "forecast_issues": "target_date",
+}
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(PARTITION_FIELD, pa.string())]), flavor="hive")
+
+
+def _table_dir(table: str, archive_dir: str | None = None) -> str:
+    return os.path.join(archive_dir or ARCHIVE_DIR, table)
+
+
+def _to_arrow(chunk: pd.DataFrame, schema: pa.Schema, time_col: str) -> pa.Table:
+    # Nullable ints so a NULL humidity does not turn the column into floats
+    ints = [f.name for f in schema if pa.types.is_integer(f.type)]
+    chunk = chunk.astype({name: "Int64" for name in ints})
+    chunk[PARTITION_FIELD] = chunk[time_col].str.slice(0, 10)
+
+    return pa.Table.from_pandas(
+        chunk,
+        schema=schema.append(pa.field(PARTITION_FIELD, pa.string())),
+        preserve_index=False
+    )
+
+
+def _archive_queries(table: str) -> tuple[str, str, str]:
+    """
+    (select, delete, watermark) SQL for a table; select/delete take
+    (cutoff, watermark). Raw history follows the active layout.
+    """
+    if table == "weather_history":
+        layout = get_history_layout()
+        return layout.archive_sql, layout.delete_sql, layout.watermark_sql
+
+    time_col, schema = ARCHIVE_TABLES[table]
+    columns = ", ".join(
+        "c.name AS city" if name == "city" else f"t.{name}"
+        for name in schema.names
+    )
+    return (
+        f"""
+        SELECT {columns}
+        FROM {table} t JOIN cities c ON c.id = t.city_id
+        WHERE t.{time_col} < ? AND t.rowid <= ?
+        """,
+        f"DELETE FROM {table} WHERE {time_col} < ? AND rowid <= ?",
+        f"SELECT COALESCE(MAX(rowid), 0) FROM {table}",
+    )
+
+
+# ==================================================
+# Archive (hot SQLite -> cold Parquet)
+# ==================================================
+def archive_table(conn, table: str, cutoff: str, archive_dir: str | None = None) -> int:
+    """
+    Move rows of `table` older than `cutoff` into Parquet, then delete
+    them from SQLite. Returns the number of rows archived.
+    """
+    time_col, schema = ARCHIVE_TABLES[table]
+    select_sql, delete_sql, watermark_sql = _archive_queries(table)
+    run_id = uuid.uuid4().hex[:12]
+
+    # Rows written after this point are left alone even if they are old
+    watermark = conn.execute(watermark_sql).fetchone()[0]
+
+    chunks = pd.read_sql_query(
+        select_sql,
+        conn,
+        params=(cutoff, watermark),
+        chunksize=CHUNK_ROWS
+    )
+
+    archived = 0
+    for i, chunk in enumerate(chunks):
+        # Queries select columns in schema order
+        chunk.columns = schema.names
+        ds.write_dataset(
+            _to_arrow(chunk, schema, time_col),
+            _table_dir(table, archive_dir),
+            format="parquet",
+            partitioning=_partitioning(),
+            basename_template=f"part-{run_id}-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore"
+        )
+        archived += len(chunk)
+
+    conn.execute(delete_sql, (cutoff, watermark))
+    conn.execute(
+        "INSERT INTO archive_log (table_name, cutoff, rows_archived) VALUES (?, ?, ?)",
+        (table, cutoff, archived)
+    )
+    conn.commit()
+
+    logger.info(f"[Archive] {table} | cutoff={cutoff} | rows={archived}")
+    return archived
+
+
+def prune_table(conn, table: str, cutoff: str) -> int:
+    """
+    Delete rows of `table` dated before `cutoff`. Returns the number of
+    rows deleted.
+    """
+    date_col = PRUNED_TABLES[table]
+    deleted = conn.execute(f"DELETE FROM {table} WHERE {date_col} < ?", (cutoff,)).rowcount
+    conn.commit()
+
+    logger.info(f"[Retention] {table} | cutoff={cutoff} | rows deleted={deleted}")
+    return deleted
+
+
+def run_retention(
+    history_days: int = HISTORY_RETENTION_DAYS,
+    accuracy_days: int = ACCURACY_RETENTION_DAYS,
+    db_path: str | None = None,
+    archive_dir: str | None = None,
+    vacuum: bool = True,
+    forecast_days: int = FORECAST_RETENTION_DAYS
+) -> dict:
+    """
+    Archive cold weather_history / forecast_accuracy rows, delete past
+    weather_forecast / forecast_issues days, and VACUUM. Returns rows
+    archived or deleted per table.
+    """
+    now = datetime.now(timezone.utc)
+    cutoffs = {
+        "weather_history": (now - timedelta(days=history_days)).strftime("%Y-%m-%d %H:%M:%S"),
+        "forecast_accuracy": (now - timedelta(days=accuracy_days)).strftime("%Y-%m-%d"),
+    }
+    forecast_cutoff = (now - timedelta(days=forecast_days)).strftime("%Y-%m-%d")
+
+    conn = database.get_connection(db_path)
+    try:
+        archived = {
+            table: archive_table(conn, table, cutoff, archive_dir)
+            for table, cutoff in cutoffs.items()
+        }
+        archived.update(
+            (table, prune_table(conn, table, forecast_cutoff))
+            for table in PRUNED_TABLES
+        )
+
+        if vacuum and any(archived.values()):
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    # Archived and deleted rows drop out of some per-city reads
+    if any(archived.values()):
+        QUERY_CACHE.clear()
+
+    return archived
+
+
+# ==================================================
+# Read archived ranges
+# ==================================================
+def archive_horizon(conn, table: str) -> str | None:
+    """
+    Newest cutoff archived for `table`; older rows exist only in Parquet.
+    """
+    row = conn.execute(
+        "SELECT MAX(cutoff) FROM archive_log WHERE table_name = ? AND rows_archived > 0",
+        (table,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def read_archive(
+    table: str,
+    city_id: int,
+    start: str,
+    end: str,
+    columns: list[str] | None = None,
+    archive_dir: str | None = None
+) -> pd.DataFrame:
+    """
+    Archived rows of `table` for a city with start <= time <= end,
+    ordered by time, each row once (see ARCHIVE_KEYS). Only partitions
+    inside the date range are read.
+    """
+    time_col, schema = ARCHIVE_TABLES[table]
+    columns = columns or schema.names
+    order = [time_col] + (["created_at"] if "created_at" in schema.names else [])
+    keys = ARCHIVE_KEYS[table]
+    read = list(dict.fromkeys(columns + keys + order))
+    path = _table_dir(table, archive_dir)
+
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns)
+
+    dataset = ds.dataset(path, format="parquet", partitioning=_partitioning())
+    day = ds.field(PARTITION_FIELD)
+
+    result = dataset.to_table(
+        columns=read,
+        filter=(
+            (day >= start[:10])
+            & (day <= end[:10])
+            & (ds.field("city_id") == city_id)
+            & (ds.field(time_col) >= start)
+            & (ds.field(time_col) <= end)
+        )
+    ).to_pandas()
+
+    result = (
+        result.sort_values(order, kind="stable")
+        .drop_duplicates(keys, keep="last")
+        .reset_index(drop=True)
+    )
+    return result[columns]
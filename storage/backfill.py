@@ -0,0 +1,374 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics.health_scores import weather_health_score_array
+from analytics.indicators import comfort_index_array
+from config.settings import BACKFILL_CHUNK_ROWS, BACKFILL_WORKERS
+from storage import database
+from storage.cities import clear_city_cache
+from storage.history_layout import get_history_layout
+from storage.models import ROLLUP_BUCKETS
+from storage.query_cache import QUERY_CACHE, flush_dirty
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Columns an imported row must have, and the ones it may have
+IMPORT_REQUIRED = ("city", "timestamp", "temperature", "humidity", "wind_speed")
+IMPORT_OPTIONAL = ("feels_like", "pressure", "condition", "lat", "lon")
+
+
+# ==================================================
+# Scoring (worker processes)
+# ==================================================
+def _floats(values) -> np.ndarray:
+    # NULL / None -> NaN
+    return np.asarray(values, dtype=np.float64)
+
+
+def score_chunk(temperature, humidity, wind_speed) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (comfort, health) for one chunk of snapshots.
+    """
+    return (
+        comfort_index_array(temperature, humidity),
+        weather_health_score_array(temperature, humidity, wind_speed),
+    )
+
+
+def _score_args(chunk: pd.DataFrame) -> tuple:
+    return tuple(_floats(chunk[col]) for col in ("temperature", "humidity", "wind_speed"))
+
+
+def _scored(chunks, workers: int):
+    """
+    Yield (chunk, (comfort, health)) in input order. With workers, up
+    to 2 x workers chunks are scored ahead on a process pool while the
+    caller writes, so memory stays bounded by the chunk size.
+    """
+    if workers <= 0:
+        for chunk in chunks:
+            yield chunk, score_chunk(*_score_args(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(score_chunk, *_score_args(chunk))))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+# ==================================================
+# Job checkpoints (backfill_jobs)
+# ==================================================
+def _start_job(conn, job: str, restart: bool):
+    """
+    (position, rows_read, rows_written) to resume from, or None if the
+    job already finished (pass restart=True to run it again).
+    """
+    row = conn.execute(
+        "SELECT position, rows_read, rows_written, finished_at FROM backfill_jobs WHERE job = ?",
+        (job,)
+    ).fetchone()
+
+    if row is not None and not restart:
+        if row[3] is not None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    conn.execute(
+        """
+        INSERT INTO backfill_jobs (job, position) VALUES (?, 'null')
+        ON CONFLICT (job) DO UPDATE SET
+            position = 'null',
+            rows_read = 0,
+            rows_written = 0,
+            started_at = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP,
+            finished_at = NULL
+        """,
+        (job,)
+    )
+    conn.commit()
+    return None, 0, 0
+
+
+def _save_position(conn, job: str, position, rows_read: int, rows_written: int):
+    # Runs inside the chunk's transaction: rows and checkpoint commit together
+    conn.execute(
+        """
+        UPDATE backfill_jobs
+        SET position = ?, rows_read = ?, rows_written = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE job = ?
+        """,
+        (json.dumps(position), rows_read, rows_written, job)
+    )
+
+
+def _finish_job(conn, job: str):
+    conn.execute(
+        "UPDATE backfill_jobs SET finished_at = CURRENT_TIMESTAMP WHERE job = ?",
+        (job,)
+    )
+    conn.commit()
+
+
+def _run(conn, job: str, chunks, workers: int, write_chunk, rows_read: int, rows_written: int) -> dict:
+    """
+    Score and write `chunks`, committing each with its checkpoint.
+    write_chunk(chunk, comfort, health) -> (position or None, rows written);
+    None means "input rows consumed so far".
+    """
+    for chunk, scores in _scored(chunks, workers):
+        try:
+            position, written = write_chunk(chunk, *scores)
+            rows_read += len(chunk)
+            rows_written += written
+
+            _save_position(
+                conn, job, rows_read if position is None else position, rows_read, rows_written
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Cities interned in the rolled-back transaction no longer exist
+            clear_city_cache()
+            raise
+        finally:
+            flush_dirty(conn)
+
+        logger.info(f"[Backfill] {job} | read={rows_read} | written={rows_written}")
+
+    _finish_job(conn, job)
+
+    # Scores and rollups changed under cached per-city reads
+    if rows_written:
+        QUERY_CACHE.clear()
+
+    return {"job": job, "rows_read": rows_read, "rows_written": rows_written}
+
+
+# ==================================================
+# Re-score stored history
+# ==================================================
+def _fix_rollups(conn, layout, changed: pd.DataFrame):
+    """
+    Carry health changes into the hourly/daily rollups. Sums and counts
+    move by the exact delta (NULL health counts as absent); min/max are
+    re-read from raw rows when the bucket has none archived, and only
+    widened otherwise.
+    """
+    changed = changed.assign(
+        delta=changed["health"].fillna(0) - changed["old_health"].fillna(0),
+        counted=changed["health"].notna().astype(int) - changed["old_health"].notna().astype(int),
+        timestamp=pd.to_datetime(changed["timestamp"])
+    )
+
+    for table, fmt in ROLLUP_BUCKETS.items():
+        span = timedelta(hours=1) if "%H" in fmt else timedelta(days=1)
+        buckets = changed.groupby(["city_id", changed["timestamp"].dt.strftime(fmt)]).agg(
+            delta=("delta", "sum"), counted=("counted", "sum"),
+            low=("health", "min"), high=("health", "max")
+        )
+
+        params = []
+        for (city_id, bucket), delta, counted, new_low, new_high in buckets.itertuples(name=None):
+            start = pd.Timestamp(bucket)
+            count, low, high = conn.execute(
+                layout.bucket_health_sql,
+                (
+                    int(city_id),
+                    start.strftime("%Y-%m-%d %H:%M:%S"),
+                    (start + span - timedelta(seconds=1)).strftime("%Y-%m-%d %H:%M:%S"),
+                )
+            ).fetchone()
+            new_low = None if new_low != new_low else int(new_low)
+            new_high = None if new_high != new_high else int(new_high)
+            params.append((
+                float(delta), int(counted),
+                count, low, new_low, new_low,
+                count, high, new_high, new_high,
+                int(city_id), bucket,
+            ))
+
+        conn.executemany(
+            f"""
+            UPDATE {table} SET
+                health_sum = COALESCE(health_sum, 0) + ?,
+                health_samples = health_samples + ?,
+                health_min = CASE WHEN samples = ? THEN ?
+                    ELSE COALESCE(MIN(health_min, ?), health_min, ?) END,
+                health_max = CASE WHEN samples = ? THEN ?
+                    ELSE COALESCE(MAX(health_max, ?), health_max, ?) END
+            WHERE city_id = ? AND bucket = ?
+            """,
+            params
+        )
+
+
+def _rescore_writer(conn, layout):
+    key_columns = list(layout.key_columns)
+
+    def write_chunk(chunk: pd.DataFrame, comfort: np.ndarray, health: np.ndarray):
+        changed = (
+            (np.rint(comfort * 100) != np.rint(_floats(chunk["comfort"]) * 100))
+            | (health != _floats(chunk["health"]))
+        )
+
+        params = [
+            layout.update_scores_params(tuple(key), None if c != c else c, h)
+            for key, c, h in zip(
+                chunk.loc[changed, key_columns].to_numpy().tolist(),
+                comfort[changed].tolist(),
+                health[changed].tolist()
+            )
+        ]
+        conn.executemany(layout.update_scores_sql, params)
+
+        if params:
+            _fix_rollups(conn, layout, pd.DataFrame({
+                "city_id": chunk.loc[changed, "city_id"].to_numpy(),
+                "timestamp": chunk.loc[changed, "timestamp"].to_numpy(),
+                "old_health": _floats(chunk.loc[changed, "health"]),
+                "health": health[changed],
+            }))
+
+        last_key = chunk.iloc[-1][key_columns].astype(int).tolist()
+        return last_key, len(params)
+
+    return write_chunk
+
+
+def rescore_history(
+    db_path: str | None = None,
+    chunk_rows: int = BACKFILL_CHUNK_ROWS,
+    workers: int = BACKFILL_WORKERS,
+    restart: bool = False
+) -> dict:
+    """
+    Recompute comfort and health for every stored snapshot (active
+    history layout) with the current scoring rules.
+
+    Rows are read in key order, `chunk_rows` at a time, and only rows
+    whose scores changed are written back, one transaction per chunk
+    together with the checkpoint. An interrupted run resumes after the
+    last committed chunk.
+    """
+    layout = get_history_layout()
+    job = f"rescore:{layout.name}"
+
+    conn = database.get_connection(db_path)
+    try:
+        state = _start_job(conn, job, restart)
+        if state is None:
+            logger.info(f"[Backfill] {job} already finished (restart to run again)")
+            return {"job": job, "rows_read": 0, "rows_written": 0}
+
+        position, rows_read, rows_written = state
+        after = tuple(position) if position is not None else layout.scan_start
+
+        def chunks():
+            key = after
+            while True:
+                chunk = pd.read_sql_query(layout.scan_sql, conn, params=(*key, chunk_rows))
+                if chunk.empty:
+                    return
+                yield chunk
+                if len(chunk) < chunk_rows:
+                    return
+                key = tuple(chunk.iloc[-1][list(layout.key_columns)].astype(int))
+
+        return _run(conn, job, chunks(), workers, _rescore_writer(conn, layout), rows_read, rows_written)
+    finally:
+        conn.close()
+
+
+# ==================================================
+# Import observations from CSV / JSONL
+# ==================================================
+def _checked(chunks):
+    for chunk in chunks:
+        missing = [col for col in IMPORT_REQUIRED if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+        yield chunk
+
+
+def _read_input(path: str, chunk_rows: int, skip: int = 0):
+    """
+    Chunks of an input file, starting after its first `skip` rows.
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for _ in range(skip):
+                f.readline()
+            with pd.read_json(
+                f, lines=True, chunksize=chunk_rows, dtype=False, convert_dates=False
+            ) as reader:
+                yield from reader
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, skiprows=range(1, skip + 1))
+
+
+def _import_writer(conn):
+    def write_chunk(chunk: pd.DataFrame, comfort: np.ndarray, health: np.ndarray):
+        rows = chunk.reindex(columns=[*IMPORT_REQUIRED, *IMPORT_OPTIONAL])
+        rows["timestamp"] = pd.to_datetime(
+            rows["timestamp"], utc=True, errors="coerce"
+        ).dt.strftime("%Y-%m-%d %H:%M:%S")
+        rows["comfort"] = comfort
+        rows["health"] = health
+
+        # Rows without a city or a parsable time are skipped
+        rows = rows.dropna(subset=["city", "timestamp"])
+        records = rows.astype(object).where(rows.notna(), None).to_dict("records")
+
+        for record in records:
+            database.write_weather(conn, record)
+
+        return None, len(records)
+
+    return write_chunk
+
+
+def import_history(
+    path: str,
+    db_path: str | None = None,
+    chunk_rows: int = BACKFILL_CHUNK_ROWS,
+    workers: int = BACKFILL_WORKERS,
+    restart: bool = False
+) -> dict:
+    """
+    Import historical snapshots from a CSV or JSONL file (columns
+    IMPORT_REQUIRED, optionally IMPORT_OPTIONAL), scoring them on the
+    way in. Rows go through the normal write path, so rollups and the
+    city dimension stay in step. Resumable like rescore_history.
+    """
+    job = f"import:{os.path.abspath(path)}"
+
+    conn = database.get_connection(db_path)
+    try:
+        state = _start_job(conn, job, restart)
+        if state is None:
+            logger.info(f"[Backfill] {job} already finished (restart to run again)")
+            return {"job": job, "rows_read": 0, "rows_written": 0}
+
+        _, rows_read, rows_written = state
+        chunks = _checked(_read_input(path, chunk_rows, skip=rows_read))
+
+        return _run(conn, job, chunks, workers, _import_writer(conn), rows_read, rows_written)
+    finally:
+        conn.close()
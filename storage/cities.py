@@ -0,0 +1,167 @@
+import sqlite3
+import threading
+
+
+def city_key(name: str) -> str:
+    """
+    Normalized lookup key: "  new   DELHI " -> "new delhi".
+    """
+    return " ".join(str(name).split()).casefold()
+
+
+def _find_city_id(conn: sqlite3.Connection, key: str) -> int | None:
+    """
+    Id of the city named `key`, else of the city it is an alias of.
+    A city's own name always wins over an alias with the same key.
+    """
+    row = conn.execute(
+        "SELECT id FROM cities WHERE name_key = ?", (key,)
+    ).fetchone()
+    if row is None:
+        row = conn.execute(
+            "SELECT city_id FROM city_aliases WHERE alias_key = ?", (key,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+class CityRegistry:
+    """
+    In-memory intern map of city key -> cities.id for one database file.
+
+    Reads never touch SQLite once a city has been seen. Names that are
+    not a city's own key fall back to the city_aliases table. New
+    cities are inserted on the caller's (write) connection, so a
+    rolled-back transaction must call `clear()` to drop ids that never
+    committed.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._located = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, conn: sqlite3.Connection, name: str) -> int | None:
+        key = city_key(name)
+        city_id = self._ids.get(key)
+        if city_id is not None:
+            return city_id
+
+        city_id = _find_city_id(conn, key)
+        if city_id is None:
+            return None
+
+        with self._lock:
+            self._ids[key] = city_id
+        return city_id
+
+    def intern(
+        self,
+        conn: sqlite3.Connection,
+        name: str,
+        lat: float | None = None,
+        lon: float | None = None
+    ) -> int:
+        key = city_key(name)
+        city_id = self._ids.get(key)
+        needs_coords = lat is not None and city_id not in self._located
+
+        if city_id is not None and not needs_coords:
+            return city_id
+
+        if city_id is None:
+            # Same resolution order as lookup: the city's own name, then
+            # a known alias (which writes to its canonical city)
+            city_id = _find_city_id(conn, key)
+            if city_id is not None:
+                return self._intern_known(conn, key, city_id, lat, lon)
+
+        conn.execute(
+            """
+            INSERT INTO cities (name, name_key, lat, lon)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (name_key) DO UPDATE SET
+                lat = COALESCE(cities.lat, excluded.lat),
+                lon = COALESCE(cities.lon, excluded.lon)
+            """,
+            (" ".join(str(name).split()), key, lat, lon),
+        )
+        city_id = conn.execute(
+            "SELECT id FROM cities WHERE name_key = ?", (key,)
+        ).fetchone()[0]
+
+        with self._lock:
+            self._ids[key] = city_id
+            if lat is not None:
+                self._located.add(city_id)
+
+        return city_id
+
+    def _intern_known(self, conn, key: str, city_id: int, lat, lon) -> int:
+        if lat is not None and city_id not in self._located:
+            conn.execute(
+                """
+                UPDATE cities SET
+                    lat = COALESCE(lat, ?),
+                    lon = COALESCE(lon, ?)
+                WHERE id = ?
+                """,
+                (lat, lon, city_id),
+            )
+
+        with self._lock:
+            self._ids[key] = city_id
+            if lat is not None:
+                self._located.add(city_id)
+
+        return city_id
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._located.clear()
+
+
+# ==================================================
+# Process-wide registries, one per database file
+# ==================================================
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def db_file(conn: sqlite3.Connection) -> str:
+    """
+    Absolute path of the database file behind a connection.
+    """
+    path = getattr(conn, "db_path", None)
+    if path:
+        return path
+    # Plain sqlite3 connections: ask SQLite which file "main" is
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def get_city_registry(conn: sqlite3.Connection) -> CityRegistry:
+    path = db_file(conn)
+
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(path, CityRegistry())
+    return registry
+
+
+def intern_city(conn, name: str, lat: float | None = None, lon: float | None = None) -> int:
+    return get_city_registry(conn).intern(conn, name, lat, lon)
+
+
+def lookup_city_id(conn, name: str) -> int | None:
+    return get_city_registry(conn).lookup(conn, name)
+
+
+def clear_city_cache():
+    """
+    Drop every cached id (call after a rollback of a write transaction).
+    """
+    with _registries_lock:
+        registries = list(_registries.values())
+    for registry in registries:
+        registry.clear()
@@ -1,122 +1,722 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import queue
 import sqlite3
-import pandas as pd
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import chain, repeat
+from urllib.request import pathname2url
 
-from storage.models import (
-    CREATE_WEATHER_TABLE,
-    CREATE_FORECAST_ACCURACY_TABLE
-)
+import pandas as pd
 
-# ✅ STEP 2: Import migration runner
+from analytics.accuracy import AccuracyStats, error_bin
+from analytics.downsampling import lttb_indices
+from config.settings import DB_READ_POOL_SIZE, VERIFY_MIN_OBSERVATIONS, VERIFY_LOOKBACK_DAYS
+from storage.cities import city_key, clear_city_cache, intern_city, lookup_city_id
+from storage.history_layout import get_history_layout
 from storage.migrations import run_migrations
+from storage.query_cache import QUERY_CACHE, cache_scope, flush_dirty, mark_dirty
+from storage.models import ROLLUP_BUCKETS
 
 
 DB_PATH = "storage/weather.db"
+BUSY_TIMEOUT_MS = 5000
+# Per-connection prepared statement cache (sqlite3 keys it on SQL text)
+STATEMENT_CACHE_SIZE = 256
+
+# Database files already brought up to the latest schema in this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
 
 
 # ==================================================
-# Connection
+# Schema bootstrap
 # ==================================================
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+def ensure_schema(db_path: str | None = None) -> list:
+    """
+    Run pending migrations once per database file per process.
+    Returns the (version, description) pairs applied by this call.
+    """
+    path = os.path.abspath(db_path or DB_PATH)
+
+    if path in _schema_ready:
+        return []
+
+    with _schema_lock:
+        if path in _schema_ready:
+            return []
+
+        conn = sqlite3.connect(path)
+        try:
+            # WAL is persistent per file: readers no longer block the writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            applied = run_migrations(conn)
+        finally:
+            conn.close()
+
+        _schema_ready.add(path)
+
+    return applied
 
-    conn.execute(CREATE_WEATHER_TABLE)
-    create_forecast_table(conn)
-    conn.execute(CREATE_FORECAST_ACCURACY_TABLE)
 
-    # ✅ STEP 2: Run migrations safely (industry way)
-    run_migrations(conn)
+# ==================================================
+# Connection
+# ==================================================
+class Connection(sqlite3.Connection):
+    """
+    sqlite3 connection that remembers which database file it opened
+    (used to key per-file caches such as the city intern map).
+    """
+    db_path = None
+
 
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """
+    Per-connection pragmas. In WAL mode synchronous=NORMAL only fsyncs
+    at checkpoints, not on every commit.
+    """
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
     return conn
 
 
+def get_connection(db_path: str | None = None):
+    path = db_path or DB_PATH
+    ensure_schema(path)
+
+    conn = sqlite3.connect(path, check_same_thread=False, factory=Connection)
+    conn.db_path = os.path.abspath(path)
+    return configure_connection(conn)
+
+
+def _commit(conn, write, *args):
+    """
+    Run a write_* function and commit; roll back on any error.
+    """
+    try:
+        write(conn, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        # Cities interned in the rolled-back transaction no longer exist
+        clear_city_cache()
+        raise
+    finally:
+        flush_dirty(conn)
+
+
+# ==================================================
+# Read connection pool
+# ==================================================
+class ReadPool:
+    """
+    Bounded pool of read-only (mode=ro) connections.
+
+    A thread checks a connection out for the duration of a `with`
+    block; nested checkouts on the same thread reuse it. At most
+    `max_size` connections exist, so file descriptors stay bounded
+    and extra readers wait instead of opening more.
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        max_size: int = DB_READ_POOL_SIZE,
+        timeout: float = 10
+    ):
+        self.db_path = os.path.abspath(db_path or DB_PATH)
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._local = threading.local()
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"file:{pathname2url(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=Connection
+        )
+        conn.db_path = self.db_path
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("Timed out waiting for a read connection")
+
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_read_pools = {}
+_read_pools_lock = threading.Lock()
+
+
+def get_read_pool(db_path: str | None = None) -> ReadPool:
+    path = os.path.abspath(db_path or DB_PATH)
+
+    pool = _read_pools.get(path)
+    if pool is not None:
+        return pool
+
+    # mode=ro cannot create the file, so make sure it exists first
+    ensure_schema(path)
+
+    with _read_pools_lock:
+        pool = _read_pools.get(path)
+        if pool is None:
+            pool = ReadPool(path)
+            _read_pools[path] = pool
+
+    return pool
+
+
+def read_connection(db_path: str | None = None):
+    """
+    Context manager yielding a pooled read-only connection.
+    """
+    return get_read_pool(db_path).connection()
+
+
+def cached_per_city(fn):
+    """
+    Serve fn(city, ...) from the process-wide query cache, scoped by the
+    resolved city so aliases share entries; they are dropped whenever a
+    write to that city commits.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(city: str, *args, **kwargs):
+        # Positional and keyword spellings of a call share one entry
+        bound = signature.bind(city, *args, **kwargs)
+        bound.apply_defaults()
+
+        pool = get_read_pool()
+        with pool.connection() as conn:
+            scope = cache_scope(conn, city)
+
+        return QUERY_CACHE.get_or_load(
+            pool.db_path,
+            fn.__name__,
+            scope,
+            tuple(bound.arguments.values())[1:],
+            lambda: fn(*bound.args, **bound.kwargs)
+        )
+
+    return wrapper
+
+
 # ==================================================
 # Current & Historical Weather
 # ==================================================
+# write_* functions only execute statements; the caller owns the
+# transaction (see storage.writer). insert_* wrappers commit directly.
+def _utc_now() -> str:
+    # Same text format as SQLite CURRENT_TIMESTAMP
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _to_timestamp(value) -> str:
+    if isinstance(value, str):
+        return value
+    return pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# excluded.* carry the snapshot's contribution: sample counts and sums
+# are deltas (a replaced snapshot's values are taken back out), min /
+# max are its values. NULL metrics are skipped, never propagated.
+UPSERT_ROLLUP = """
+INSERT INTO {table} (
+    city_id, bucket, samples,
+    temp_samples, temp_min, temp_max, temp_sum,
+    health_samples, health_min, health_max, health_sum,
+    humidity_samples, humidity_min, humidity_max, humidity_sum
+) VALUES (?, strftime('{bucket}', ?), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city_id, bucket) DO UPDATE SET
+    samples = samples + excluded.samples,
+    temp_samples = temp_samples + excluded.temp_samples,
+    temp_min = COALESCE(MIN(temp_min, excluded.temp_min), temp_min, excluded.temp_min),
+    temp_max = COALESCE(MAX(temp_max, excluded.temp_max), temp_max, excluded.temp_max),
+    temp_sum = COALESCE(temp_sum, 0) + COALESCE(excluded.temp_sum, 0),
+    health_samples = health_samples + excluded.health_samples,
+    health_min = COALESCE(MIN(health_min, excluded.health_min), health_min, excluded.health_min),
+    health_max = COALESCE(MAX(health_max, excluded.health_max), health_max, excluded.health_max),
+    health_sum = COALESCE(health_sum, 0) + COALESCE(excluded.health_sum, 0),
+    humidity_samples = humidity_samples + excluded.humidity_samples,
+    humidity_min = COALESCE(MIN(humidity_min, excluded.humidity_min), humidity_min, excluded.humidity_min),
+    humidity_max = COALESCE(MAX(humidity_max, excluded.humidity_max), humidity_max, excluded.humidity_max),
+    humidity_sum = COALESCE(humidity_sum, 0) + COALESCE(excluded.humidity_sum, 0)
+"""
+
+
+def _rollup_params(city_id: int, timestamp: str, values: tuple, replaced: tuple | None) -> tuple:
+    """
+    UPSERT_ROLLUP parameters for a snapshot with (temperature, health,
+    humidity) `values`, replacing the `replaced` ones if it overwrote a
+    stored snapshot.
+    """
+    params = [city_id, timestamp, 0 if replaced else 1]
+
+    for value, old in zip(values, replaced or (None,) * len(values)):
+        params += [
+            (value is not None) - (old is not None),
+            value,
+            value,
+            (value or 0) - (old or 0),
+        ]
+
+    return tuple(params)
+
+
+def _update_rollups(conn, city_id: int, timestamp: str, data: dict, replaced: tuple | None = None):
+    """
+    Fold one snapshot into the hourly and daily rollups.
+    """
+    values = (data["temperature"], data["health"], data["humidity"])
+
+    for table, bucket in ROLLUP_BUCKETS.items():
+        conn.execute(
+            UPSERT_ROLLUP.format(table=table, bucket=bucket),
+            _rollup_params(city_id, timestamp, values, replaced),
+        )
+
+
+def write_weather(conn, data: dict):
+    timestamp = _to_timestamp(data.get("timestamp") or _utc_now())
+    city_id = intern_city(conn, data["city"], data.get("lat"), data.get("lon"))
+
+    layout = get_history_layout()
+
+    # A snapshot that overwrites one from the same second only moves the
+    # rollups by the difference
+    replaced = None
+    if layout.replaced_sql is not None:
+        replaced = conn.execute(layout.replaced_sql, (city_id, timestamp)).fetchone()
+
+    conn.execute(layout.insert_sql, layout.insert_params(city_id, timestamp, data))
+
+    _update_rollups(conn, city_id, timestamp, data, replaced)
+    mark_dirty(conn, data["city"])
+
+
 def insert_weather(conn, data: dict):
-    query = """
-    INSERT INTO weather_history (
-        city,
-        temperature,
-        feels_like,
-        humidity,
-        pressure,
-        wind_speed,
-        condition,
-        comfort,
-        health
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    _commit(conn, write_weather, data)
+
+
+def age_seconds(timestamp: str) -> float:
+    """
+    Seconds since a stored UTC timestamp ("%Y-%m-%d %H:%M:%S").
     """
+    stored = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - stored).total_seconds()
 
-    conn.execute(
-        query,
-        (
-            data["city"],
-            data["temperature"],
-            data["feels_like"],
-            data["humidity"],
-            data["pressure"],
-            data["wind_speed"],
-            data["condition"],
-            data["comfort"],
-            data["health"],
-        ),
-    )
-    conn.commit()
+
+SNAPSHOT_FIELDS = (
+    "temperature",
+    "feels_like",
+    "humidity",
+    "pressure",
+    "wind_speed",
+    "condition",
+    "comfort",
+    "health",
+    "timestamp",
+)
+
+
+@cached_per_city
+def fetch_latest_snapshot(city: str):
+    """
+    Newest stored snapshot for a city as a features dict (with its
+    canonical name, coordinates and UTC timestamp), or None.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return None
+
+        row = conn.execute(
+            "SELECT id, name, lat, lon FROM cities WHERE id = ?", (city_id,)
+        ).fetchone()
+
+        city_id, name, lat, lon = row
+        snapshot = conn.execute(
+            get_history_layout().latest_sql, (city_id,)
+        ).fetchone()
+
+    if snapshot is None:
+        return None
+
+    features = dict(zip(SNAPSHOT_FIELDS, snapshot))
+    features.update(city=name, lat=lat, lon=lon)
+    return features
 
 
+@cached_per_city
 def fetch_weather_history(city: str, limit: int = 200):
-    conn = get_connection()
+    """
+    Most recent `limit` snapshots for a city, oldest first.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return []
+
+        return conn.execute(
+            get_history_layout().recent_sql, (city_id, limit)
+        ).fetchall()
+
+
+HISTORY_SERIES_POINTS = 500
+
+
+def _history_resolution(conn, city_id: int, start: str, end: str, points: int) -> str:
+    """
+    Finest source that returns at most `points` rows for the range:
+    "raw", "weather_rollup_hourly" or "weather_rollup_daily".
+    Counts come from the rollups, never from scanning raw rows.
+    """
+    raw_count, = conn.execute(
+        """
+        SELECT COALESCE(SUM(samples), 0)
+        FROM weather_rollup_daily
+        WHERE city_id = ? AND bucket BETWEEN date(?) AND date(?)
+        """,
+        (city_id, start, end),
+    ).fetchone()
+
+    if raw_count <= points:
+        return "raw"
 
-    query = """
-    SELECT
-        datetime(timestamp) AS timestamp,
-        temperature,
-        health
-    FROM weather_history
-    WHERE city = ?
-    ORDER BY timestamp ASC
-    LIMIT ?
+    hourly_count, = conn.execute(
+        """
+        SELECT COUNT(*)
+        FROM weather_rollup_hourly
+        WHERE city_id = ?
+          AND bucket BETWEEN strftime('%Y-%m-%d %H:00:00', ?) AND ?
+        """,
+        (city_id, start, end),
+    ).fetchone()
+
+    if hourly_count <= points:
+        return "weather_rollup_hourly"
+
+    return "weather_rollup_daily"
+
+
+def _archived_series(conn, city_id: int, start: str, end: str) -> list:
+    """
+    Raw snapshots in [start, end] that retention already moved to Parquet.
+    """
+    from storage import archive
+
+    horizon = archive.archive_horizon(conn, "weather_history")
+    if horizon is None or start >= horizon:
+        return []
+
+    df = archive.read_archive(
+        "weather_history",
+        city_id,
+        start,
+        min(end, horizon),
+        columns=["timestamp", "temperature", "health"]
+    )
+    return list(df.itertuples(index=False, name=None))
+
+
+@cached_per_city
+def fetch_weather_series(
+    city: str,
+    start=None,
+    end=None,
+    points: int = HISTORY_SERIES_POINTS
+):
     """
+    Temperature / health series for [start, end] with at most `points`
+    rows, oldest first. Uses raw snapshots when they fit, otherwise
+    hourly or daily rollup means; a daily series that is still too
+    dense is reduced with LTTB.
+    """
+    start = _to_timestamp(start) if start is not None else "0000-01-01 00:00:00"
+    end = _to_timestamp(end) if end is not None else "9999-12-31 23:59:59"
+
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return []
+
+        source = _history_resolution(conn, city_id, start, end, points)
+
+        if source == "raw":
+            rows = _archived_series(conn, city_id, start, end)
+            rows += conn.execute(
+                get_history_layout().range_sql, (city_id, start, end)
+            ).fetchall()
+        else:
+            bucket = ROLLUP_BUCKETS[source]
+            rows = conn.execute(
+                f"""
+                SELECT
+                    bucket,
+                    ROUND(temp_sum / temp_samples, 2),
+                    ROUND(health_sum / health_samples, 2)
+                FROM {source}
+                WHERE city_id = ?
+                  AND bucket BETWEEN strftime('{bucket}', ?) AND ?
+                ORDER BY bucket
+                """,
+                (city_id, start, end),
+            ).fetchall()
+
+    if len(rows) > points:
+        x = pd.to_datetime([r[0] for r in rows]).astype("int64")
+        y = [r[1] for r in rows]
+        rows = [rows[i] for i in lttb_indices(x, y, points)]
 
-    rows = conn.execute(query, (city, limit)).fetchall()
     return rows
 
 
 # ==================================================
 # Forecast Cache (WITH CONDITIONS + ICON + RAIN_PROB)
 # ==================================================
-def create_forecast_table(conn):
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS weather_forecast (
-            city TEXT,
-            date TEXT,
-            min_temp REAL,
-            max_temp REAL,
-            avg_temp REAL,
-            condition TEXT,
-            icon TEXT,
-            rain_prob INTEGER,
-            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+UPSERT_FORECAST = """
+INSERT INTO weather_forecast (
+    city_id,
+    date,
+    min_temp,
+    max_temp,
+    avg_temp,
+    condition,
+    icon,
+    rain_prob,
+    fetched_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city_id, date) DO UPDATE SET
+    min_temp = excluded.min_temp,
+    max_temp = excluded.max_temp,
+    avg_temp = excluded.avg_temp,
+    condition = excluded.condition,
+    icon = excluded.icon,
+    rain_prob = excluded.rain_prob,
+    fetched_at = excluded.fetched_at
+"""
+
+
+INSERT_FORECAST_ISSUE = """
+INSERT OR REPLACE INTO forecast_issues (
+    city_id, target_date, lead_days, min_temp, max_temp, avg_temp, issued_at
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _forecast_column(df: pd.DataFrame, column: str) -> list:
+    """
+    Column as native Python values (NaN -> None); all None if absent.
+    """
+    if column not in df.columns:
+        return [None] * len(df)
+
+    values = df[column].astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def _forecast_rows(city_id: int, df: pd.DataFrame, fetched_at: str):
+    """
+    Convert one forecast DataFrame into parameter tuples, column-wise.
+    """
+    dates = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d").tolist()
+
+    return zip(
+        repeat(city_id, len(df)),
+        dates,
+        _forecast_column(df, "min_temp"),
+        _forecast_column(df, "max_temp"),
+        _forecast_column(df, "avg_temp"),
+        _forecast_column(df, "condition"),
+        _forecast_column(df, "icon"),
+        _forecast_column(df, "rain_prob"),
+        repeat(fetched_at, len(df)),
+    )
+
+
+def _issue_rows(rows: list):
+    """
+    forecast_issues parameter tuples for one city's run (rows as built
+    by _forecast_rows). The provider's first forecast day is the city's
+    local "today", so lead days count from it rather than from the UTC
+    fetched_at, which is a day off for cities far from UTC.
+    """
+    issued_on = datetime.fromisoformat(min(row[1] for row in rows))
+
+    return [
+        (city_id, target, (datetime.fromisoformat(target) - issued_on).days, low, high, avg, fetched_at)
+        for city_id, target, low, high, avg, _, _, _, fetched_at in rows
+    ]
+
+
+def forecast_fingerprint(rows: list, issued_on: str) -> str:
+    """
+    Content hash of one city's normalized forecast rows (as built by
+    _forecast_rows, minus city_id and fetched_at). The issue day is part
+    of it, so the first run of each day is always kept per lead time.
+    """
+    content = sorted(row[1:-1] for row in rows)
+    return hashlib.sha1(
+        json.dumps([issued_on, content], separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def write_forecasts(conn, forecasts: dict[str, pd.DataFrame]):
+    """
+    Upsert forecasts for many cities with a single executemany.
+    Each (city, date) row is upserted; the whole batch shares one
+    fetched_at so reads can pick out the latest forecast run.
+
+    A city whose forecast is identical to its last stored run (same
+    fingerprint) only has its fetched_at bumped.
+    """
+
+    fetched_at = _utc_now()
+
+    forecasts = {
+        city: df for city, df in forecasts.items()
+        if df is not None and not df.empty
+    }
+
+    runs = {}
+    for city, df in forecasts.items():
+        city_id = intern_city(conn, city)
+        rows = list(_forecast_rows(city_id, df, fetched_at))
+        runs[city_id] = (rows, forecast_fingerprint(rows, fetched_at[:10]))
+
+    stored = dict(conn.execute(
+        f"""
+        SELECT city_id, fingerprint FROM forecast_fingerprints
+        WHERE city_id IN ({", ".join("?" * len(runs))})
+        """,
+        list(runs),
+    )) if runs else {}
+
+    changed = [
+        rows for city_id, (rows, fingerprint) in runs.items()
+        if stored.get(city_id) != fingerprint
+    ]
+
+    if changed:
+        conn.executemany(UPSERT_FORECAST, chain.from_iterable(changed))
+
+        # Keep this run per lead time for verification
+        conn.executemany(
+            INSERT_FORECAST_ISSUE, chain.from_iterable(_issue_rows(rows) for rows in changed)
         )
+
+    conn.executemany(
         """
+        INSERT INTO forecast_fingerprints (city_id, fingerprint, fetched_at, changed_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (city_id) DO UPDATE SET
+            fingerprint = excluded.fingerprint,
+            fetched_at = excluded.fetched_at,
+            changed_at = CASE
+                WHEN forecast_fingerprints.fingerprint = excluded.fingerprint
+                THEN forecast_fingerprints.changed_at
+                ELSE excluded.changed_at
+            END
+        """,
+        [
+            (city_id, fingerprint, fetched_at, fetched_at)
+            for city_id, (_, fingerprint) in runs.items()
+        ],
     )
-    conn.commit()
+
+    # fetched_at moved even when the rows did not
+    for city in forecasts:
+        mark_dirty(conn, city)
+
+
+def insert_forecasts(conn, forecasts: dict[str, pd.DataFrame]):
+    """
+    Cache forecasts for many cities in one transaction.
+    """
+    _commit(conn, write_forecasts, forecasts)
 
 
 def insert_forecast(conn, city: str, df: pd.DataFrame):
     """
-    Cache forecast for a city.
-    Old forecast is replaced to keep cache fresh.
+    Cache forecast for a single city.
     """
+    insert_forecasts(conn, {city: df})
 
-    conn.execute("DELETE FROM weather_forecast WHERE city = ?", (city,))
 
-    for _, row in df.iterrows():
-        conn.execute(
+@cached_per_city
+def fetch_forecast_fetched_at(city: str):
+    """
+    UTC time of the latest cached forecast run for a city, or None.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return None
+
+        # Unchanged runs only bump the fingerprint's fetched_at
+        return conn.execute(
             """
-            INSERT INTO weather_forecast (
-                city,
+            SELECT COALESCE(
+                (SELECT fetched_at FROM forecast_fingerprints WHERE city_id = ?),
+                (SELECT MAX(fetched_at) FROM weather_forecast WHERE city_id = ?)
+            )
+            """,
+            (city_id, city_id),
+        ).fetchone()[0]
+
+
+@cached_per_city
+def fetch_cached_forecast(city: str):
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return None
+
+        rows = conn.execute(
+            """
+            SELECT
                 date,
                 min_temp,
                 max_temp,
@@ -124,42 +724,15 @@ def insert_forecast(conn, city: str, df: pd.DataFrame):
                 condition,
                 icon,
                 rain_prob
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            FROM weather_forecast
+            WHERE city_id = ?
+              AND fetched_at = (
+                  SELECT MAX(fetched_at) FROM weather_forecast WHERE city_id = ?
+              )
+            ORDER BY date
             """,
-            (
-                city,
-                pd.to_datetime(row["date"]).strftime("%Y-%m-%d"),
-                row["min_temp"],
-                row["max_temp"],
-                row["avg_temp"],
-                row.get("condition"),
-                row.get("icon"),
-                row.get("rain_prob"),
-            ),
-        )
-
-    conn.commit()
-
-
-def fetch_cached_forecast(conn, city: str):
-    cursor = conn.execute(
-        """
-        SELECT
-            date,
-            min_temp,
-            max_temp,
-            avg_temp,
-            condition,
-            icon,
-            rain_prob
-        FROM weather_forecast
-        WHERE city = ?
-        ORDER BY date
-        """,
-        (city,),
-    )
-
-    rows = cursor.fetchall()
+            (city_id, city_id),
+        ).fetchall()
 
     if not rows:
         return None
@@ -184,21 +757,26 @@ def fetch_cached_forecast(conn, city: str):
 # ==================================================
 # Forecast Accuracy (STEP 4)
 # ==================================================
-def fetch_yesterday_forecast(conn, city: str, date: str):
-    cursor = conn.execute(
-        """
-        SELECT avg_temp
-        FROM weather_forecast
-        WHERE city = ? AND date = ?
-        """,
-        (city, date),
-    )
+@cached_per_city
+def fetch_yesterday_forecast(city: str, date: str):
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return None
+
+        row = conn.execute(
+            """
+            SELECT avg_temp
+            FROM weather_forecast
+            WHERE city_id = ? AND date = ?
+            """,
+            (city_id, date),
+        ).fetchone()
 
-    row = cursor.fetchone()
     return row[0] if row else None
 
 
-def insert_forecast_accuracy(
+def write_forecast_accuracy(
     conn,
     city: str,
     date: str,
@@ -207,47 +785,514 @@ def insert_forecast_accuracy(
 ):
     """
     Insert forecast accuracy row.
-    ✅ Idempotent: removes any existing record for same (city, date).
+    ✅ Idempotent: upserts on the (city_id, date) unique key.
     """
 
     abs_error = abs(predicted_avg - actual_avg)
+    city_id = intern_city(conn, city)
 
-    # ✅ Avoid duplicates on repeated runs
-    conn.execute(
-        """
-        DELETE FROM forecast_accuracy
-        WHERE city = ? AND date = ?
-        """,
-        (city, date),
-    )
+    # Error this date had before (hot or archived), if it is being re-evaluated
+    replaced = _accuracy_errors(conn, city_id, date).get(date)
 
     conn.execute(
         """
         INSERT INTO forecast_accuracy
-        (city, date, predicted_avg, actual_avg, abs_error)
+        (city_id, date, predicted_avg, actual_avg, abs_error)
         VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (city_id, date) DO UPDATE SET
+            predicted_avg = excluded.predicted_avg,
+            actual_avg = excluded.actual_avg,
+            abs_error = excluded.abs_error,
+            created_at = CURRENT_TIMESTAMP
         """,
         (
-            city,
+            city_id,
             date,
             predicted_avg,
             actual_avg,
             abs_error,
         ),
     )
+    _update_accuracy_stats(conn, city_id, date, predicted_avg - actual_avg, replaced)
+    mark_dirty(conn, city)
+
+
+def _accuracy_errors(conn, city_id: int, date: str | None = None) -> dict:
+    """
+    {date: signed error} of a city's evaluated dates (only `date` if
+    given), oldest first. Archived rows count too; a hot row wins over
+    an archived copy of the same date, and the newest archived copy
+    over older ones.
+    """
+    from storage import archive
+
+    errors = {}
+
+    horizon = archive.archive_horizon(conn, "forecast_accuracy")
+    if horizon is not None and (date is None or date < horizon):
+        archived = archive.read_archive(
+            "forecast_accuracy",
+            city_id,
+            date or "0000-01-01",
+            date or horizon,
+            columns=["date", "predicted_avg", "actual_avg", "abs_error", "created_at"]
+        )
+        archived = archived.sort_values(["date", "created_at"], ignore_index=True)
+        signed = (archived["predicted_avg"] - archived["actual_avg"]).fillna(archived["abs_error"])
+
+        for archived_date, error in zip(archived["date"], signed):
+            if error == error:
+                errors[archived_date] = float(error)
+
+    errors.update(conn.execute(
+        f"""
+        SELECT date, COALESCE(predicted_avg - actual_avg, abs_error)
+        FROM forecast_accuracy
+        WHERE city_id = ?
+          AND COALESCE(predicted_avg - actual_avg, abs_error) IS NOT NULL
+          {"AND date = ?" if date is not None else ""}
+        """,
+        (city_id,) if date is None else (city_id, date),
+    ))
 
-    conn.commit()
+    return dict(sorted(errors.items()))
 
 
-def fetch_forecast_accuracy(conn, city: str):
+def _update_accuracy_stats(conn, city_id: int, date: str, error: float, replaced: float | None):
+    """
+    Fold one evaluated date into the city's running aggregates and
+    error histogram (same transaction as the forecast_accuracy row),
+    retracting the `replaced` error of a re-evaluated date first.
+    """
+    row = conn.execute(
+        """
+        SELECT
+            samples, error_sum, error_sq_sum, bias_sum,
+            ewma_mae, ewma_before, recent, last_date
+        FROM accuracy_stats
+        WHERE city_id = ?
+        """,
+        (city_id,),
+    ).fetchone()
+    stats = AccuracyStats.from_row(row) if row else AccuracyStats()
+
+    if not stats.add(date, error, replaced):
+        # An older date changed: replay the order-dependent parts over
+        # every evaluated date, archived ones included
+        stats.rewind(_accuracy_errors(conn, city_id).items())
+
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO accuracy_stats (
+            city_id, samples, error_sum, error_sq_sum, bias_sum,
+            ewma_mae, ewma_before, recent, last_date, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+        (city_id, *stats.to_row()),
+    )
+
+    if replaced is not None:
+        conn.execute(
+            "UPDATE accuracy_histogram SET samples = samples - 1 WHERE city_id = ? AND bin = ?",
+            (city_id, error_bin(abs(replaced))),
+        )
+    conn.execute(
+        """
+        INSERT INTO accuracy_histogram (city_id, bin, samples) VALUES (?, ?, 1)
+        ON CONFLICT (city_id, bin) DO UPDATE SET samples = samples + 1
+        """,
+        (city_id, error_bin(abs(error))),
+    )
+
+
+def insert_forecast_accuracy(
+    conn,
+    city: str,
+    date: str,
+    predicted_avg: float,
+    actual_avg: float
+):
+    _commit(conn, write_forecast_accuracy, city, date, predicted_avg, actual_avg)
+
+
+@cached_per_city
+def fetch_forecast_accuracy(city: str, limit: int | None = None):
+    """
+    (date, abs_error) rows oldest first; only the newest `limit` if set.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return []
+
+        return conn.execute(
+            """
+            SELECT date, abs_error
+            FROM (
+                SELECT date, abs_error
+                FROM forecast_accuracy
+                WHERE city_id = ?
+                ORDER BY date DESC
+                LIMIT ?
+            )
+            ORDER BY date
+            """,
+            (city_id, -1 if limit is None else limit),
+        ).fetchall()
+
+
+@cached_per_city
+def fetch_accuracy_stats(city: str):
+    """
+    Running accuracy KPIs (samples, mae, rmse, bias, ewma_mae,
+    window_mae) for a city, or None before its first evaluation.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return None
+
+        row = conn.execute(
+            """
+            SELECT
+                samples, error_sum, error_sq_sum, bias_sum,
+                ewma_mae, ewma_before, recent, last_date
+            FROM accuracy_stats
+            WHERE city_id = ?
+            """,
+            (city_id,),
+        ).fetchone()
+
+    return AccuracyStats.from_row(row).summary() if row else None
+
+
+@cached_per_city
+def fetch_accuracy_histogram(city: str):
+    """
+    (bin, samples) of the city's absolute forecast errors.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return []
+
+        return conn.execute(
+            """
+            SELECT bin, samples
+            FROM accuracy_histogram
+            WHERE city_id = ? AND samples > 0
+            ORDER BY bin
+            """,
+            (city_id,),
+        ).fetchall()
+
+
+# ==================================================
+# Nightly forecast verification (all cities, one pass)
+# ==================================================
+# Forecast issues joined with the observed daily mean of their target
+# day; only complete days (before `today`) with enough snapshots count.
+# Target dates are the provider's local dates while rollup days are UTC:
+# for a city far from UTC the observed mean is offset by its UTC offset
+# (up to half a day). Accepted as an approximation; lead days themselves
+# are exact (see _issue_rows).
+VERIFIED_ISSUES = """
+FROM forecast_issues f
+JOIN cities c ON c.id = f.city_id
+JOIN weather_rollup_daily o
+  ON o.city_id = f.city_id AND o.bucket = f.target_date
+WHERE f.target_date < :today
+  AND o.temp_samples >= :min_observations
+  AND f.avg_temp IS NOT NULL
+"""
+
+
+def write_verification(
+    conn,
+    today: str,
+    min_observations: int = VERIFY_MIN_OBSERVATIONS,
+    lookback_days: int = VERIFY_LOOKBACK_DAYS
+) -> int:
+    """
+    Verify every city's forecast issues whose target day completed since
+    the previous run (previous run_date <= target_date < `today`) with
+    one set-based pass, stored as this run's rows of
+    forecast_verification (MAE and bias by city and lead day). Earlier
+    runs are kept; re-running a day only replaces its own rows. Also
+    records day-ahead errors of the last `lookback_days` in
+    forecast_accuracy. Returns the number of rows written.
+
+    A day that had too few snapshots when its run passed is not
+    revisited. Runs only move forward: ValueError if a later day ran.
+    """
+    latest, since = conn.execute(
+        "SELECT MAX(run_date), MAX(CASE WHEN run_date < ? THEN run_date END) FROM verification_runs",
+        (today,),
+    ).fetchone()
+    if latest is not None and latest > today:
+        raise ValueError(f"Verification already ran for {latest}; cannot verify {today}")
+
+    params = {"today": today, "min_observations": min_observations}
+
+    conn.execute("DELETE FROM forecast_verification WHERE run_date = :today", params)
     cursor = conn.execute(
+        f"""
+        INSERT INTO forecast_verification (
+            city_id, lead_days, samples, mae, bias, first_date, last_date, run_date
+        )
+        SELECT
+            f.city_id,
+            f.lead_days,
+            COUNT(*),
+            AVG(ABS(f.avg_temp - o.temp_sum / o.temp_samples)),
+            AVG(f.avg_temp - o.temp_sum / o.temp_samples),
+            MIN(f.target_date),
+            MAX(f.target_date),
+            :today
+        {VERIFIED_ISSUES}
+          AND f.target_date >= :since
+        GROUP BY f.city_id, f.lead_days
+        """,
+        {**params, "since": since or "0000-01-01"},
+    )
+    verified = cursor.rowcount
+
+    # Day-ahead forecast vs observed daily mean, only where it changed
+    day_ahead = conn.execute(
+        f"""
+        SELECT c.name, f.target_date, f.avg_temp, o.temp_sum / o.temp_samples
+        {VERIFIED_ISSUES}
+          AND f.lead_days = 1
+          AND f.target_date >= date(:today, :lookback)
+          AND NOT EXISTS (
+              SELECT 1 FROM forecast_accuracy a
+              WHERE a.city_id = f.city_id
+                AND a.date = f.target_date
+                AND a.predicted_avg = f.avg_temp
+                AND a.actual_avg = o.temp_sum / o.temp_samples
+          )
+        """,
+        {**params, "lookback": f"-{lookback_days} days"},
+    ).fetchall()
+
+    for city, date, predicted_avg, actual_avg in day_ahead:
+        write_forecast_accuracy(conn, city, date, predicted_avg, actual_avg)
+
+    for (city,) in conn.execute(
         """
-        SELECT date, abs_error
-        FROM forecast_accuracy
-        WHERE city = ?
-        ORDER BY date
+        SELECT c.name FROM cities c JOIN forecast_verification v ON v.city_id = c.id
+        WHERE v.run_date = ?
+        GROUP BY c.id
+        """,
+        (today,),
+    ):
+        mark_dirty(conn, city)
+
+    # Logged even when nothing was verified, so the day counts as done
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO verification_runs (run_date, verified, ran_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        """,
+        (today, verified),
+    )
+
+    return verified
+
+
+def insert_verification(
+    conn,
+    today: str | None = None,
+    min_observations: int = VERIFY_MIN_OBSERVATIONS,
+    lookback_days: int = VERIFY_LOOKBACK_DAYS
+):
+    _commit(conn, write_verification, today or _utc_now()[:10], min_observations, lookback_days)
+
+
+def fetch_last_verification() -> str | None:
+    """
+    UTC date of the last verification run, with or without results.
+    """
+    with read_connection() as conn:
+        return conn.execute("SELECT MAX(run_date) FROM verification_runs").fetchone()[0]
+
+
+# Runs combined: (samples, mae, bias) weighted by each run's samples
+VERIFICATION_TOTALS = """
+SUM(samples),
+SUM(mae * samples) / SUM(samples),
+SUM(bias * samples) / SUM(samples)
+"""
+
+
+@cached_per_city
+def fetch_verification(city: str):
+    """
+    (lead_days, samples, mae, bias) rows for a city, by lead time,
+    over every verification run.
+    """
+    with read_connection() as conn:
+        city_id = lookup_city_id(conn, city)
+        if city_id is None:
+            return []
+
+        return conn.execute(
+            f"""
+            SELECT lead_days, {VERIFICATION_TOTALS}
+            FROM forecast_verification
+            WHERE city_id = ?
+            GROUP BY lead_days
+            ORDER BY lead_days
+            """,
+            (city_id,),
+        ).fetchall()
+
+
+def fetch_verification_matrix():
+    """
+    (city, lead_days, samples, mae, bias) for every verified city.
+    """
+    with read_connection() as conn:
+        return conn.execute(
+            f"""
+            SELECT c.name, v.lead_days, {VERIFICATION_TOTALS}
+            FROM forecast_verification v JOIN cities c ON c.id = v.city_id
+            GROUP BY v.city_id, v.lead_days
+            ORDER BY c.name, v.lead_days
+            """
+        ).fetchall()
+
+
+# ==================================================
+# City aliases (alternate spellings -> canonical city)
+# ==================================================
+def write_city_alias(conn, alias: str, city: str):
+    """
+    Map `alias` to the city the provider answered with (`city`).
+    """
+    key = city_key(alias)
+    city_id = intern_city(conn, city)
+
+    if not key or key == city_key(city):
+        return
+
+    conn.execute(
+        """
+        INSERT INTO city_aliases (alias_key, city_id)
+        VALUES (?, ?)
+        ON CONFLICT (alias_key) DO UPDATE SET city_id = excluded.city_id
+        """,
+        (key, city_id),
+    )
+    # Reads cached under the alias may have missed the city
+    mark_dirty(conn, alias)
+
+
+def fetch_city_index() -> list[tuple[str, str]]:
+    """
+    (lookup key, canonical name) for every city name and alias.
+    """
+    with read_connection() as conn:
+        return conn.execute(
+            """
+            SELECT name_key, name FROM cities
+            UNION ALL
+            SELECT a.alias_key, c.name
+            FROM city_aliases a JOIN cities c ON c.id = a.city_id
+            """
+        ).fetchall()
+
+
+# ==================================================
+# Watchlist (cities kept warm by the refresh scheduler)
+# ==================================================
+def write_watchlist_view(conn, city: str):
+    city_id = intern_city(conn, city)
+
+    conn.execute(
+        """
+        INSERT INTO watchlist (city_id, views, last_viewed_at)
+        VALUES (?, 1, ?)
+        ON CONFLICT (city_id) DO UPDATE SET
+            views = views + 1,
+            last_viewed_at = excluded.last_viewed_at
         """,
-        (city,),
+        (city_id, _utc_now()),
     )
 
-    return cursor.fetchall()
+
+def fetch_watchlist(limit: int, hot_hours: float) -> list[str]:
+    """
+    Names of the most viewed cities seen in the last `hot_hours`.
+    """
+    with read_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT c.name
+            FROM watchlist w JOIN cities c ON c.id = w.city_id
+            WHERE w.last_viewed_at >= datetime('now', ?)
+            ORDER BY w.views DESC, w.last_viewed_at DESC
+            LIMIT ?
+            """,
+            (f"-{hot_hours} hours", limit),
+        ).fetchall()
+
+    return [name for (name,) in rows]
+
+
+# ==================================================
+# API usage (provider quota accounting)
+# ==================================================
+def write_api_usage(conn, provider: str, day: str, requests: int = 0, rejected: int = 0):
+    conn.execute(
+        """
+        INSERT INTO api_usage (provider, day, requests, rejected)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (provider, day) DO UPDATE SET
+            requests = requests + excluded.requests,
+            rejected = rejected + excluded.rejected
+        """,
+        (provider, day, requests, rejected),
+    )
+
+
+def write_api_quota_reservation(conn, provider: str, day: str, quota: int) -> tuple[bool, int]:
+    """
+    Count one request for `provider` on `day` if fewer than `quota` are
+    recorded. The check and the increment share the writer's
+    transaction, so every process using the database sees one count.
+    Returns (granted, requests recorded).
+    """
+    conn.execute(
+        """
+        INSERT INTO api_usage (provider, day) VALUES (?, ?)
+        ON CONFLICT (provider, day) DO NOTHING
+        """,
+        (provider, day),
+    )
+    granted = conn.execute(
+        """
+        UPDATE api_usage SET requests = requests + 1
+        WHERE provider = ? AND day = ? AND requests < ?
+        """,
+        (provider, day, quota),
+    ).rowcount == 1
+
+    requests = conn.execute(
+        "SELECT requests FROM api_usage WHERE provider = ? AND day = ?",
+        (provider, day),
+    ).fetchone()[0]
+    return granted, requests
+
+
+def fetch_api_usage(provider: str, day: str) -> tuple[int, int]:
+    """
+    (requests, rejected) recorded for `provider` on UTC `day`.
+    """
+    with read_connection() as conn:
+        row = conn.execute(
+            "SELECT requests, rejected FROM api_usage WHERE provider = ? AND day = ?",
+            (provider, day),
+        ).fetchone()
+
+    return row if row else (0, 0)
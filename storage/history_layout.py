@@ -0,0 +1,331 @@
+# Physical layouts for raw weather snapshots.
+#
+# Both layouts expose the same SQL shapes so database.py and archive.py
+# do not care which one is active:
+# - insert_sql / insert_params(city_id, timestamp, data)
+# - replaced_sql: (city_id, timestamp) -> (temperature, health, humidity)
+#   of the row an insert would replace, or None if inserts never replace
+# - recent_sql: (city_id, limit) -> (timestamp, temperature, health)
+# - range_sql: (city_id, start, end) -> (timestamp, temperature, health)
+# - latest_sql: (city_id,) -> newest snapshot (temperature .. health, timestamp)
+# - archive_sql / delete_sql: (cutoff, watermark) for retention
+# - scan_sql: (*after_key, limit) -> next rows in key order for backfills
+#   (key_columns, city_id, timestamp, temperature, humidity, wind_speed,
+#   comfort, health); scan_start is the key before the first row
+# - update_scores_sql / update_scores_params(key, comfort, health)
+# - bucket_health_sql: (city_id, start, end) -> (COUNT, MIN, MAX) of health
+# - rollup_rows_sql: () -> every hot row as (city_id, timestamp, temp,
+#   health, humidity), named like models.ROLLUP_METRICS
+from config.settings import HISTORY_LAYOUT
+
+
+def _scaled(value, factor: int):
+    return None if value is None else int(round(value * factor))
+
+
+class RowidLayout:
+    name = "rowid"
+    table = "weather_history"
+
+    insert_sql = """
+    INSERT INTO weather_history (
+        city_id,
+        temperature,
+        feels_like,
+        humidity,
+        pressure,
+        wind_speed,
+        condition,
+        comfort,
+        health,
+        timestamp
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def insert_params(city_id: int, timestamp: str, data: dict) -> tuple:
+        return (
+            city_id,
+            data["temperature"],
+            data["feels_like"],
+            data["humidity"],
+            data["pressure"],
+            data["wind_speed"],
+            data["condition"],
+            data["comfort"],
+            data["health"],
+            timestamp,
+        )
+
+    # Every insert is a new row
+    replaced_sql = None
+
+    recent_sql = """
+    SELECT timestamp, temperature, health
+    FROM (
+        SELECT
+            datetime(timestamp) AS timestamp,
+            temperature,
+            health
+        FROM weather_history
+        WHERE city_id = ?
+        ORDER BY weather_history.timestamp DESC
+        LIMIT ?
+    )
+    ORDER BY timestamp ASC
+    """
+
+    range_sql = """
+    SELECT datetime(timestamp), temperature, health
+    FROM weather_history
+    WHERE city_id = ? AND timestamp BETWEEN ? AND ?
+    ORDER BY timestamp
+    """
+
+    latest_sql = """
+    SELECT
+        temperature, feels_like, humidity, pressure, wind_speed,
+        condition, comfort, health, datetime(timestamp)
+    FROM weather_history
+    WHERE city_id = ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+    """
+
+    # Same column order as the Arrow schema in storage.archive
+    archive_sql = """
+    SELECT
+        t.id, t.city_id, c.name AS city, t.temperature, t.feels_like,
+        t.humidity, t.pressure, t.wind_speed, t.condition, t.comfort,
+        t.health, t.timestamp
+    FROM weather_history t JOIN cities c ON c.id = t.city_id
+    WHERE t.timestamp < ? AND t.rowid <= ?
+    """
+    delete_sql = "DELETE FROM weather_history WHERE timestamp < ? AND rowid <= ?"
+    # Upper bound so rows written while archiving are never deleted unarchived
+    watermark_sql = "SELECT COALESCE(MAX(rowid), 0) FROM weather_history"
+
+    key_columns = ("id",)
+    scan_start = (0,)
+    scan_sql = """
+    SELECT
+        id, city_id, datetime(timestamp) AS timestamp,
+        temperature, humidity, wind_speed, comfort, health
+    FROM weather_history
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+    """
+
+    update_scores_sql = "UPDATE weather_history SET comfort = ?, health = ? WHERE id = ?"
+
+    @staticmethod
+    def update_scores_params(key: tuple, comfort: float | None, health: int | None) -> tuple:
+        return (comfort, health, *key)
+
+    bucket_health_sql = """
+    SELECT COUNT(*), MIN(health), MAX(health)
+    FROM weather_history
+    WHERE city_id = ? AND timestamp BETWEEN ? AND ?
+    """
+
+    rollup_rows_sql = """
+    SELECT city_id, timestamp, temperature AS temp, health, humidity
+    FROM weather_history
+    """
+
+
+class CompactLayout:
+    name = "compact"
+    table = "weather_history_compact"
+
+    # A second snapshot in the same second replaces the first
+    insert_sql = """
+    INSERT OR REPLACE INTO weather_history_compact (
+        city_id,
+        ts,
+        temp_c100,
+        feels_c100,
+        humidity,
+        pressure_d10,
+        wind_c100,
+        condition,
+        comfort_c100,
+        health
+    ) VALUES (?, CAST(strftime('%s', ?) AS INTEGER), ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def insert_params(city_id: int, timestamp: str, data: dict) -> tuple:
+        return (
+            city_id,
+            timestamp,
+            _scaled(data["temperature"], 100),
+            _scaled(data["feels_like"], 100),
+            data["humidity"],
+            _scaled(data["pressure"], 10),
+            _scaled(data["wind_speed"], 100),
+            data["condition"],
+            _scaled(data["comfort"], 100),
+            data["health"],
+        )
+
+    replaced_sql = """
+    SELECT temp_c100 / 100.0, health, humidity
+    FROM weather_history_compact
+    WHERE city_id = ? AND ts = CAST(strftime('%s', ?) AS INTEGER)
+    """
+
+    recent_sql = """
+    SELECT datetime(ts, 'unixepoch'), temp_c100 / 100.0, health
+    FROM (
+        SELECT ts, temp_c100, health
+        FROM weather_history_compact
+        WHERE city_id = ?
+        ORDER BY ts DESC
+        LIMIT ?
+    )
+    ORDER BY ts ASC
+    """
+
+    range_sql = """
+    SELECT datetime(ts, 'unixepoch'), temp_c100 / 100.0, health
+    FROM weather_history_compact
+    WHERE city_id = ?
+      AND ts BETWEEN CAST(strftime('%s', ?) AS INTEGER)
+                 AND CAST(strftime('%s', ?) AS INTEGER)
+    ORDER BY ts
+    """
+
+    latest_sql = """
+    SELECT
+        temp_c100 / 100.0, feels_c100 / 100.0, humidity, pressure_d10 / 10.0,
+        wind_c100 / 100.0, condition, comfort_c100 / 100.0, health,
+        datetime(ts, 'unixepoch')
+    FROM weather_history_compact
+    WHERE city_id = ?
+    ORDER BY ts DESC
+    LIMIT 1
+    """
+
+    archive_sql = """
+    SELECT
+        NULL AS id, t.city_id, c.name AS city,
+        t.temp_c100 / 100.0, t.feels_c100 / 100.0, t.humidity,
+        CAST(ROUND(t.pressure_d10 / 10.0) AS INTEGER), t.wind_c100 / 100.0,
+        t.condition, t.comfort_c100 / 100.0, t.health,
+        datetime(t.ts, 'unixepoch') AS timestamp
+    FROM weather_history_compact t JOIN cities c ON c.id = t.city_id
+    WHERE t.ts < CAST(strftime('%s', ?) AS INTEGER) AND t.ts <= ?
+    """
+    delete_sql = """
+    DELETE FROM weather_history_compact
+    WHERE ts < CAST(strftime('%s', ?) AS INTEGER) AND ts <= ?
+    """
+    watermark_sql = "SELECT COALESCE(MAX(ts), 0) FROM weather_history_compact"
+
+    key_columns = ("city_id", "ts")
+    scan_start = (0, 0)
+    scan_sql = """
+    SELECT
+        city_id, ts, datetime(ts, 'unixepoch') AS timestamp,
+        temp_c100 / 100.0 AS temperature, humidity, wind_c100 / 100.0 AS wind_speed,
+        comfort_c100 / 100.0 AS comfort, health
+    FROM weather_history_compact
+    WHERE (city_id, ts) > (?, ?)
+    ORDER BY city_id, ts
+    LIMIT ?
+    """
+
+    update_scores_sql = """
+    UPDATE weather_history_compact SET comfort_c100 = ?, health = ?
+    WHERE city_id = ? AND ts = ?
+    """
+
+    @staticmethod
+    def update_scores_params(key: tuple, comfort: float | None, health: int | None) -> tuple:
+        return (_scaled(comfort, 100), health, *key)
+
+    bucket_health_sql = """
+    SELECT COUNT(*), MIN(health), MAX(health)
+    FROM weather_history_compact
+    WHERE city_id = ?
+      AND ts BETWEEN CAST(strftime('%s', ?) AS INTEGER)
+                 AND CAST(strftime('%s', ?) AS INTEGER)
+    """
+
+    rollup_rows_sql = """
+    SELECT
+        city_id,
+        datetime(ts, 'unixepoch') AS timestamp,
+        temp_c100 / 100.0 AS temp,
+        health,
+        humidity
+    FROM weather_history_compact
+    """
+
+
+LAYOUTS = {
+    RowidLayout.name: RowidLayout,
+    CompactLayout.name: CompactLayout,
+}
+
+
+def get_history_layout(name: str | None = None):
+    try:
+        return LAYOUTS[name or HISTORY_LAYOUT]
+    except KeyError:
+        raise ValueError(f"Unknown history layout: {name or HISTORY_LAYOUT}")
+
+
+def copy_history(conn, source: str, target: str) -> int:
+    """
+    Copy every snapshot from one layout into the other (idempotent).
+    Returns the number of rows written.
+    """
+    if source == target:
+        return 0
+
+    if target == CompactLayout.name:
+        # Scale with the same rounding as CompactLayout.insert_params
+        # (Python's round; SQLite's ROUND breaks ties differently)
+        conn.create_function("scaled", 2, _scaled, deterministic=True)
+        sql = """
+        INSERT OR IGNORE INTO weather_history_compact
+        SELECT
+            city_id,
+            CAST(strftime('%s', timestamp) AS INTEGER),
+            scaled(temperature, 100),
+            scaled(feels_like, 100),
+            humidity,
+            scaled(pressure, 10),
+            scaled(wind_speed, 100),
+            condition,
+            scaled(comfort, 100),
+            health
+        FROM weather_history
+        ORDER BY city_id, timestamp
+        """
+    else:
+        sql = """
+        INSERT INTO weather_history (
+            city_id, temperature, feels_like, humidity, pressure,
+            wind_speed, condition, comfort, health, timestamp
+        )
+        SELECT
+            t.city_id, t.temp_c100 / 100.0, t.feels_c100 / 100.0, t.humidity,
+            CAST(ROUND(t.pressure_d10 / 10.0) AS INTEGER), t.wind_c100 / 100.0,
+            t.condition, t.comfort_c100 / 100.0, t.health,
+            datetime(t.ts, 'unixepoch')
+        FROM weather_history_compact t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM weather_history h
+            WHERE h.city_id = t.city_id
+              AND h.timestamp = datetime(t.ts, 'unixepoch')
+        )
+        ORDER BY t.ts
+        """
+
+    cursor = conn.execute(sql)
+    conn.commit()
+    return cursor.rowcount
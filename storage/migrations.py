@@ -1,5 +1,36 @@
 import sqlite3
 
+from analytics.accuracy import AccuracyStats, error_bin
+from storage.models import (
+    CREATE_WEATHER_TABLE,
+    CREATE_FORECAST_TABLE,
+    CREATE_FORECAST_ACCURACY_TABLE,
+    CREATE_ROLLUP_TABLE,
+    CREATE_ARCHIVE_LOG_TABLE,
+    CREATE_CITIES_TABLE,
+    CREATE_WEATHER_TABLE_V5,
+    CREATE_FORECAST_TABLE_V5,
+    CREATE_FORECAST_ACCURACY_TABLE_V5,
+    CREATE_ROLLUP_TABLE_V5,
+    CREATE_WEATHER_COMPACT_TABLE,
+    CREATE_API_USAGE_TABLE,
+    CREATE_WATCHLIST_TABLE,
+    CREATE_CITY_ALIASES_TABLE,
+    CREATE_BACKFILL_JOBS_TABLE,
+    CREATE_ACCURACY_STATS_TABLE,
+    CREATE_ACCURACY_HISTOGRAM_TABLE,
+    CREATE_FORECAST_ISSUES_TABLE,
+    CREATE_FORECAST_VERIFICATION_TABLE,
+    CREATE_FORECAST_FINGERPRINTS_TABLE,
+    CREATE_VERIFICATION_RUNS_TABLE,
+    CREATE_FORECAST_VERIFICATION_TABLE_V15,
+    ROLLUP_BUCKETS,
+    ROLLUP_METRICS
+)
+from storage.cities import city_key
+from storage.history_layout import get_history_layout
+
+
 def get_table_columns(conn: sqlite3.Connection, table_name: str) -> set:
     cursor = conn.execute(f"PRAGMA table_info({table_name});")
     return {row[1] for row in cursor.fetchall()}  # row[1] = column name
@@ -10,16 +41,418 @@ def add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, col
 
     if column not in cols:
         conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type};")
-        conn.commit()
 
 
-def run_migrations(conn: sqlite3.Connection):
-    """
-    Run all schema migrations safely (non-destructive).
-    """
+# ==================================================
+# Migration steps
+# ==================================================
+# Each step runs inside its own transaction together with the
+# PRAGMA user_version bump, so a database is never left half-migrated.
+def _m001_base_schema(conn: sqlite3.Connection):
+    conn.execute(CREATE_WEATHER_TABLE)
+    conn.execute(CREATE_FORECAST_TABLE)
+    conn.execute(CREATE_FORECAST_ACCURACY_TABLE)
 
-    #  Migration: add missing columns in weather_forecast table
+    # Databases created before icon / rain_prob were cached
     add_column_if_missing(conn, "weather_forecast", "icon", "TEXT")
     add_column_if_missing(conn, "weather_forecast", "rain_prob", "INTEGER")
 
-     
+
+def _m002_indexes_and_unique_keys(conn: sqlite3.Connection):
+    # Keep the newest row per natural key before enforcing uniqueness
+    for table in ("weather_forecast", "forecast_accuracy"):
+        conn.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE rowid NOT IN (
+                SELECT MAX(rowid) FROM {table} GROUP BY city, date
+            )
+            """
+        )
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_weather_history_city_ts "
+        "ON weather_history (city, timestamp)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_weather_forecast_city_date "
+        "ON weather_forecast (city, date)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_forecast_accuracy_city_date "
+        "ON forecast_accuracy (city, date)"
+    )
+
+
+def _m003_history_rollups(conn: sqlite3.Connection):
+    for table, bucket in ROLLUP_BUCKETS.items():
+        conn.execute(CREATE_ROLLUP_TABLE.format(table=table))
+
+        # Backfill from existing snapshots
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {table}
+            SELECT
+                city,
+                strftime('{bucket}', timestamp),
+                COUNT(*),
+                MIN(temperature), MAX(temperature), SUM(temperature),
+                MIN(health), MAX(health), SUM(health),
+                MIN(humidity), MAX(humidity), SUM(humidity)
+            FROM weather_history
+            WHERE city IS NOT NULL AND timestamp IS NOT NULL
+            GROUP BY 1, 2
+            """
+        )
+
+
+def _m004_archive_log(conn: sqlite3.Connection):
+    conn.execute(CREATE_ARCHIVE_LOG_TABLE)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_forecast_accuracy_date "
+        "ON forecast_accuracy (date)"
+    )
+
+
+def _rebuild_table(conn: sqlite3.Connection, table: str, ddl: str, copy_sql: str):
+    """
+    SQLite cannot drop indexed columns in place: build `table`__new,
+    copy rows across, then swap it in under the original name.
+    """
+    new_table = f"{table}__new"
+    conn.execute(ddl.format(table=new_table))
+    conn.execute(copy_sql.format(new=new_table, old=table))
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+
+
+def _m005_city_dimension(conn: sqlite3.Connection):
+    conn.create_function("city_key", 1, city_key, deterministic=True)
+    conn.execute(CREATE_CITIES_TABLE)
+
+    # Every spelling seen so far; "london" and "London" share one id
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO cities (name, name_key)
+        SELECT TRIM(city), city_key(city)
+        FROM (
+            SELECT city FROM weather_history
+            UNION ALL SELECT city FROM weather_forecast
+            UNION ALL SELECT city FROM forecast_accuracy
+            UNION ALL SELECT city FROM weather_rollup_daily
+        )
+        WHERE city IS NOT NULL AND TRIM(city) != ''
+        """
+    )
+
+    join = "JOIN cities c ON c.name_key = city_key(t.city)"
+
+    _rebuild_table(
+        conn,
+        "weather_history",
+        CREATE_WEATHER_TABLE_V5,
+        f"""
+        INSERT INTO {{new}} (
+            id, city_id, temperature, feels_like, humidity, pressure,
+            wind_speed, condition, comfort, health, timestamp
+        )
+        SELECT
+            t.id, c.id, t.temperature, t.feels_like, t.humidity, t.pressure,
+            t.wind_speed, t.condition, t.comfort, t.health, t.timestamp
+        FROM {{old}} t {join}
+        """
+    )
+    conn.execute(
+        "CREATE INDEX idx_weather_history_city_ts "
+        "ON weather_history (city_id, timestamp)"
+    )
+
+    # Later rows win when two spellings collide on (city_id, date)
+    _rebuild_table(
+        conn,
+        "weather_forecast",
+        CREATE_FORECAST_TABLE_V5,
+        f"""
+        INSERT OR REPLACE INTO {{new}} (
+            city_id, date, min_temp, max_temp, avg_temp,
+            condition, icon, rain_prob, fetched_at
+        )
+        SELECT
+            c.id, t.date, t.min_temp, t.max_temp, t.avg_temp,
+            t.condition, t.icon, t.rain_prob, t.fetched_at
+        FROM {{old}} t {join}
+        ORDER BY t.fetched_at, t.rowid
+        """
+    )
+    _rebuild_table(
+        conn,
+        "forecast_accuracy",
+        CREATE_FORECAST_ACCURACY_TABLE_V5,
+        f"""
+        INSERT OR REPLACE INTO {{new}} (
+            city_id, date, predicted_avg, actual_avg, abs_error, created_at
+        )
+        SELECT
+            c.id, t.date, t.predicted_avg, t.actual_avg, t.abs_error, t.created_at
+        FROM {{old}} t {join}
+        ORDER BY t.created_at, t.rowid
+        """
+    )
+    conn.execute(
+        "CREATE INDEX idx_forecast_accuracy_date ON forecast_accuracy (date)"
+    )
+
+    for table in ROLLUP_BUCKETS:
+        _rebuild_table(
+            conn,
+            table,
+            CREATE_ROLLUP_TABLE_V5,
+            f"""
+            INSERT INTO {{new}}
+            SELECT
+                c.id, t.bucket, SUM(t.samples),
+                MIN(t.temp_min), MAX(t.temp_max), SUM(t.temp_sum),
+                MIN(t.health_min), MAX(t.health_max), SUM(t.health_sum),
+                MIN(t.humidity_min), MAX(t.humidity_max), SUM(t.humidity_sum)
+            FROM {{old}} t {join}
+            GROUP BY c.id, t.bucket
+            """
+        )
+
+
+def _m006_compact_history(conn: sqlite3.Connection):
+    # Created empty; `python migrate.py --copy-history compact` fills it
+    # before switching HISTORY_LAYOUT
+    conn.execute(CREATE_WEATHER_COMPACT_TABLE)
+
+
+def _m007_api_usage(conn: sqlite3.Connection):
+    conn.execute(CREATE_API_USAGE_TABLE)
+
+
+def _m008_watchlist(conn: sqlite3.Connection):
+    conn.execute(CREATE_WATCHLIST_TABLE)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_watchlist_last_viewed "
+        "ON watchlist (last_viewed_at)"
+    )
+
+
+def _m009_city_aliases(conn: sqlite3.Connection):
+    conn.execute(CREATE_CITY_ALIASES_TABLE)
+
+
+def _m010_backfill_jobs(conn: sqlite3.Connection):
+    conn.execute(CREATE_BACKFILL_JOBS_TABLE)
+
+
+def _m011_accuracy_aggregates(conn: sqlite3.Connection):
+    conn.execute(CREATE_ACCURACY_STATS_TABLE)
+    conn.execute(CREATE_ACCURACY_HISTOGRAM_TABLE)
+
+    # Seed from the rows already in SQLite
+    stats, bins = {}, {}
+    # Legacy rows may only have abs_error
+    for city_id, date, error in conn.execute(
+        """
+        SELECT city_id, date, COALESCE(predicted_avg - actual_avg, abs_error)
+        FROM forecast_accuracy
+        WHERE COALESCE(predicted_avg - actual_avg, abs_error) IS NOT NULL
+        ORDER BY city_id, date
+        """
+    ):
+        stats.setdefault(city_id, AccuracyStats()).add(date, error)
+        key = (city_id, error_bin(abs(error)))
+        bins[key] = bins.get(key, 0) + 1
+
+    conn.executemany(
+        """
+        INSERT INTO accuracy_stats (
+            city_id, samples, error_sum, error_sq_sum, bias_sum,
+            ewma_mae, ewma_before, recent, last_date
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(city_id, *s.to_row()) for city_id, s in stats.items()]
+    )
+    conn.executemany(
+        "INSERT INTO accuracy_histogram (city_id, bin, samples) VALUES (?, ?, ?)",
+        [(city_id, b, n) for (city_id, b), n in bins.items()]
+    )
+
+
+def _m012_forecast_verification(conn: sqlite3.Connection):
+    conn.execute(CREATE_FORECAST_ISSUES_TABLE)
+    conn.execute(CREATE_FORECAST_VERIFICATION_TABLE)
+
+    # The latest stored run of every city is the only issue known so far
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO forecast_issues (
+            city_id, target_date, lead_days, min_temp, max_temp, avg_temp, issued_at
+        )
+        SELECT
+            city_id, date,
+            CAST(julianday(date) - julianday(date(fetched_at)) AS INTEGER),
+            min_temp, max_temp, avg_temp, fetched_at
+        FROM weather_forecast
+        WHERE fetched_at IS NOT NULL AND date >= date(fetched_at)
+        """
+    )
+
+
+def _m013_forecast_fingerprints(conn: sqlite3.Connection):
+    # Empty to start with: the first write per city stores its fingerprint
+    conn.execute(CREATE_FORECAST_FINGERPRINTS_TABLE)
+
+
+def _m014_verification_runs(conn: sqlite3.Connection):
+    conn.execute(CREATE_VERIFICATION_RUNS_TABLE)
+
+    # Runs so far are only known through the results they left
+    conn.execute(
+        """
+        INSERT INTO verification_runs (run_date, verified)
+        SELECT run_date, COUNT(*) FROM forecast_verification GROUP BY run_date
+        """
+    )
+
+
+def _m015_verification_per_run(conn: sqlite3.Connection):
+    # Existing rows become the first run: every day before its run_date
+    _rebuild_table(
+        conn,
+        "forecast_verification",
+        CREATE_FORECAST_VERIFICATION_TABLE_V15,
+        """
+        INSERT INTO {new} (
+            city_id, lead_days, run_date, samples, mae, bias, first_date, last_date
+        )
+        SELECT city_id, lead_days, run_date, samples, mae, bias, first_date, last_date
+        FROM {old}
+        """
+    )
+    conn.execute(
+        "CREATE INDEX idx_forecast_verification_run ON forecast_verification (run_date)"
+    )
+
+
+def _m016_rollup_metric_samples(conn: sqlite3.Connection):
+    hot = get_history_layout().rollup_rows_sql
+    metrics = ", ".join(
+        f"COUNT({m}) AS {m}_samples, MIN({m}) AS {m}_min, "
+        f"MAX({m}) AS {m}_max, SUM({m}) AS {m}_sum"
+        for m in ROLLUP_METRICS
+    )
+    columns = ", ".join(
+        f"{m}_samples, {m}_min, {m}_max, {m}_sum" for m in ROLLUP_METRICS
+    )
+
+    for table, bucket in ROLLUP_BUCKETS.items():
+        for metric in ROLLUP_METRICS:
+            add_column_if_missing(
+                conn, table, f"{metric}_samples", "INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.execute(
+                f"""
+                UPDATE {table}
+                SET {metric}_samples = CASE WHEN {metric}_sum IS NULL THEN 0 ELSE samples END
+                """
+            )
+
+        # Buckets whose raw rows are all still hot are recounted from them,
+        # which also repairs sums a NULL snapshot poisoned. Partly archived
+        # buckets keep the estimate above: a poisoned metric stays empty.
+        conn.execute("DROP TABLE IF EXISTS temp.rollup_recount")
+        conn.execute(
+            f"""
+            CREATE TEMP TABLE rollup_recount AS
+            SELECT
+                city_id,
+                strftime('{bucket}', timestamp) AS bucket,
+                COUNT(*) AS samples,
+                {metrics}
+            FROM ({hot})
+            GROUP BY 1, 2
+            """
+        )
+        conn.execute("CREATE INDEX temp.idx_rollup_recount ON rollup_recount (city_id, bucket)")
+        conn.execute(
+            f"""
+            UPDATE {table} SET ({columns}) = (
+                SELECT {columns}
+                FROM rollup_recount r
+                WHERE r.city_id = {table}.city_id AND r.bucket = {table}.bucket
+            )
+            WHERE EXISTS (
+                SELECT 1
+                FROM rollup_recount r
+                WHERE r.city_id = {table}.city_id
+                  AND r.bucket = {table}.bucket
+                  AND r.samples = {table}.samples
+            )
+            """
+        )
+        conn.execute("DROP TABLE temp.rollup_recount")
+
+
+# Ordered (version, description, step). Append only — never renumber.
+MIGRATIONS = [
+    (1, "Base schema: weather history, forecast cache, forecast accuracy", _m001_base_schema),
+    (2, "Indexes on (city, timestamp/date) and unique (city, date) keys", _m002_indexes_and_unique_keys),
+    (3, "Hourly and daily weather_history rollup tables", _m003_history_rollups),
+    (4, "Archive log for Parquet retention runs", _m004_archive_log),
+    (5, "City dimension table; fact tables reference cities.id", _m005_city_dimension),
+    (6, "Compact clustered WITHOUT ROWID history table", _m006_compact_history),
+    (7, "Per-provider daily API usage counters", _m007_api_usage),
+    (8, "City watchlist for background refresh", _m008_watchlist),
+    (9, "City alias map (alternate spellings -> cities.id)", _m009_city_aliases),
+    (10, "Checkpoints for resumable backfill jobs", _m010_backfill_jobs),
+    (11, "Running per-city forecast accuracy aggregates and error histogram", _m011_accuracy_aggregates),
+    (12, "Forecast issues by lead time and nightly verification results", _m012_forecast_verification),
+    (13, "Per-city forecast content fingerprints (skip unchanged rewrites)", _m013_forecast_fingerprints),
+    (14, "Verification run log (runs without results count too)", _m014_verification_runs),
+    (15, "Forecast verification kept per run (incremental by run_date)", _m015_verification_per_run),
+    (16, "Per-metric sample counts on the hourly/daily rollups", _m016_rollup_metric_samples),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ==================================================
+# Runner
+# ==================================================
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(conn: sqlite3.Connection) -> list:
+    current = get_schema_version(conn)
+    return [m for m in MIGRATIONS if m[0] > current]
+
+
+def run_migrations(conn: sqlite3.Connection) -> list:
+    """
+    Apply every pending migration in order.
+    Returns the (version, description) pairs that were applied.
+    """
+    applied = []
+
+    for version, description, step in pending_migrations(conn):
+        # IMMEDIATE takes the write lock up front so two processes
+        # starting together cannot both apply the same step.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append((version, description))
+
+    return applied
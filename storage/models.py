@@ -1,3 +1,4 @@
+# Initial layout (migration 001); later migrations reshape these tables
 CREATE_WEATHER_TABLE = """
 CREATE TABLE IF NOT EXISTS weather_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -13,6 +14,19 @@ CREATE TABLE IF NOT EXISTS weather_history (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 """
+CREATE_FORECAST_TABLE = """
+CREATE TABLE IF NOT EXISTS weather_forecast (
+    city TEXT,
+    date TEXT,
+    min_temp REAL,
+    max_temp REAL,
+    avg_temp REAL,
+    condition TEXT,
+    icon TEXT,
+    rain_prob INTEGER,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
 CREATE_FORECAST_ACCURACY_TABLE = """
 CREATE TABLE IF NOT EXISTS forecast_accuracy (
     city TEXT,
@@ -23,3 +37,291 @@ CREATE TABLE IF NOT EXISTS forecast_accuracy (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 )
 """
+# Incremental rollups of weather_history, one row per (city, bucket).
+# {table} is weather_rollup_hourly ('YYYY-MM-DD HH:00:00' buckets)
+# or weather_rollup_daily ('YYYY-MM-DD' buckets); mean = sum / samples.
+CREATE_ROLLUP_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    city TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    temp_min REAL,
+    temp_max REAL,
+    temp_sum REAL,
+    health_min INTEGER,
+    health_max INTEGER,
+    health_sum REAL,
+    humidity_min INTEGER,
+    humidity_max INTEGER,
+    humidity_sum REAL,
+    PRIMARY KEY (city, bucket)
+) WITHOUT ROWID
+"""
+
+# strftime() format of each rollup's bucket
+ROLLUP_BUCKETS = {
+    "weather_rollup_hourly": "%Y-%m-%d %H:00:00",
+    "weather_rollup_daily": "%Y-%m-%d",
+}
+# One row per retention run and table; the newest cutoff is the point
+# before which rows live only in the Parquet archive
+CREATE_ARCHIVE_LOG_TABLE = """
+CREATE TABLE IF NOT EXISTS archive_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    cutoff TEXT NOT NULL,
+    rows_archived INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# ==================================================
+# City dimension (migration 005). Fact tables below reference
+# cities.id instead of repeating the city name on every row.
+# ==================================================
+CREATE_CITIES_TABLE = """
+CREATE TABLE IF NOT EXISTS cities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL UNIQUE,
+    lat REAL,
+    lon REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+CREATE_WEATHER_TABLE_V5 = """
+CREATE TABLE {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    city_id INTEGER NOT NULL REFERENCES cities (id),
+    temperature REAL,
+    feels_like REAL,
+    humidity INTEGER,
+    pressure INTEGER,
+    wind_speed REAL,
+    condition TEXT,
+    comfort REAL,
+    health INTEGER,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+CREATE_FORECAST_TABLE_V5 = """
+CREATE TABLE {table} (
+    city_id INTEGER NOT NULL REFERENCES cities (id),
+    date TEXT NOT NULL,
+    min_temp REAL,
+    max_temp REAL,
+    avg_temp REAL,
+    condition TEXT,
+    icon TEXT,
+    rain_prob INTEGER,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (city_id, date)
+)
+"""
+CREATE_FORECAST_ACCURACY_TABLE_V5 = """
+CREATE TABLE {table} (
+    city_id INTEGER NOT NULL REFERENCES cities (id),
+    date TEXT NOT NULL,
+    predicted_avg REAL,
+    actual_avg REAL,
+    abs_error REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (city_id, date)
+)
+"""
+CREATE_ROLLUP_TABLE_V5 = """
+CREATE TABLE {table} (
+    city_id INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    temp_min REAL,
+    temp_max REAL,
+    temp_sum REAL,
+    health_min INTEGER,
+    health_max INTEGER,
+    health_sum REAL,
+    humidity_min INTEGER,
+    humidity_max INTEGER,
+    humidity_sum REAL,
+    PRIMARY KEY (city_id, bucket)
+) WITHOUT ROWID
+"""
+
+# Compact clustered history (migration 006, HISTORY_LAYOUT=compact).
+# Rows for one city are stored together, ordered by time.
+# Scaled integers: *_c100 = value x 100, pressure_d10 = hPa x 10.
+CREATE_WEATHER_COMPACT_TABLE = """
+CREATE TABLE IF NOT EXISTS weather_history_compact (
+    city_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    temp_c100 INTEGER,
+    feels_c100 INTEGER,
+    humidity INTEGER,
+    pressure_d10 INTEGER,
+    wind_c100 INTEGER,
+    condition TEXT,
+    comfort_c100 INTEGER,
+    health INTEGER,
+    PRIMARY KEY (city_id, ts)
+) WITHOUT ROWID
+"""
+
+
+# Provider request counters per UTC day (migration 007), so daily
+# quota use survives restarts
+CREATE_API_USAGE_TABLE = """
+CREATE TABLE IF NOT EXISTS api_usage (
+    provider TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, day)
+) WITHOUT ROWID
+"""
+
+
+# Cities viewed on the dashboard (migration 008); the refresh
+# scheduler keeps the most viewed recent ones warm
+CREATE_WATCHLIST_TABLE = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    city_id INTEGER PRIMARY KEY REFERENCES cities(id),
+    views INTEGER NOT NULL DEFAULT 0,
+    last_viewed_at TEXT NOT NULL
+)
+"""
+
+
+# Other spellings of a city (migration 009): "new delhi", "delhi "
+# -> the cities row named by the provider's answer
+CREATE_CITY_ALIASES_TABLE = """
+CREATE TABLE IF NOT EXISTS city_aliases (
+    alias_key TEXT PRIMARY KEY,
+    city_id INTEGER NOT NULL REFERENCES cities(id),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID
+"""
+
+
+# Progress of resumable backfill jobs (migration 010). position is the
+# JSON of the last key rescored or the number of input rows imported;
+# it is written in the same transaction as the rows themselves
+CREATE_BACKFILL_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS backfill_jobs (
+    job TEXT PRIMARY KEY,
+    position TEXT NOT NULL,
+    rows_read INTEGER NOT NULL DEFAULT 0,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    finished_at TEXT
+)
+"""
+
+
+# Running forecast-error aggregates per city (migration 011), updated
+# with every forecast_accuracy write; they outlive archived rows.
+# recent is a JSON list of the last ACCURACY_WINDOW absolute errors
+CREATE_ACCURACY_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS accuracy_stats (
+    city_id INTEGER PRIMARY KEY REFERENCES cities(id),
+    samples INTEGER NOT NULL,
+    error_sum REAL NOT NULL,
+    error_sq_sum REAL NOT NULL,
+    bias_sum REAL NOT NULL,
+    ewma_mae REAL,
+    ewma_before REAL,
+    recent TEXT NOT NULL,
+    last_date TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+)
+"""
+CREATE_ACCURACY_HISTOGRAM_TABLE = """
+CREATE TABLE IF NOT EXISTS accuracy_histogram (
+    city_id INTEGER NOT NULL REFERENCES cities(id),
+    bin INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (city_id, bin)
+) WITHOUT ROWID
+"""
+
+
+# Every forecast kept by lead time (migration 012): weather_forecast
+# only holds the latest run, this keeps what was predicted N days
+# ahead (lead_days = target_date - the provider's local issue date;
+# latest run of a day wins)
+CREATE_FORECAST_ISSUES_TABLE = """
+CREATE TABLE IF NOT EXISTS forecast_issues (
+    city_id INTEGER NOT NULL REFERENCES cities(id),
+    target_date TEXT NOT NULL,
+    lead_days INTEGER NOT NULL,
+    min_temp REAL,
+    max_temp REAL,
+    avg_temp REAL,
+    issued_at TEXT NOT NULL,
+    PRIMARY KEY (city_id, target_date, lead_days)
+) WITHOUT ROWID
+"""
+# Nightly verification of forecast_issues against observed daily means
+# (weather_rollup_daily), one pass per run. From migration 015 on it
+# holds one row set per run_date (see CREATE_FORECAST_VERIFICATION_TABLE_V15)
+CREATE_FORECAST_VERIFICATION_TABLE = """
+CREATE TABLE IF NOT EXISTS forecast_verification (
+    city_id INTEGER NOT NULL REFERENCES cities(id),
+    lead_days INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    mae REAL,
+    bias REAL,
+    first_date TEXT,
+    last_date TEXT,
+    run_date TEXT NOT NULL,
+    PRIMARY KEY (city_id, lead_days)
+) WITHOUT ROWID
+"""
+
+
+# Content hash of each city's last stored forecast run (migration 013).
+# A refetch with the same content only bumps fetched_at here instead of
+# rewriting the weather_forecast rows; changed_at is the last real change
+CREATE_FORECAST_FINGERPRINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS forecast_fingerprints (
+    city_id INTEGER PRIMARY KEY REFERENCES cities(id),
+    fingerprint TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+)
+"""
+
+
+# One row per verification run (migration 014), so a run that verified
+# nothing (e.g. too few observed days) still counts as done for the day
+CREATE_VERIFICATION_RUNS_TABLE = """
+CREATE TABLE IF NOT EXISTS verification_runs (
+    run_date TEXT PRIMARY KEY,
+    verified INTEGER NOT NULL,
+    ran_at TEXT DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID
+"""
+
+
+# forecast_verification kept per run (migration 015): each run adds the
+# target days completed since the previous run, so earlier results stay
+# and reads weight every run by its samples
+CREATE_FORECAST_VERIFICATION_TABLE_V15 = """
+CREATE TABLE {table} (
+    city_id INTEGER NOT NULL REFERENCES cities(id),
+    lead_days INTEGER NOT NULL,
+    run_date TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    mae REAL,
+    bias REAL,
+    first_date TEXT,
+    last_date TEXT,
+    PRIMARY KEY (city_id, lead_days, run_date)
+) WITHOUT ROWID
+"""
+
+
+# Per-metric sample counts on both rollups (migration 016): a snapshot
+# with a NULL metric counts in `samples` but not in that metric's
+# min / max / sum, so metric means are {metric}_sum / {metric}_samples
+ROLLUP_METRICS = ("temp", "health", "humidity")
@@ -0,0 +1,134 @@
+import threading
+
+import pandas as pd
+from cachetools import TTLCache
+
+from config.settings import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from storage.cities import city_key, db_file, lookup_city_id
+
+
+class QueryCache:
+    """
+    Process-wide cache of per-city query results.
+
+    Every (database, city scope) pair has a generation number (see
+    cache_scope: every spelling of a known city shares one). Entries are
+    stored with the generation they were read under and are only served
+    while it is still current. Writers bump it after commit, so an
+    entry read before a commit can never outlive it, even when a reader
+    races the writer. Memory is bounded by an LRU (with a TTL backstop
+    for writes made by other processes).
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, db_path: str, query: str, city_scope, args: tuple, loader):
+        scope = (db_path, city_scope)
+        key = (scope, query, args)
+
+        with self._lock:
+            generation = self._generations.get(scope, 0)
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] == generation:
+                self.hits += 1
+                return _copy(entry[1])
+
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            # Skip storing if a write landed while we were reading
+            if self._generations.get(scope, 0) == generation:
+                self._entries[key] = (generation, value)
+
+        return _copy(value)
+
+    def invalidate(self, db_path: str, city_scope):
+        scope = (db_path, city_scope)
+
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations = {
+                scope: generation + 1
+                for scope, generation in self._generations.items()
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "maxsize": self._entries.maxsize,
+            }
+
+
+def _copy(value):
+    # Callers may mutate what they get back; keep the cached copy pristine
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        # Snapshot features are flat, a shallow copy is enough
+        return dict(value)
+    return value
+
+
+QUERY_CACHE = QueryCache()
+
+
+# ==================================================
+# Post-commit invalidation
+# ==================================================
+# write_* functions record the cities they touched against their
+# connection; the committer invalidates them only once the data is
+# visible to readers.
+_dirty = {}
+_dirty_lock = threading.Lock()
+
+
+def cache_scope(conn, city: str):
+    """
+    Cache scope of a city name: its cities.id once the city exists, so
+    the canonical name and every alias share one scope; its lookup key
+    before that.
+    """
+    city_id = lookup_city_id(conn, city)
+    return city_key(city) if city_id is None else city_id
+
+
+def mark_dirty(conn, city: str):
+    scope = cache_scope(conn, city)
+
+    with _dirty_lock:
+        _dirty.setdefault(id(conn), set()).add((db_file(conn), scope))
+
+
+def flush_dirty(conn):
+    """
+    Invalidate every city written on `conn` since the last flush.
+    Call after COMMIT (or ROLLBACK — a spurious bump is harmless).
+    """
+    with _dirty_lock:
+        touched = _dirty.pop(id(conn), ())
+
+    for db_path, scope in touched:
+        QUERY_CACHE.invalidate(db_path, scope)
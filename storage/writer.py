@@ -0,0 +1,289 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config.settings import DB_WRITER_BATCH_SIZE, DB_WRITER_FLUSH_MS
+from storage import database
+from storage.cities import clear_city_cache
+from storage.query_cache import flush_dirty
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """
+    Single writer thread that owns the only write connection.
+
+    Callers enqueue write jobs and get a Future back. The thread drains
+    the queue into batches (up to `batch_size` jobs or `flush_ms` after
+    the first one) and commits each batch once. Every job runs inside
+    its own SAVEPOINT, so one bad row fails only its own Future.
+    Futures resolve after the batch commit, so a caller waiting on
+    `.result()` can read its own write. If the thread itself fails (the
+    database cannot be opened, a SAVEPOINT or COMMIT errors out), every
+    pending Future gets the error and the writer closes.
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        batch_size: int = DB_WRITER_BATCH_SIZE,
+        flush_ms: float = DB_WRITER_FLUSH_MS
+    ):
+        self.db_path = db_path or database.DB_PATH
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(0.0, flush_ms) / 1000
+
+        self.batches = 0
+        self.jobs = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Held while checking _closed and enqueueing, so a dying thread
+        # can't miss a job queued after its final drain
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sqlite-writer",
+            daemon=True
+        )
+        self._thread.start()
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(self, fn, *args) -> Future:
+        """
+        Queue `fn(conn, *args)` for the writer thread.
+        `fn` must not commit; the writer owns the transaction.
+        """
+        future = Future()
+
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Database writer is closed")
+            self._queue.put((future, fn, args))
+
+        return future
+
+    def insert_weather(self, data: dict) -> Future:
+        return self.submit(database.write_weather, data)
+
+    def insert_forecasts(self, forecasts: dict) -> Future:
+        return self.submit(database.write_forecasts, forecasts)
+
+    def insert_forecast(self, city: str, df) -> Future:
+        return self.submit(database.write_forecasts, {city: df})
+
+    def insert_forecast_accuracy(
+        self,
+        city: str,
+        date: str,
+        predicted_avg: float,
+        actual_avg: float
+    ) -> Future:
+        return self.submit(
+            database.write_forecast_accuracy,
+            city,
+            date,
+            predicted_avg,
+            actual_avg
+        )
+
+    def verify_forecasts(self, today: str) -> Future:
+        return self.submit(database.write_verification, today)
+
+    def insert_city_alias(self, alias: str, city: str) -> Future:
+        return self.submit(database.write_city_alias, alias, city)
+
+    def record_view(self, city: str) -> Future:
+        return self.submit(database.write_watchlist_view, city)
+
+    def insert_api_usage(
+        self,
+        provider: str,
+        day: str,
+        requests: int = 0,
+        rejected: int = 0
+    ) -> Future:
+        return self.submit(database.write_api_usage, provider, day, requests, rejected)
+
+    def reserve_api_quota(self, provider: str, day: str, quota: int) -> Future:
+        return self.submit(database.write_api_quota_reservation, provider, day, quota)
+
+    def close(self, timeout: float | None = 5):
+        """
+        Flush queued writes and stop the thread.
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+
+        self._thread.join(timeout)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_seconds
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+
+            if item is _STOP:
+                return batch, True
+
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        try:
+            conn = database.get_connection(self.db_path)
+        except Exception as e:
+            logger.error(f"[DB Writer] Could not open database | path={self.db_path} | error={str(e)}")
+            self._fail_pending(e)
+            return
+
+        # Autocommit mode: transactions are managed explicitly below
+        conn.isolation_level = None
+
+        batch = []
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit_batch(conn, batch)
+        except Exception as e:
+            # The uncommitted batch is discarded with the connection
+            logger.error(f"[DB Writer] Writer thread failed | error={str(e)}")
+            clear_city_cache()
+            self._fail_pending(e, batch)
+        finally:
+            conn.close()
+
+    def _fail_pending(self, error: Exception, batch=()):
+        """
+        Close the writer and fail `batch` plus every job still queued.
+        """
+        with self._submit_lock:
+            self._closed = True
+
+        pending = [item for item in batch if item is not _STOP]
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+
+        for future, _, _ in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        done = []
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logger.error(f"[DB Writer] Could not begin batch | error={str(e)}")
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for future, fn, args in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            conn.execute("SAVEPOINT job")
+            try:
+                result = fn(conn, *args)
+            except Exception as e:
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+                clear_city_cache()
+                future.set_exception(e)
+                continue
+
+            conn.execute("RELEASE job")
+            done.append((future, result))
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"[DB Writer] Batch commit failed | jobs={len(done)} | error={str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            clear_city_cache()
+            flush_dirty(conn)
+            for future, _ in done:
+                future.set_exception(e)
+            return
+
+        # Readers see the batch now: drop cached reads for touched cities
+        flush_dirty(conn)
+
+        self.batches += 1
+        self.jobs += len(batch)
+
+        for future, result in done:
+            future.set_result(result)
+
+
+# ==================================================
+# Process-wide writer per database file
+# ==================================================
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str | None = None) -> DatabaseWriter:
+    path = os.path.abspath(db_path or database.DB_PATH)
+
+    with _writers_lock:
+        writer = _writers.get(path)
+        # A writer whose thread failed is replaced on the next call
+        if writer is None or writer.closed:
+            writer = DatabaseWriter(path)
+            _writers[path] = writer
+
+    return writer
+
+
+@atexit.register
+def close_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,34 @@
+import pytest
+
+from storage import database
+from storage.writer import close_writers
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "weather.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    yield path
+    close_writers()
+
+
+def snapshot(city="Delhi", timestamp=None, temperature=30.0, **fields) -> dict:
+    """
+    A weather snapshot as write_weather takes it; `fields` override the
+    defaults. Without a timestamp it is stored as "now".
+    """
+    data = {
+        "city": city,
+        "temperature": temperature,
+        "feels_like": temperature,
+        "humidity": 50,
+        "pressure": 1010,
+        "wind_speed": 2.0,
+        "condition": "Clear",
+        "comfort": 90.0,
+        "health": 100,
+    }
+    if timestamp is not None:
+        data["timestamp"] = timestamp
+    data.update(fields)
+    return data
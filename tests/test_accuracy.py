@@ -0,0 +1,106 @@
+import random
+
+import pandas as pd
+import pytest
+
+from analytics.accuracy import error_bin
+from config.settings import ACCURACY_EWMA_ALPHA, ACCURACY_WINDOW
+from storage import database, migrations
+
+
+def _expected(errors: dict):
+    """KPIs recomputed from scratch from {date: signed error}."""
+    s = pd.Series(errors).sort_index()
+    abs_errors = s.abs()
+    return {
+        "samples": len(s),
+        "mae": round(abs_errors.mean(), 2),
+        "rmse": round((s ** 2).mean() ** 0.5, 2),
+        "bias": round(s.mean(), 2),
+        "ewma_mae": round(abs_errors.ewm(alpha=ACCURACY_EWMA_ALPHA, adjust=False).mean().iloc[-1], 2),
+        "window_mae": round(abs_errors.iloc[-ACCURACY_WINDOW:].mean(), 2),
+    }
+
+
+def test_running_aggregates_match_full_recompute(db_path):
+    rng = random.Random(7)
+    conn = database.get_connection()
+    errors = {}
+
+    # Mostly new days in order, with same-day re-evaluations and late backfills
+    days = [f"2026-01-{d:02d}" for d in range(1, 29)]
+    sequence = days[:20] + [days[19], days[19], days[5], days[12]] + days[20:] + [days[0]]
+
+    for date in sequence:
+        predicted, actual = rng.uniform(10, 30), rng.uniform(10, 30)
+        database.insert_forecast_accuracy(conn, "Delhi", date, predicted, actual)
+        errors[date] = predicted - actual
+
+        stats = database.fetch_accuracy_stats("Delhi")
+        assert stats == pytest.approx(_expected(errors), abs=0.011)
+
+    bins = {}
+    for error in errors.values():
+        bins[error_bin(abs(error))] = bins.get(error_bin(abs(error)), 0) + 1
+    assert dict(database.fetch_accuracy_histogram("Delhi")) == bins
+    conn.close()
+
+
+def test_migration_seeds_aggregates_from_existing_rows(db_path):
+    conn = database.get_connection()
+    for day, (predicted, actual) in enumerate([(20, 18), (15, 16.5), (22, 22.25)], start=1):
+        database.insert_forecast_accuracy(conn, "Delhi", f"2026-01-0{day}", predicted, actual)
+
+    before = (database.fetch_accuracy_stats("Delhi"), database.fetch_accuracy_histogram("Delhi"))
+
+    conn.execute("DROP TABLE accuracy_stats")
+    conn.execute("DROP TABLE accuracy_histogram")
+    version, _, step = migrations.MIGRATIONS[10]
+    assert version == 11
+    step(conn)
+    conn.commit()
+    database.QUERY_CACHE.clear()
+
+    assert (database.fetch_accuracy_stats("Delhi"), database.fetch_accuracy_histogram("Delhi")) == before
+    assert before[0]["samples"] == 3
+    conn.close()
+
+
+def test_trend_rows_are_bounded(db_path):
+    conn = database.get_connection()
+    for day in range(1, 11):
+        database.insert_forecast_accuracy(conn, "Delhi", f"2026-01-{day:02d}", 20.0, 19.0)
+
+    rows = database.fetch_forecast_accuracy("Delhi", limit=3)
+    assert [date for date, _ in rows] == ["2026-01-08", "2026-01-09", "2026-01-10"]
+    assert len(database.fetch_forecast_accuracy("Delhi")) == 10
+    conn.close()
+
+
+def test_reevaluating_archived_dates_replaces_them(db_path, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from storage import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    conn = database.get_connection()
+    errors = {}
+
+    for day in range(1, 9):
+        date = f"2026-01-{day:02d}"
+        database.insert_forecast_accuracy(conn, "Delhi", date, 20.0 + day / 4, 20.0)
+        errors[date] = day / 4
+
+    assert archive.archive_table(conn, "forecast_accuracy", "2026-01-05") == 4
+
+    # An archived date is evaluated again: replaced, not counted twice,
+    # and the replay of the EWMA / window sees the archived dates too
+    database.insert_forecast_accuracy(conn, "Delhi", "2026-01-02", 17.0, 20.0)
+    errors["2026-01-02"] = -3.0
+
+    assert database.fetch_accuracy_stats("Delhi") == pytest.approx(_expected(errors), abs=0.011)
+
+    bins = {}
+    for error in errors.values():
+        bins[error_bin(abs(error))] = bins.get(error_bin(abs(error)), 0) + 1
+    assert dict(database.fetch_accuracy_histogram("Delhi")) == bins
+    conn.close()
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+from analytics.health_scores import weather_health_score
+from analytics.indicators import comfort_index
+from storage import backfill, database, history_layout
+
+from conftest import snapshot
+
+
+# Stored with scores from "old" rules
+OLD_SCORES = {"comfort": 0.0, "health": 0}
+
+SNAPSHOTS = [
+    ("2026-01-01 10:05:00", 22.0, 50, 2.0),
+    ("2026-01-01 10:45:00", 3.5, 90, 12.0),
+    ("2026-01-01 11:00:00", 40.125, 30, 5.0),
+    ("2026-01-02 09:00:00", 18.3, 81, 11.0),
+    ("2026-01-02 09:30:00", 22.0, 50, 2.0),
+]
+
+
+def _expected(temperature, humidity, wind_speed):
+    return comfort_index(temperature, humidity), weather_health_score(
+        {"temperature": temperature, "humidity": humidity, "wind_speed": wind_speed}
+    )
+
+
+def _assert_rollups_match_history(conn):
+    # Rollup health columns equal a fresh aggregate of the raw rows
+    rebuilt = conn.execute(
+        """
+        SELECT strftime('%Y-%m-%d %H:00:00', timestamp), SUM(health), MIN(health), MAX(health)
+        FROM weather_history GROUP BY 1 ORDER BY 1
+        """
+    ).fetchall()
+    stored = conn.execute(
+        "SELECT bucket, health_sum, health_min, health_max FROM weather_rollup_hourly ORDER BY bucket"
+    ).fetchall()
+    assert stored == rebuilt
+
+
+def test_rescore_updates_scores_and_rollups(db_path):
+    conn = database.get_connection()
+    for timestamp, temperature, humidity, wind_speed in SNAPSHOTS:
+        database.insert_weather(conn, snapshot(
+            "Delhi", timestamp, temperature, humidity=humidity, wind_speed=wind_speed, **OLD_SCORES
+        ))
+
+    result = backfill.rescore_history(chunk_rows=2, workers=0)
+    assert (result["rows_read"], result["rows_written"]) == (5, 5)
+
+    stored = conn.execute(
+        "SELECT temperature, humidity, wind_speed, comfort, health FROM weather_history ORDER BY id"
+    ).fetchall()
+    for t, h, w, comfort, health in stored:
+        assert (comfort, health) == _expected(t, h, w)
+    _assert_rollups_match_history(conn)
+
+    # Finished jobs only run again on request; unchanged rows are not rewritten
+    assert backfill.rescore_history(workers=0)["rows_read"] == 0
+    assert backfill.rescore_history(workers=0, restart=True)["rows_written"] == 0
+    conn.close()
+
+
+def test_rescore_compact_layout_on_process_pool(db_path, monkeypatch):
+    monkeypatch.setattr(history_layout, "HISTORY_LAYOUT", "compact")
+    conn = database.get_connection()
+    for timestamp, temperature, humidity, wind_speed in SNAPSHOTS:
+        database.insert_weather(conn, snapshot(
+            "Delhi", timestamp, temperature, humidity=humidity, wind_speed=wind_speed, **OLD_SCORES
+        ))
+    database.insert_weather(conn, snapshot(
+        "Oslo", "2026-01-01 10:00:00", 5.0, humidity=85, wind_speed=1.0, **OLD_SCORES
+    ))
+
+    result = backfill.rescore_history(chunk_rows=2, workers=2)
+    assert result["rows_read"] == 6
+
+    stored = conn.execute(
+        "SELECT temp_c100 / 100.0, humidity, wind_c100 / 100.0, comfort_c100, health "
+        "FROM weather_history_compact"
+    ).fetchall()
+    for t, h, w, comfort_c100, health in stored:
+        comfort, expected_health = _expected(t, h, w)
+        assert (comfort_c100, health) == (round(comfort * 100), expected_health)
+    conn.close()
+
+
+def test_import_resumes_after_failure_without_duplicates(db_path, tmp_path, monkeypatch):
+    path = tmp_path / "observations.jsonl"
+    rows = [
+        {"city": "Delhi", "timestamp": ts, "temperature": t, "humidity": h, "wind_speed": w}
+        for ts, t, h, w in SNAPSHOTS
+    ]
+    rows.insert(2, {"city": None, "timestamp": "2026-01-01 12:00:00", "temperature": 1, "humidity": 1, "wind_speed": 1})
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+
+    score_chunk = backfill.score_chunk
+    calls = []
+
+    def failing_second_chunk(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("worker died")
+        return score_chunk(*args)
+
+    monkeypatch.setattr(backfill, "score_chunk", failing_second_chunk)
+    with pytest.raises(RuntimeError):
+        backfill.import_history(str(path), chunk_rows=2, workers=0)
+
+    monkeypatch.setattr(backfill, "score_chunk", score_chunk)
+    result = backfill.import_history(str(path), chunk_rows=2, workers=0)
+    assert (result["rows_read"], result["rows_written"]) == (6, 5)
+
+    conn = database.get_connection()
+    stored = conn.execute(
+        "SELECT datetime(timestamp), temperature, humidity, wind_speed, comfort, health "
+        "FROM weather_history ORDER BY timestamp"
+    ).fetchall()
+    assert [r[0] for r in stored] == [ts for ts, *_ in SNAPSHOTS]
+    for _, t, h, w, comfort, health in stored:
+        assert (comfort, health) == _expected(t, h, w)
+
+    samples = conn.execute("SELECT SUM(samples) FROM weather_rollup_daily").fetchone()[0]
+    assert samples == 5
+    _assert_rollups_match_history(conn)
+    conn.close()
+
+
+def test_import_csv_requires_columns(db_path, tmp_path):
+    path = tmp_path / "observations.csv"
+    path.write_text("city,timestamp,temperature\nDelhi,2026-01-01T10:00:00Z,20\n")
+
+    with pytest.raises(ValueError, match="humidity, wind_speed"):
+        backfill.import_history(str(path), workers=0)
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from services import batch
+from services.weather_api import WeatherAPIError
+
+
+def test_batch_returns_partial_results_and_respects_provider_limit(monkeypatch):
+    limit = 3
+    monkeypatch.setitem(
+        batch._provider_slots, batch.OPENWEATHER, threading.BoundedSemaphore(limit)
+    )
+
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def fake_fetch(city):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+
+        if city == "Atlantis":
+            raise WeatherAPIError("city not found")
+        return {"name": city}
+
+    monkeypatch.setattr(batch, "fetch_weather", fake_fetch)
+
+    cities = [f"City {i}" for i in range(12)] + ["Atlantis", "city 0 "]
+    result = batch.fetch_weather_many(cities)
+
+    assert len(result.results) == 12
+    assert set(result.errors) == {"Atlantis"}
+    assert not result.ok
+    assert peak <= limit
+
+
+def test_interactive_call_is_not_queued_behind_a_batch(monkeypatch):
+    monkeypatch.setitem(batch._provider_slots, batch.OPENWEATHER, threading.BoundedSemaphore(2))
+    monkeypatch.setitem(batch._batch_slots, batch.OPENWEATHER, threading.BoundedSemaphore(1))
+
+    release = threading.Event()
+
+    def slow_fetch(city):
+        release.wait(5)
+        return {"name": city}
+
+    monkeypatch.setattr(batch, "fetch_weather", slow_fetch)
+
+    runner = threading.Thread(
+        target=batch.fetch_weather_many,
+        args=([f"City {i}" for i in range(40)],)
+    )
+    runner.start()
+    time.sleep(0.05)
+
+    try:
+        timed = batch.submit_timed(batch.OPENWEATHER, lambda city: {"name": city}, "London")
+        assert timed.result(timeout=1).payload == {"name": "London"}
+    finally:
+        release.set()
+        runner.join(5)
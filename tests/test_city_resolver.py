@@ -0,0 +1,57 @@
+from services.city_resolver import CityResolver
+from storage import database
+from storage.cities import clear_city_cache, intern_city, lookup_city_id
+from storage.writer import get_writer
+
+from conftest import snapshot
+
+
+def test_learned_alias_is_persisted_and_resolved(db_path):
+    CityResolver().learn("New  Delhi", "Delhi").result()
+
+    resolver = CityResolver()
+    assert resolver.resolve("new delhi") == "Delhi"
+    assert resolver.resolve("DELHI ") == "Delhi"
+    assert resolver.resolve("  Unknown   town ") == "Unknown town"
+
+
+def test_alias_reads_and_writes_go_to_canonical_city(db_path):
+    writer = get_writer()
+    writer.insert_weather(snapshot("Delhi", lat=28.6, lon=77.2)).result()
+    writer.insert_city_alias("New Delhi", "Delhi").result()
+
+    with database.read_connection() as conn:
+        assert lookup_city_id(conn, "new delhi") == lookup_city_id(conn, "Delhi")
+    assert database.fetch_latest_snapshot("New Delhi")["city"] == "Delhi"
+
+    writer.insert_weather(snapshot("new delhi", lat=28.6, lon=77.2)).result()
+    with database.read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cities").fetchone()[0] == 1
+
+
+def test_city_name_wins_over_an_alias_with_the_same_key(db_path):
+    writer = get_writer()
+    writer.insert_weather(snapshot("Springfield", lat=28.6, lon=77.2)).result()
+    writer.insert_weather(snapshot("Springfield, IL", lat=28.6, lon=77.2)).result()
+    writer.insert_city_alias("Springfield", "Springfield, IL").result()
+
+    with database.read_connection() as conn:
+        canonical = conn.execute(
+            "SELECT id FROM cities WHERE name_key = 'springfield'"
+        ).fetchone()[0]
+
+        # Cold registries resolve from SQLite, in the same order for both
+        for resolve in (lookup_city_id, intern_city):
+            clear_city_cache()
+            assert resolve(conn, "springfield") == canonical
+
+
+def test_suggestions_prefix_then_fuzzy(db_path):
+    resolver = CityResolver()
+    for city in ("London", "Londrina", "Lagos", "Paris"):
+        resolver.learn(city, city)
+    resolver.learn("Londinium", "London")
+
+    assert resolver.suggest("lond") == ["London", "Londrina"]
+    assert resolver.suggest("Pariss") == ["Paris"]
+    assert resolver.suggest("") == []
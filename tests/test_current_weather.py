@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from analytics.processor import extract_features
+from services import weather_api
+from services.errors import WeatherAPIError
+from services.weather_api import OPENWEATHER, WEATHERAPI, fetch_current_weather
+
+WEATHERAPI_CURRENT = {
+    "location": {"name": "London", "lat": 51.52, "lon": -0.11},
+    "current": {
+        "temp_c": 12.0,
+        "feelslike_c": 10.5,
+        "humidity": 81,
+        "pressure_mb": 1012.0,
+        "wind_kph": 18.0,
+        "condition": {"text": "Light rain", "code": 1183},
+    },
+}
+
+
+def test_weatherapi_current_is_normalized_to_openweather_schema():
+    features = extract_features(WEATHERAPI_CURRENT, WEATHERAPI)
+
+    assert features == {
+        "city": "London",
+        "temperature": 12.0,
+        "feels_like": 10.5,
+        "humidity": 81,
+        "pressure": 1012.0,
+        "wind_speed": 5.0,
+        "condition": "Rain",
+        "lat": 51.52,
+        "lon": -0.11,
+    }
+
+
+def _providers(monkeypatch, openweather, weatherapi):
+    monkeypatch.setitem(weather_api.CURRENT_ENDPOINTS, OPENWEATHER, ("weather", openweather))
+    monkeypatch.setitem(weather_api.CURRENT_ENDPOINTS, WEATHERAPI, ("current.json", weatherapi))
+    monkeypatch.setattr(weather_api, "CURRENT_WEATHER_PRIMARY", OPENWEATHER)
+    monkeypatch.setattr(weather_api, "_hedge_delay", lambda provider: 0.05)
+
+
+def test_slow_primary_is_hedged_and_fastest_answer_wins(monkeypatch):
+    def slow_openweather(city, **kwargs):
+        time.sleep(0.5)
+        return {"name": city}
+
+    _providers(monkeypatch, slow_openweather, lambda city, **kwargs: WEATHERAPI_CURRENT)
+
+    start = time.monotonic()
+    current = fetch_current_weather("London", mode="hedged")
+
+    assert time.monotonic() - start < 0.3
+    assert current.provider == WEATHERAPI
+    assert current.hedged
+
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    calls = []
+
+    def weatherapi(city, **kwargs):
+        calls.append(city)
+        return WEATHERAPI_CURRENT
+
+    _providers(monkeypatch, lambda city, **kwargs: {"name": city}, weatherapi)
+
+    current = fetch_current_weather("London", mode="hedged")
+
+    assert current.provider == OPENWEATHER
+    assert not current.hedged
+    assert calls == []
+
+
+def test_failover_and_primary_error_when_both_fail(monkeypatch):
+    def failing(city, **kwargs):
+        raise WeatherAPIError(f"down: {city}")
+
+    _providers(monkeypatch, failing, lambda city, **kwargs: WEATHERAPI_CURRENT)
+    assert fetch_current_weather("London", mode="failover").provider == WEATHERAPI
+
+    def secondary_failing(city, **kwargs):
+        raise WeatherAPIError("secondary down")
+
+    _providers(monkeypatch, failing, secondary_failing)
+    with pytest.raises(WeatherAPIError, match="down: London"):
+        fetch_current_weather("London", mode="failover")
+
+
+def test_fallback_answer_is_flagged_so_callers_keep_their_city_name(monkeypatch):
+    def failing(city, **kwargs):
+        raise WeatherAPIError(f"down: {city}")
+
+    renamed = {**WEATHERAPI_CURRENT, "location": {"name": "City of London"}}
+    _providers(monkeypatch, failing, lambda city, **kwargs: renamed)
+
+    current = fetch_current_weather("London", mode="failover")
+    assert current.fallback
+    assert extract_features(current.raw, current.provider)["city"] == "City of London"
+
+    _providers(monkeypatch, lambda city, **kwargs: {"name": city}, lambda city, **kwargs: renamed)
+    assert not fetch_current_weather("London", mode="failover").fallback
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from services.errors import RateLimitExceeded, WeatherAPIError
+from services.rate_limit import ProviderLimiter, TokenBucket
+from storage import database
+from storage.writer import close_writers
+
+
+def test_bucket_allows_burst_then_fails_fast():
+    bucket = TokenBucket(rate_per_minute=60, burst=3)
+
+    assert [bucket.take(wait=False, timeout=0)[0] for _ in range(3)] == [True, True, True]
+
+    granted, retry_after = bucket.take(wait=False, timeout=0)
+    assert not granted
+    assert 0 < retry_after <= 1
+
+
+def test_bucket_waits_for_next_token():
+    bucket = TokenBucket(rate_per_minute=1200, burst=1)  # one token every 50 ms
+    bucket.take(wait=False, timeout=0)
+
+    start = time.monotonic()
+    granted, _ = bucket.take(wait=True, timeout=1)
+
+    assert granted
+    assert time.monotonic() - start >= 0.03
+
+
+def test_fail_fast_raises_weather_api_error_subclass():
+    limiter = ProviderLimiter("test", rate_per_minute=60, burst=1, persist=False)
+    limiter.acquire(wait=False)
+
+    with pytest.raises(RateLimitExceeded) as exc:
+        limiter.acquire(wait=False)
+
+    assert isinstance(exc.value, WeatherAPIError)
+    assert exc.value.reason == "rate limit"
+    assert limiter.stats()["requests"] == 1
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_daily_quota_survives_restart(db_path):
+    limiter = ProviderLimiter("test", rate_per_minute=0, burst=1, daily_quota=3)
+    for _ in range(2):
+        limiter.acquire()
+    close_writers()
+
+    restarted = ProviderLimiter("test", rate_per_minute=0, burst=1, daily_quota=3)
+    restarted.acquire()
+
+    with pytest.raises(RateLimitExceeded) as exc:
+        restarted.acquire(wait=True)
+
+    assert exc.value.reason == "daily quota"
+    close_writers()
+
+    day = restarted.stats()["day"]
+    assert database.fetch_api_usage("test", day) == (3, 1)
+
+
+def test_release_hands_back_quota_and_token():
+    limiter = ProviderLimiter("test", rate_per_minute=60, burst=1, daily_quota=1, persist=False)
+    day = limiter.acquire(wait=False)
+
+    limiter.release(day)
+
+    assert limiter.stats()["requests"] == 0
+    limiter.acquire(wait=False)
+
+
+def test_daily_quota_is_shared_across_processes(db_path):
+    # One limiter per process (app, worker), one database
+    app = ProviderLimiter("test", rate_per_minute=0, burst=1, daily_quota=3)
+    worker = ProviderLimiter("test", rate_per_minute=0, burst=1, daily_quota=3)
+
+    app.acquire()
+    worker.acquire()
+    app.acquire()
+
+    for limiter in (worker, app):
+        with pytest.raises(RateLimitExceeded) as exc:
+            limiter.acquire()
+        assert exc.value.reason == "daily quota"
+
+    close_writers()
+    assert database.fetch_api_usage("test", app.stats()["day"]) == (3, 2)
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+import requests
+
+from services.errors import CircuitOpenError, WeatherAPIError
+from services.resilience import (
+    CircuitBreaker,
+    Deadline,
+    EndpointPolicy,
+    LatencyTracker,
+    TransientError
+)
+
+
+def test_retries_transient_failures_then_succeeds(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    policy = EndpointPolicy("test", max_attempts=3)
+    outcomes = [TransientError("HTTP 503"), requests.exceptions.Timeout(), {"ok": True}]
+
+    def attempt(timeout):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert policy.call(attempt, Deadline(10)) == {"ok": True}
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_not_retried():
+    policy = EndpointPolicy("test", max_attempts=3)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise WeatherAPIError("city not found")
+
+    with pytest.raises(WeatherAPIError):
+        policy.call(attempt, Deadline(10))
+
+    assert len(calls) == 1
+
+
+def test_open_circuit_fails_fast_until_trial_succeeds():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert time.monotonic() - start < 0.01
+
+    time.sleep(0.06)
+    breaker.before_call()  # the single half-open trial
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_budget_caps_attempt_timeout_and_retries():
+    policy = EndpointPolicy("test", max_attempts=10)
+    timeouts = []
+
+    def attempt(timeout):
+        timeouts.append(timeout)
+        time.sleep(timeout)
+        raise requests.exceptions.Timeout()
+
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call(attempt, Deadline(0.2))
+
+    assert time.monotonic() - start < 0.5
+    assert all(t <= 0.2 for t in timeouts)
+
+
+def test_timeout_follows_observed_latency():
+    tracker = LatencyTracker(min_samples=5, multiplier=2, floor=0.5, ceiling=20)
+    assert tracker.timeout() == 20
+
+    for latency in (0.3, 0.4, 0.5, 0.6, 1.0):
+        tracker.record(latency)
+
+    assert tracker.percentile(50) == 0.5
+    assert tracker.timeout() == 2.0
+
+
+def test_reservation_is_handed_back_when_the_wait_uses_up_the_budget():
+    policy = EndpointPolicy("test", max_attempts=3)
+    reserved, released, calls = [], [], []
+
+    def reserve():
+        reserved.append(1)
+        time.sleep(0.06)  # e.g. waiting for a rate-limit token
+
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call(calls.append, Deadline(0.05), before_attempt=reserve, abandon_attempt=lambda: released.append(1))
+
+    assert calls == []
+    assert reserved == released == [1]
+    assert policy.breaker.state == CircuitBreaker.CLOSED
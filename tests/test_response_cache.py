@@ -0,0 +1,92 @@
+import time
+
+from services.response_cache import ResponseCache
+
+KEY = ("openweather", "weather", (("q", "london"), ("units", "metric")))
+
+
+def test_fresh_entries_hit_memory_then_expire(tmp_path, monkeypatch):
+    cache = ResponseCache(maxsize=4, cache_dir=str(tmp_path))
+    cache.put(KEY, {"name": "London", "main": {"temp": 12.5}})
+
+    assert cache.get(KEY, ttl=60) == {"name": "London", "main": {"temp": 12.5}}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+
+    assert cache.get(KEY, ttl=60) is None
+    assert cache.get_stale(KEY) == {"name": "London", "main": {"temp": 12.5}}
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["stale_served"] == 1
+    assert stats["memory_bytes"] > 0
+    assert stats["disk_bytes"] == stats["memory_bytes"]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    ResponseCache(cache_dir=str(tmp_path)).put(KEY, {"name": "London"})
+
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    assert cache.get(KEY, ttl=60) == {"name": "London"}
+    assert cache.get(KEY, ttl=60) == {"name": "London"}
+
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_entries_past_max_stale_are_dropped(tmp_path, monkeypatch):
+    cache = ResponseCache(cache_dir=str(tmp_path), max_stale=300)
+    cache.put(KEY, {"name": "London"})
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 600)
+
+    assert cache.get_stale(KEY) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_returned_payloads_are_independent_copies(tmp_path):
+    cache = ResponseCache(cache_dir=None)
+    cache.put(KEY, {"weather": [{"main": "Rain"}]})
+
+    cache.get(KEY, ttl=60)["weather"].clear()
+    assert cache.get(KEY, ttl=60) == {"weather": [{"main": "Rain"}]}
+
+
+def test_disk_tier_is_capped_oldest_first(tmp_path, monkeypatch):
+    cache = ResponseCache(maxsize=1, cache_dir=str(tmp_path), max_disk_bytes=1000)
+    now = time.time()
+
+    # ~210 bytes per entry, written a second apart
+    for i in range(10):
+        monkeypatch.setattr(time, "time", lambda i=i: now + i)
+        cache.put(("weather", i), {"payload": "x" * 200})
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 1000
+    assert stats["disk_evictions"] > 0
+
+    # The newest entries survive a restart, the oldest are gone
+    restarted = ResponseCache(cache_dir=str(tmp_path))
+    assert restarted.get_stale(("weather", 9)) == {"payload": "x" * 200}
+    assert restarted.get_stale(("weather", 0)) is None
+
+
+def test_stats_use_running_disk_totals(tmp_path, monkeypatch):
+    ResponseCache(cache_dir=str(tmp_path)).put(("weather", 0), {"payload": "x"})
+
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    for i in range(3):
+        cache.put(("weather", i), {"payload": "x" * 10})
+    on_disk = sum(path.stat().st_size for path in tmp_path.iterdir())
+
+    def no_scan(path):
+        raise AssertionError("stats() rescanned the disk tier")
+
+    monkeypatch.setattr("os.scandir", no_scan)
+    stats = cache.stats()
+    assert stats["disk_entries"] == 3
+    assert stats["disk_bytes"] == on_disk
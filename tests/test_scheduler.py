@@ -0,0 +1,104 @@
+import time
+
+from services import scheduler
+from services.scheduler import RefreshScheduler, refresh_current
+from services.weather_api import CurrentWeather, OPENWEATHER, WEATHERAPI
+from storage import database
+from storage.writer import get_writer
+
+
+def _view(*cities):
+    writer = get_writer()
+    for city in cities:
+        writer.record_view(city).result()
+
+
+def test_watchlist_orders_by_views(db_path):
+    _view("Paris", "london", "London", "Oslo", "London ", "Paris")
+
+    assert database.fetch_watchlist(limit=2, hot_hours=24) == ["london", "Paris"]
+
+
+def test_due_cities_are_refreshed_a_few_per_tick(db_path):
+    _view("A", "B", "C", "D", "E")
+    refreshed = []
+
+    sched = RefreshScheduler(
+        max_per_tick=2,
+        refresh_ahead=1,
+        jobs={"current": (0.2, refreshed.append)}
+    )
+
+    sched.run_once()  # first sight: due within the next interval
+    time.sleep(0.25)
+
+    assert len(sched.run_once()) == 2
+    assert len(sched.run_once()) == 2
+    assert len(set(refreshed)) == 4
+    assert sched.stats()["watching"] == 5
+    sched.stop()
+
+
+def test_unexpected_errors_fail_only_their_own_refresh(db_path):
+    _view("A", "B")
+    refreshed = []
+
+    def refresh(city):
+        if city == "A":
+            raise KeyError("main")
+        refreshed.append(city)
+
+    sched = RefreshScheduler(refresh_ahead=0, jobs={"current": (1, refresh)})
+
+    results = sched.run_once()
+    assert sorted(results) == [("A", "current", False), ("B", "current", True)]
+    assert refreshed == ["B"]
+    assert sched.stats()["failed"] == 1
+    sched.stop()
+
+
+def test_refresh_writes_snapshot_the_ui_reads(db_path, monkeypatch):
+    raw = {
+        "name": "London",
+        "main": {"temp": 14.0, "feels_like": 13.0, "humidity": 70, "pressure": 1015},
+        "wind": {"speed": 3.5},
+        "weather": [{"main": "Clouds"}],
+        "coord": {"lat": 51.5, "lon": -0.13},
+    }
+    monkeypatch.setattr(
+        scheduler,
+        "fetch_current_weather",
+        lambda city, **kwargs: CurrentWeather(OPENWEATHER, raw, 0.1, None)
+    )
+
+    refresh_current("london")
+    snapshot = database.fetch_latest_snapshot("LONDON")
+
+    assert snapshot["city"] == "London"
+    assert snapshot["temperature"] == 14.0
+    assert snapshot["condition"] == "Clouds"
+    assert database.age_seconds(snapshot["timestamp"]) < 60
+
+
+def test_fallback_refresh_is_stored_under_the_watchlist_name(db_path, monkeypatch):
+    raw = {
+        "location": {"name": "City of London", "lat": 51.5, "lon": -0.09},
+        "current": {
+            "temp_c": 12.0,
+            "feelslike_c": 10.5,
+            "humidity": 81,
+            "pressure_mb": 1012.0,
+            "wind_kph": 18.0,
+            "condition": {"text": "Light rain", "code": 1183},
+        },
+    }
+    monkeypatch.setattr(
+        scheduler,
+        "fetch_current_weather",
+        lambda city, **kwargs: CurrentWeather(WEATHERAPI, raw, 0.1, None, fallback=True)
+    )
+
+    refresh_current("London")
+
+    assert database.fetch_latest_snapshot("London")["temperature"] == 12.0
+    assert database.fetch_latest_snapshot("City of London") is None
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+from hypothesis import given, settings, strategies as st
+
+from analytics.health_scores import weather_health_score, weather_health_score_array
+from analytics.indicators import (
+    comfort_index,
+    comfort_index_array,
+    round_like_python,
+    wind_risk,
+    wind_risk_array
+)
+from analytics.processor import enrich_features, enrich_frame
+
+temperatures = st.one_of(
+    st.floats(min_value=-80, max_value=80, allow_nan=False),
+    # x.xx5 values sit on round()'s tie boundary
+    st.integers(min_value=-8000, max_value=8000).map(lambda n: n / 100 + 0.005),
+)
+humidities = st.one_of(st.integers(min_value=0, max_value=100), st.floats(min_value=0, max_value=100))
+winds = st.floats(min_value=0, max_value=60, allow_nan=False)
+
+rows = st.lists(st.tuples(temperatures, humidities, winds), min_size=1, max_size=50)
+
+
+def _same(a, b):
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+@settings(max_examples=300)
+@given(rows)
+def test_array_scores_match_scalar_scores(rows):
+    temp, humidity, wind = (np.array(col) for col in zip(*rows))
+
+    comfort = comfort_index_array(temp, humidity)
+    risk = wind_risk_array(temp, wind)
+    health = weather_health_score_array(temp, humidity, wind)
+
+    for i, (t, h, w) in enumerate(rows):
+        assert comfort[i] == comfort_index(t, h)
+        assert risk[i] == wind_risk(t, w)
+        assert health[i] == weather_health_score(
+            {"temperature": t, "humidity": h, "wind_speed": w}
+        )
+
+
+@given(st.lists(st.floats(allow_infinity=False, min_value=-1e6, max_value=1e6), max_size=50))
+def test_round_like_python(values):
+    rounded = round_like_python(values, 2)
+    assert all(_same(r, round(v, 2)) for r, v in zip(rounded, values))
+
+
+def test_enrich_frame_matches_enrich_features():
+    df = pd.DataFrame({
+        "temperature": [22.0, 3.5, 40.1, 12.345],
+        "humidity": [50, 90, 30, 81],
+        "wind_speed": [1.0, 8.0, 12.0, 6.5],
+    })
+
+    scored = enrich_frame(df)
+
+    for record, row in zip(df.to_dict("records"), scored.to_dict("records")):
+        expected = enrich_features(dict(record))
+        assert (row["comfort"], row["wind_risk"], row["health"]) == (
+            expected["comfort"], expected["wind_risk"], expected["health"]
+        )
+    assert "comfort" not in df
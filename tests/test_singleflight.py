@@ -0,0 +1,57 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.singleflight import SingleFlight
+from services.weather_api import _flight_key
+
+
+def test_concurrent_identical_calls_share_one_request():
+    flights = SingleFlight()
+    started = threading.Event()
+    upstream = []
+
+    def slow_fetch():
+        upstream.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"name": "London"}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(flights.do, "london", slow_fetch)
+        started.wait()
+        followers = [pool.submit(flights.do, "london", slow_fetch) for _ in range(7)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(upstream) == 1
+    assert all(r == {"name": "London"} for r in results)
+    assert results[1] is not results[0]
+
+    stats = flights.stats()
+    assert stats["calls"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("k", failing)
+
+    assert flights.do("k", lambda: 42) == 42
+    assert flights.stats()["calls"] == 2
+
+
+def test_flight_key_ignores_credentials_and_city_spelling():
+    a = _flight_key("openweather", "weather", {"q": " New  York", "appid": "a", "units": "metric"})
+    b = _flight_key("openweather", "weather", {"units": "metric", "q": "new york", "appid": "b"})
+    c = _flight_key("weatherapi", "weather", {"q": "new york", "units": "metric"})
+
+    assert a == b
+    assert a != c
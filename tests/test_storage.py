@@ -0,0 +1,543 @@
+import sqlite3
+import threading
+
+import pytest
+
+from storage import database, migrations
+from storage.cities import lookup_city_id
+from storage.migrations import (
+    LATEST_VERSION,
+    get_schema_version,
+    get_table_columns,
+    run_migrations
+)
+
+from conftest import snapshot
+
+
+def test_fresh_database_is_migrated_to_latest(db_path):
+    applied = database.ensure_schema(db_path)
+
+    assert [v for v, _ in applied] == list(range(1, LATEST_VERSION + 1))
+
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == LATEST_VERSION
+    conn.close()
+
+
+def test_schema_bootstrap_runs_once_per_file(db_path):
+    database.ensure_schema(db_path)
+
+    assert database.ensure_schema(db_path) == []
+
+    conn = sqlite3.connect(db_path)
+    assert run_migrations(conn) == []
+    conn.close()
+
+
+def test_legacy_forecast_table_gains_missing_columns(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE weather_forecast (city TEXT, date TEXT, min_temp REAL, max_temp REAL, "
+        "avg_temp REAL, condition TEXT, fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.commit()
+
+    run_migrations(conn)
+
+    cols = get_table_columns(conn, "weather_forecast")
+    assert {"icon", "rain_prob"} <= cols
+    conn.close()
+
+
+def test_unique_key_migration_keeps_newest_duplicate(db_path):
+    conn = sqlite3.connect(db_path)
+    migrations.MIGRATIONS[0][2](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("INSERT INTO forecast_accuracy (city, date, abs_error) VALUES ('Delhi', '2026-01-01', 1.0)")
+    conn.execute("INSERT INTO forecast_accuracy (city, date, abs_error) VALUES ('Delhi', '2026-01-01', 2.0)")
+    conn.commit()
+    conn.close()
+
+    database.ensure_schema(db_path)
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT abs_error FROM forecast_accuracy").fetchall()
+    assert rows == [(2.0,)]
+    conn.close()
+
+
+def test_forecast_accuracy_upsert_replaces_same_day(db_path):
+    conn = database.get_connection()
+
+    database.insert_forecast_accuracy(conn, "Delhi", "2026-01-01", 20.0, 18.0)
+    database.insert_forecast_accuracy(conn, "Delhi", "2026-01-01", 20.0, 19.5)
+
+    assert database.fetch_forecast_accuracy("Delhi") == [("2026-01-01", 0.5)]
+    conn.close()
+
+
+def test_cached_forecast_returns_latest_run(db_path):
+    pd = pytest.importorskip("pandas")
+    conn = database.get_connection()
+
+    first = pd.DataFrame({
+        "date": pd.to_datetime(["2026-01-01", "2026-01-02"]),
+        "min_temp": [1.0, 2.0],
+        "max_temp": [5.0, 6.0],
+        "avg_temp": [3.0, 4.0],
+    })
+    database.insert_forecast(conn, "Delhi", first)
+    conn.execute("UPDATE weather_forecast SET fetched_at = '2000-01-01 00:00:00'")
+    conn.commit()
+
+    second = first.assign(date=pd.to_datetime(["2026-01-02", "2026-01-03"]))
+    database.insert_forecast(conn, "Delhi", second)
+
+    cached = database.fetch_cached_forecast("Delhi")
+    assert cached["date"].dt.strftime("%Y-%m-%d").tolist() == ["2026-01-02", "2026-01-03"]
+    assert database.fetch_yesterday_forecast("Delhi", "2026-01-01") == 3.0
+    conn.close()
+
+
+def test_bulk_forecast_insert_for_many_cities(db_path):
+    pd = pytest.importorskip("pandas")
+    conn = database.get_connection()
+
+    def frame(base):
+        return pd.DataFrame({
+            "date": pd.to_datetime(["2026-01-01", "2026-01-02"]),
+            "min_temp": [base, base + 1],
+            "max_temp": [base + 5, base + 6],
+            "avg_temp": [base + 2, base + 3],
+            "condition": ["Sunny", None],
+            "rain_prob": [10, 80],
+        })
+
+    database.insert_forecasts(conn, {"Delhi": frame(10.0), "Oslo": frame(-5.0)})
+
+    oslo = database.fetch_cached_forecast("Oslo")
+    assert oslo["min_temp"].tolist() == [-5.0, -4.0]
+    assert oslo["condition"].tolist() == ["Sunny", None]
+    assert oslo["icon"].isna().all()
+    assert oslo["rain_prob"].tolist() == [10, 80]
+    assert len(database.fetch_cached_forecast("Delhi")) == 2
+    conn.close()
+
+
+def test_unchanged_forecast_only_bumps_fetched_at(db_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    conn = database.get_connection()
+
+    forecast = pd.DataFrame({
+        "date": pd.to_datetime(["2026-01-01", "2026-01-02"]),
+        "min_temp": [1.0, 2.0],
+        "max_temp": [5.0, 6.0],
+        "avg_temp": [3.0, 4.0],
+    })
+
+    def insert_at(now, df):
+        monkeypatch.setattr(database, "_utc_now", lambda: now)
+        database.insert_forecast(conn, "Delhi", df)
+        return conn.execute("SELECT DISTINCT fetched_at FROM weather_forecast").fetchall()
+
+    assert insert_at("2026-01-01 06:00:00", forecast) == [("2026-01-01 06:00:00",)]
+
+    # Same content later that day: rows untouched, freshness still moves
+    assert insert_at("2026-01-01 06:10:00", forecast.copy()) == [("2026-01-01 06:00:00",)]
+    assert database.fetch_forecast_fetched_at("Delhi") == "2026-01-01 06:10:00"
+    assert len(database.fetch_cached_forecast("Delhi")) == 2
+
+    # New content, or the first run of a new day, is written
+    assert insert_at("2026-01-01 06:20:00", forecast.assign(avg_temp=[3.5, 4.0])) == [("2026-01-01 06:20:00",)]
+    assert insert_at("2026-01-02 00:05:00", forecast.assign(avg_temp=[3.5, 4.0])) == [("2026-01-02 00:05:00",)]
+    conn.close()
+
+
+def test_read_pool_is_read_only_bounded_and_reentrant(db_path):
+    pool = database.ReadPool(db_path, max_size=1, timeout=0.1)
+    database.ensure_schema(db_path)
+
+    with pool.connection() as conn:
+        with pool.connection() as nested:
+            assert nested is conn
+
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM weather_history")
+
+        # The single slot is held: another thread cannot check one out
+        errors = []
+
+        def other():
+            try:
+                with pool.connection():
+                    pass
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=other)
+        t.start()
+        t.join()
+        assert errors
+
+    with pool.connection() as again:
+        assert again is conn
+
+    pool.close()
+
+
+def test_rollups_track_inserts(db_path):
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:05:00", 20.0))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:45:00", 30.0, health=80))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 11:00:00", 10.0))
+
+    hourly = conn.execute(
+        "SELECT bucket, samples, temp_min, temp_max, temp_sum, health_min "
+        "FROM weather_rollup_hourly ORDER BY bucket"
+    ).fetchall()
+    assert hourly == [
+        ("2026-01-01 10:00:00", 2, 20.0, 30.0, 50.0, 80),
+        ("2026-01-01 11:00:00", 1, 10.0, 10.0, 10.0, 100),
+    ]
+
+    daily = conn.execute("SELECT bucket, samples FROM weather_rollup_daily").fetchall()
+    assert daily == [("2026-01-01", 3)]
+    conn.close()
+
+
+def test_rollups_skip_null_metrics(db_path):
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:05:00", 20.0))
+    database.insert_weather(conn, {**snapshot("Delhi", "2026-01-01 10:15:00", None, health=None), "humidity": None})
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:45:00", 30.0, health=80))
+
+    hourly = conn.execute(
+        "SELECT samples, temp_samples, temp_min, temp_max, temp_sum, "
+        "health_samples, health_min, health_sum, humidity_samples, humidity_sum "
+        "FROM weather_rollup_hourly"
+    ).fetchall()
+    assert hourly == [(3, 2, 20.0, 30.0, 50.0, 2, 80, 180.0, 2, 100.0)]
+
+    # Means ignore the snapshot without a temperature
+    assert database.fetch_weather_series("Delhi", points=1) == [("2026-01-01 10:00:00", 25.0, 90.0)]
+    conn.close()
+
+
+def test_compact_rollups_count_a_replaced_snapshot_once(db_path, monkeypatch):
+    from storage import history_layout
+
+    monkeypatch.setattr(history_layout, "HISTORY_LAYOUT", "compact")
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:05:00", 20.0))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:05:00", 24.0, health=90))
+
+    hourly = conn.execute(
+        "SELECT samples, temp_samples, temp_min, temp_max, temp_sum, health_sum FROM weather_rollup_hourly"
+    ).fetchall()
+    # min/max can only widen; counts and sums follow the stored row
+    assert hourly == [(1, 1, 20.0, 24.0, 24.0, 90.0)]
+    conn.close()
+
+
+def test_migration_recounts_poisoned_rollups_from_hot_rows(db_path):
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:05:00", 20.0))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:15:00", None))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:45:00", 30.0, health=80))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 11:00:00", 10.0))
+
+    # Before migration 016 a NULL snapshot nulled the bucket's temperature;
+    # the 11:00 bucket has one more sample than its hot rows (archived)
+    conn.execute(
+        "UPDATE weather_rollup_hourly SET temp_min = NULL, temp_max = NULL, temp_sum = NULL "
+        "WHERE bucket = '2026-01-01 10:00:00'"
+    )
+    conn.execute(
+        "UPDATE weather_rollup_hourly SET samples = 2, temp_sum = NULL "
+        "WHERE bucket = '2026-01-01 11:00:00'"
+    )
+
+    version, _, step = migrations.MIGRATIONS[15]
+    assert version == 16
+    step(conn)
+    conn.commit()
+
+    hourly = conn.execute(
+        "SELECT bucket, samples, temp_samples, temp_min, temp_max, temp_sum, health_samples, humidity_samples "
+        "FROM weather_rollup_hourly ORDER BY bucket"
+    ).fetchall()
+    assert hourly == [
+        ("2026-01-01 10:00:00", 3, 2, 20.0, 30.0, 50.0, 3, 3),
+        ("2026-01-01 11:00:00", 2, 0, 10.0, 10.0, None, 2, 2),
+    ]
+    conn.close()
+
+
+def test_weather_history_returns_most_recent_rows(db_path):
+    conn = database.get_connection()
+    for i in range(5):
+        database.insert_weather(conn, snapshot("Delhi", f"2026-01-0{i + 1} 00:00:00", float(i)))
+    conn.close()
+
+    rows = database.fetch_weather_history("Delhi", limit=2)
+    assert [r[1] for r in rows] == [3.0, 4.0]
+
+
+def test_weather_series_switches_resolution_and_downsamples(db_path):
+    conn = database.get_connection()
+    for day in range(1, 29):
+        for hour in range(0, 24, 2):
+            for minute in (10, 40):
+                database.insert_weather(
+                    conn,
+                    snapshot("Delhi", f"2026-02-{day:02d} {hour:02d}:{minute}:00", float(day))
+                )
+    conn.close()
+
+    raw = database.fetch_weather_series("Delhi", "2026-02-01", "2026-02-01 23:59:59", points=50)
+    assert len(raw) == 24
+    assert raw[0][0] == "2026-02-01 00:10:00"
+
+    hourly = database.fetch_weather_series("Delhi", "2026-02-01", "2026-02-10 23:59:59", points=150)
+    assert len(hourly) == 120
+    assert hourly[0][0] == "2026-02-01 00:00:00"
+
+    daily = database.fetch_weather_series("Delhi", points=40)
+    assert [r[0] for r in daily][:2] == ["2026-02-01", "2026-02-02"]
+    assert len(daily) == 28
+
+    reduced = database.fetch_weather_series("Delhi", points=10)
+    assert len(reduced) == 10
+    assert reduced[0][0] == "2026-02-01" and reduced[-1][0] == "2026-02-28"
+
+
+def test_retention_archives_to_parquet_and_series_reads_it(db_path, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from storage import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-01 10:00:00", 5.0))
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-02 10:00:00", 6.0))
+    database.insert_weather(conn, snapshot("Oslo", "2020-01-02 11:00:00", -3.0))
+    database.insert_weather(conn, snapshot("Delhi", database._utc_now(), 25.0))
+    database.insert_forecast_accuracy(conn, "Delhi", "2020-01-01", 4.0, 5.0)
+    conn.close()
+
+    archived = archive.run_retention(history_days=30, accuracy_days=30)
+    assert archived == {
+        "weather_history": 3,
+        "forecast_accuracy": 1,
+        "weather_forecast": 0,
+        "forecast_issues": 0,
+    }
+
+    conn = database.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM weather_history").fetchone()[0] == 1
+    conn.close()
+
+    assert (tmp_path / "archive" / "weather_history" / "day=2020-01-02").is_dir()
+
+    rows = database.fetch_weather_series("Delhi")
+    assert [r[1] for r in rows] == [5.0, 6.0, 25.0]
+    assert rows[0][0] == "2020-01-01 10:00:00"
+
+    conn = database.get_connection()
+    delhi = lookup_city_id(conn, "Delhi")
+    conn.close()
+
+    pruned = archive.read_archive("weather_history", delhi, "2020-01-02 00:00:00", "2020-01-02 23:59:59")
+    assert pruned["temperature"].tolist() == [6.0]
+
+
+def test_rerun_after_a_failed_archive_reads_each_row_once(db_path, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from storage import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-01 10:00:00", 5.0))
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-01 10:00:00", 5.5))
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-02 10:00:00", 6.0))
+    delhi = lookup_city_id(conn, "Delhi")
+
+    # Files written, then the run dies before its commit
+    execute = conn.execute
+
+    def failing_delete(sql, *args):
+        if sql.lstrip().startswith("DELETE"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return execute(sql, *args)
+
+    conn.execute = failing_delete
+    with pytest.raises(sqlite3.OperationalError):
+        archive.archive_table(conn, "weather_history", "2021-01-01 00:00:00")
+    conn.rollback()
+    conn.execute = execute
+
+    assert archive.archive_table(conn, "weather_history", "2021-01-01 00:00:00") == 3
+    conn.close()
+
+    rows = archive.read_archive(
+        "weather_history", delhi, "2020-01-01 00:00:00", "2020-12-31 23:59:59",
+        columns=["timestamp", "temperature"]
+    )
+    # Same-second snapshots are distinct rows; the failed run's copies are not
+    assert sorted(rows["temperature"]) == [5.0, 5.5, 6.0]
+    assert list(rows.columns) == ["timestamp", "temperature"]
+
+
+def test_retention_deletes_past_forecast_days(db_path, tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from storage import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    today = pd.Timestamp(database._utc_now()[:10])
+    conn = database.get_connection()
+    database.insert_forecast(conn, "Delhi", pd.DataFrame({
+        "date": [today - pd.Timedelta(days=40), today - pd.Timedelta(days=39), today],
+        "min_temp": [1.0, 2.0, 3.0],
+        "max_temp": [5.0, 6.0, 7.0],
+        "avg_temp": [3.0, 4.0, 5.0],
+    }))
+    conn.close()
+
+    archived = archive.run_retention(history_days=30, accuracy_days=30, forecast_days=30)
+    assert archived["weather_forecast"] == 2
+    assert archived["forecast_issues"] == 2
+
+    conn = database.get_connection()
+    for table, column in archive.PRUNED_TABLES.items():
+        dates = [d for (d,) in conn.execute(f"SELECT {column} FROM {table}")]
+        assert dates == [today.strftime("%Y-%m-%d")]
+    conn.close()
+
+
+def test_city_dimension_migration_collapses_spellings(db_path):
+    conn = sqlite3.connect(db_path)
+    for version, _, step in migrations.MIGRATIONS[:4]:
+        step(conn)
+    conn.execute("PRAGMA user_version = 4")
+    conn.execute(
+        "INSERT INTO weather_history (city, temperature, health, humidity, timestamp) "
+        "VALUES ('london', 10.0, 90, 70, '2026-01-01 10:00:00'), "
+        "(' London', 12.0, 80, 60, '2026-01-01 10:30:00')"
+    )
+    conn.execute(
+        "INSERT INTO weather_rollup_daily VALUES "
+        "('london', '2026-01-01', 1, 10, 10, 10, 90, 90, 90, 70, 70, 70), "
+        "(' London', '2026-01-01', 1, 12, 12, 12, 80, 80, 80, 60, 60, 60)"
+    )
+    conn.commit()
+    conn.close()
+
+    database.ensure_schema(db_path)
+
+    conn = database.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM cities").fetchone()[0] == 1
+    assert conn.execute(
+        "SELECT samples, temp_min, temp_max FROM weather_rollup_daily"
+    ).fetchone() == (2, 10.0, 12.0)
+    conn.close()
+
+    assert len(database.fetch_weather_history("LONDON")) == 2
+
+
+def test_coordinates_are_stored_on_the_city(db_path):
+    conn = database.get_connection()
+    database.insert_weather(conn, {**snapshot("Oslo", "2026-01-01 10:00:00", 1.0), "lat": 59.9, "lon": 10.7})
+
+    assert conn.execute("SELECT name, lat, lon FROM cities").fetchall() == [("Oslo", 59.9, 10.7)]
+    conn.close()
+
+
+def test_copied_history_is_scaled_like_direct_inserts(db_path):
+    from storage import history_layout
+
+    conn = database.get_connection()
+    # x.5 after scaling: Python rounds ties to even, SQLite's ROUND away from zero
+    data = snapshot("Delhi", "2026-01-01 10:00:00", 0.125, wind_speed=0.125, comfort=70.125)
+    database.insert_weather(conn, data)
+
+    history_layout.copy_history(conn, "rowid", "compact")
+
+    copied = conn.execute(
+        "SELECT temp_c100, feels_c100, pressure_d10, wind_c100, comfort_c100 FROM weather_history_compact"
+    ).fetchone()
+    direct = history_layout.CompactLayout.insert_params(
+        lookup_city_id(conn, "Delhi"), data["timestamp"], data
+    )
+    assert copied == (direct[2], direct[3], direct[5], direct[6], direct[8])
+    conn.close()
+
+
+def test_compact_history_layout_round_trip(db_path, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from storage import archive, history_layout
+
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2020-01-01 10:00:00", 5.25))
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:00:00", 21.5))
+
+    assert history_layout.copy_history(conn, "rowid", "compact") == 2
+    assert history_layout.copy_history(conn, "rowid", "compact") == 0
+    conn.close()
+
+    monkeypatch.setattr(history_layout, "HISTORY_LAYOUT", "compact")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", database._utc_now(), 30.0))
+    stored = conn.execute(
+        "SELECT temp_c100, pressure_d10 FROM weather_history_compact ORDER BY ts DESC"
+    ).fetchone()
+    assert stored == (3000, 10100)
+    conn.close()
+
+    assert [r[1] for r in database.fetch_weather_history("Delhi")] == [5.25, 21.5, 30.0]
+
+    archived = archive.run_retention(history_days=30, accuracy_days=30)
+    assert archived["weather_history"] == 2
+
+    rows = database.fetch_weather_series("Delhi")
+    assert [r[1] for r in rows] == [5.25, 21.5, 30.0]
+
+
+def test_query_cache_hits_until_a_write_commits(db_path):
+    from storage.query_cache import QUERY_CACHE
+
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:00:00", 20.0))
+
+    before = QUERY_CACHE.stats()
+    assert len(database.fetch_weather_history("Delhi")) == 1
+    assert len(database.fetch_weather_history("delhi ", limit=200)) == 1
+    after = QUERY_CACHE.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 11:00:00", 21.0))
+    assert len(database.fetch_weather_history("Delhi")) == 2
+    conn.close()
+
+
+def test_query_cache_is_shared_by_aliases_and_safe_to_mutate(db_path):
+    conn = database.get_connection()
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 10:00:00", 20.0))
+    database.write_city_alias(conn, "New Delhi", "Delhi")
+    conn.commit()
+
+    # Callers may enrich the snapshot dict in place
+    features = database.fetch_latest_snapshot("New Delhi")
+    features["temperature"] = -99.0
+    assert database.fetch_latest_snapshot("New Delhi")["temperature"] == 20.0
+
+    # A write under the canonical name invalidates reads cached via the alias
+    database.insert_weather(conn, snapshot("Delhi", "2026-01-01 11:00:00", 21.0))
+    assert database.fetch_latest_snapshot("New Delhi")["temperature"] == 21.0
+    conn.close()
@@ -0,0 +1,135 @@
+import pandas as pd
+import pytest
+
+from storage import database
+
+
+def _forecast(dates, avg_temps):
+    return pd.DataFrame({
+        "date": dates,
+        "min_temp": [t - 3 for t in avg_temps],
+        "max_temp": [t + 3 for t in avg_temps],
+        "avg_temp": avg_temps,
+        "condition": "Sunny",
+        "icon": "",
+        "rain_prob": 0,
+    })
+
+
+def _observe(conn, city, date, temperatures):
+    for hour, temperature in enumerate(temperatures):
+        database.insert_weather(conn, {
+            "city": city,
+            "temperature": temperature,
+            "feels_like": temperature,
+            "humidity": 50,
+            "pressure": 1010,
+            "wind_speed": 2.0,
+            "condition": "Clear",
+            "comfort": 90.0,
+            "health": 100,
+            "timestamp": f"{date} {hour:02d}:00:00",
+        })
+
+
+def _issue(conn, monkeypatch, issued_on, forecasts):
+    monkeypatch.setattr(database, "_utc_now", lambda: f"{issued_on} 06:00:00")
+    database.insert_forecasts(conn, forecasts)
+
+
+def test_verification_by_lead_day_for_all_cities(db_path, monkeypatch):
+    conn = database.get_connection()
+
+    # Two runs a day apart; the later run overwrites weather_forecast
+    _issue(conn, monkeypatch, "2026-03-01", {
+        "Delhi": _forecast(["2026-03-01", "2026-03-02", "2026-03-03"], [20.0, 21.0, 22.0]),
+        "Oslo": _forecast(["2026-03-01", "2026-03-02"], [1.0, 2.0]),
+    })
+    _issue(conn, monkeypatch, "2026-03-02", {
+        "Delhi": _forecast(["2026-03-02", "2026-03-03"], [23.0, 25.0]),
+    })
+
+    # Observed daily means: Delhi 22 then 24, Oslo 0; Oslo's 2nd day is too sparse
+    _observe(conn, "Delhi", "2026-03-02", [21.0, 22.0, 23.0])
+    _observe(conn, "Delhi", "2026-03-03", [24.0, 24.0, 24.0])
+    _observe(conn, "Oslo", "2026-03-01", [0.0, -1.0, 1.0])
+    _observe(conn, "Oslo", "2026-03-02", [5.0, 5.0])
+
+    database.insert_verification(conn, today="2026-03-04", min_observations=3)
+
+    matrix = {(city, lead): (n, mae, bias) for city, lead, n, mae, bias in database.fetch_verification_matrix()}
+    assert matrix == {
+        ("Delhi", 0): (1, 1.0, 1.0),    # 23 vs 22 (03-01 not observed)
+        ("Delhi", 1): (2, 1.0, 0.0),    # 21 vs 22, 25 vs 24
+        ("Delhi", 2): (1, 2.0, -2.0),   # 22 vs 24
+        ("Oslo", 0): (1, 1.0, 1.0),
+    }
+
+    # Day-ahead errors feed the per-city accuracy history, once
+    assert database.fetch_forecast_accuracy("Delhi") == [("2026-03-02", 1.0), ("2026-03-03", 1.0)]
+    database.insert_verification(conn, today="2026-03-04", min_observations=3)
+    assert database.fetch_accuracy_stats("Delhi")["samples"] == 2
+
+    assert database.fetch_verification("Delhi")[0][0] == 0
+    assert database.fetch_last_verification() == "2026-03-04"
+    conn.close()
+
+
+def test_run_without_results_counts_as_done(db_path):
+    conn = database.get_connection()
+
+    # Nothing observed yet: no results, but today's run is recorded
+    database.insert_verification(conn, today="2026-03-04")
+
+    assert database.fetch_verification_matrix() == []
+    assert database.fetch_last_verification() == "2026-03-04"
+    conn.close()
+
+
+def test_lead_days_follow_the_local_forecast_date(db_path, monkeypatch):
+    conn = database.get_connection()
+
+    # 20:00 UTC is already the next morning in Auckland (UTC+13): the
+    # provider's forecast starts on the local date, 03-02
+    monkeypatch.setattr(database, "_utc_now", lambda: "2026-03-01 20:00:00")
+    database.insert_forecasts(conn, {
+        "Auckland": _forecast(["2026-03-02", "2026-03-03"], [20.0, 21.0]),
+    })
+
+    issues = conn.execute(
+        "SELECT target_date, lead_days FROM forecast_issues ORDER BY target_date"
+    ).fetchall()
+    assert issues == [("2026-03-02", 0), ("2026-03-03", 1)]
+
+    # The day-ahead forecast scored is the one for 03-03, not 03-02
+    _observe(conn, "Auckland", "2026-03-02", [18.0, 18.0, 18.0])
+    _observe(conn, "Auckland", "2026-03-03", [19.0, 19.0, 19.0])
+    database.insert_verification(conn, today="2026-03-04")
+
+    assert database.fetch_forecast_accuracy("Auckland") == [("2026-03-03", 2.0)]
+    conn.close()
+
+
+def test_runs_add_new_days_and_keep_earlier_results(db_path, monkeypatch):
+    conn = database.get_connection()
+
+    _issue(conn, monkeypatch, "2026-03-01", {
+        "Delhi": _forecast(["2026-03-01", "2026-03-02", "2026-03-03"], [20.0, 22.0, 26.0]),
+    })
+    _observe(conn, "Delhi", "2026-03-02", [21.0, 21.0, 21.0])
+    database.insert_verification(conn, today="2026-03-03")
+    assert database.fetch_verification("Delhi") == [(1, 1, 1.0, 1.0)]
+
+    # The next run only verifies 03-03; 03-02 stays counted from the first
+    _observe(conn, "Delhi", "2026-03-03", [23.0, 23.0, 23.0])
+    database.insert_verification(conn, today="2026-03-04")
+    assert database.fetch_verification("Delhi") == [(1, 1, 1.0, 1.0), (2, 1, 3.0, 3.0)]
+
+    runs = conn.execute(
+        "SELECT run_date, first_date, last_date FROM forecast_verification ORDER BY run_date"
+    ).fetchall()
+    assert runs == [("2026-03-03", "2026-03-02", "2026-03-02"), ("2026-03-04", "2026-03-03", "2026-03-03")]
+
+    with pytest.raises(ValueError):
+        database.insert_verification(conn, today="2026-03-03")
+    conn.close()
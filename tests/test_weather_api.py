@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analytics.processor import extract_features
+from loadtest.driver import configure_services, run_load
+from loadtest.fake_provider import FakeProvider
+from services import resilience, weather_api
+from services.errors import CircuitOpenError, WeatherAPIError
+from services.singleflight import SingleFlight
+
+WEATHER = "/data/2.5/weather"
+FORECAST = "/v1/forecast.json"
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    server = FakeProvider(fixtures_dir=None, hang_seconds=5).start()
+    configure_services(server, patch=monkeypatch.setattr)
+    # Fresh breakers, latency windows and in-flight map per test
+    monkeypatch.setattr(resilience, "_policies", {})
+    monkeypatch.setattr(weather_api, "_flights", SingleFlight())
+    monkeypatch.setattr(resilience.time, "sleep", lambda seconds: None)
+    yield server
+    server.stop()
+
+
+def test_fetch_weather_round_trip(provider):
+    features = extract_features(weather_api.fetch_weather("London"))
+
+    assert features["city"] == "London"
+    assert {"temperature", "humidity", "wind_speed", "condition"} <= set(features)
+    assert provider.requests[WEATHER] == 1
+
+
+def test_transient_errors_are_retried(provider):
+    provider.script(WEATHER, "error", "error")
+
+    assert weather_api.fetch_weather("Paris")["name"] == "Paris"
+    assert provider.requests[WEATHER] == 3
+
+
+def test_unknown_city_is_not_retried(provider):
+    with pytest.raises(WeatherAPIError, match="city not found"):
+        weather_api.fetch_weather("Atlantis")
+
+    assert provider.requests[WEATHER] == 1
+
+
+def test_hung_request_is_cut_by_budget(provider):
+    provider.script(FORECAST, "timeout", "timeout", "timeout")
+
+    start = time.monotonic()
+    with pytest.raises(WeatherAPIError, match="timed out"):
+        weather_api.fetch_daily_forecast_weatherapi("Oslo", budget=0.5)
+
+    assert time.monotonic() - start < 1.5
+
+
+def test_circuit_opens_and_fails_fast(provider):
+    provider.error_rate = 1.0
+
+    for _ in range(2):
+        with pytest.raises(WeatherAPIError):
+            weather_api.fetch_weather("Berlin")
+    sent = provider.requests[WEATHER]
+
+    with pytest.raises(CircuitOpenError):
+        weather_api.fetch_weather("Berlin")
+    assert provider.requests[WEATHER] == sent
+
+
+def test_concurrent_identical_calls_are_coalesced(provider):
+    provider.script(WEATHER, "slow:300")
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(weather_api.fetch_weather, ["Rome"] * 5))
+
+    assert all(r["name"] == "Rome" for r in results)
+    assert provider.requests[WEATHER] == 1
+
+
+def test_load_driver_reports_percentiles(provider):
+    provider.latency_ms = 5
+
+    report = run_load(sessions=4, views=5, cities=10)
+
+    assert report.views == 20
+    assert not report.errors
+    assert report.percentile(50) <= report.percentile(99)
@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+
+import pytest
+
+from storage import database
+from storage.writer import DatabaseWriter
+
+
+SNAPSHOT = {
+    "city": "Delhi",
+    "temperature": 30.0,
+    "feels_like": 32.0,
+    "humidity": 40,
+    "pressure": 1008,
+    "wind_speed": 3.0,
+    "condition": "Clear",
+    "comfort": 80.0,
+    "health": 100,
+}
+
+
+@pytest.fixture
+def writer(tmp_path):
+    w = DatabaseWriter(str(tmp_path / "weather.db"), batch_size=16, flush_ms=20)
+    yield w
+    w.close()
+
+
+def test_concurrent_writes_are_group_committed(writer):
+    futures = []
+    lock = threading.Lock()
+
+    def submit():
+        f = writer.insert_weather(SNAPSHOT)
+        with lock:
+            futures.append(f)
+
+    threads = [threading.Thread(target=submit) for _ in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for f in futures:
+        f.result(timeout=5)
+
+    conn = sqlite3.connect(writer.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM weather_history").fetchone()[0] == 40
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+    assert writer.jobs == 40
+    assert writer.batches < 40
+
+
+def test_failed_job_does_not_poison_batch(writer):
+    good = writer.insert_weather(SNAPSHOT)
+    bad = writer.insert_weather({"city": "Delhi"})
+
+    assert good.result(timeout=5) is None
+    with pytest.raises(KeyError):
+        bad.result(timeout=5)
+
+    conn = database.get_connection(writer.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM weather_history").fetchone()[0] == 1
+    conn.close()
+
+
+def test_writer_that_cannot_open_its_database_fails_fast(tmp_path, monkeypatch):
+    opening = threading.Event()
+    get_connection = database.get_connection
+
+    def slow_open(path):
+        opening.wait(5)
+        return get_connection(path)
+
+    monkeypatch.setattr(database, "get_connection", slow_open)
+    w = DatabaseWriter(str(tmp_path / "missing" / "weather.db"))
+
+    queued = w.insert_weather(SNAPSHOT)
+    opening.set()
+
+    with pytest.raises(sqlite3.OperationalError):
+        queued.result(timeout=5)
+    with pytest.raises(RuntimeError):
+        w.insert_weather(SNAPSHOT)
+    w.close()
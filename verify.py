@@ -0,0 +1,35 @@
+import argparse
+
+from config.settings import VERIFY_MIN_OBSERVATIONS, VERIFY_LOOKBACK_DAYS
+from storage import database
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verify stored forecasts against observed daily means (all cities, by lead day)"
+    )
+    parser.add_argument("--db", default=database.DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--today", default=None, help="UTC date to verify up to (default: today)")
+    parser.add_argument("--min-observations", type=int, default=VERIFY_MIN_OBSERVATIONS)
+    parser.add_argument("--lookback-days", type=int, default=VERIFY_LOOKBACK_DAYS)
+    args = parser.parse_args()
+
+    database.DB_PATH = args.db
+    conn = database.get_connection(args.db)
+    try:
+        database.insert_verification(conn, args.today, args.min_observations, args.lookback_days)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        conn.close()
+
+    rows = database.fetch_verification_matrix()
+    print(f"  {'city':<24} {'lead':>4} {'days':>6} {'MAE °C':>8} {'bias °C':>8}")
+    for city, lead_days, samples, mae, bias in rows:
+        print(f"  {city:<24} {lead_days:>4} {samples:>6} {mae:>8.2f} {bias:>+8.2f}")
+
+    print(f"Verification completed: {len(rows)} city/lead-day rows")
+
+
+if __name__ == "__main__":
+    main()
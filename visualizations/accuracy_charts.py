@@ -1,3 +1,4 @@
+import pandas as pd
 import plotly.express as px
 
 
@@ -35,3 +36,58 @@ def accuracy_trend_chart(df):
 
     fig.update_layout(template="plotly_white")
     return fig
+
+
+def accuracy_histogram_chart(df):
+    """
+    Distribution of absolute forecast errors (precomputed bins).
+    """
+
+    fig = px.bar(
+        df,
+        x="range",
+        y="samples",
+        title="Forecast Error Distribution (°C)",
+        labels={
+            "range": "Absolute Error (°C)",
+            "samples": "Days"
+        }
+    )
+
+    fig.update_xaxes(type="category")
+    fig.update_layout(template="plotly_white")
+    return fig
+
+
+def lead_time_error_chart(rows):
+    """
+    MAE and bias by forecast lead time, from
+    (lead_days, samples, mae, bias) rows.
+    """
+    df = pd.DataFrame(rows, columns=["lead_days", "samples", "mae", "bias"])
+    long = df.melt(
+        id_vars=["lead_days", "samples"],
+        value_vars=["mae", "bias"],
+        var_name="metric",
+        value_name="error"
+    )
+    long["metric"] = long["metric"].map({"mae": "MAE", "bias": "Bias"})
+
+    fig = px.line(
+        long,
+        x="lead_days",
+        y="error",
+        color="metric",
+        markers=True,
+        hover_data=["samples"],
+        title="Forecast Error by Lead Time (°C)",
+        labels={
+            "lead_days": "Lead time (days ahead)",
+            "error": "Error (°C)",
+            "samples": "Days verified"
+        }
+    )
+
+    fig.update_xaxes(dtick=1)
+    fig.update_layout(template="plotly_white")
+    return fig
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+from storage import database
+from storage.writer import get_writer
+from services.scheduler import RefreshScheduler
+
+
+def verify_daily(last_run: str | None) -> str | None:
+    """
+    Run the forecast verification once per UTC day. Returns the date of
+    the last successful run; a failed run is retried on the next pass.
+    """
+    today = database._utc_now()[:10]
+    if last_run == today:
+        return last_run
+
+    try:
+        get_writer().verify_forecasts(today).result()
+    except Exception as e:
+        print(f"  forecast verification failed: {type(e).__name__}: {e}")
+        return last_run
+
+    print(f"  verified forecasts up to {today}")
+    return today
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep recently viewed cities fresh in SQLite (background refresh worker)"
+    )
+    parser.add_argument("--db", default=database.DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--once", action="store_true", help="Run a single scheduling pass and exit")
+    args = parser.parse_args()
+
+    database.DB_PATH = args.db
+    scheduler = RefreshScheduler()
+
+    if args.once:
+        for city, kind, ok in scheduler.run_once():
+            print(f"  {'refreshed' if ok else 'failed   '}  {kind:<8}  {city}")
+        return
+
+    scheduler.start()
+    print("Refresh worker running (Ctrl+C to stop)")
+    try:
+        verified = verify_daily(database.fetch_last_verification())
+    except Exception as e:
+        print(f"  could not read the last verification run: {type(e).__name__}: {e}")
+        verified = verify_daily(None)
+
+    try:
+        while True:
+            time.sleep(60)
+            verified = verify_daily(verified)
+            stats = scheduler.stats()
+            print(
+                f"  watching {stats['watching']} cities | "
+                f"refreshed {stats['refreshed']} | failed {stats['failed']}"
+            )
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()